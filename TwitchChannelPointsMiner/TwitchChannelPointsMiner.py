@@ -11,17 +11,30 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 
+from TwitchChannelPointsMiner.classes.AnalyticsStorage import (
+    AnalyticsBackend,
+    AnalyticsWriter,
+    create_storage,
+)
 from TwitchChannelPointsMiner.classes.Chat import ChatPresence, ThreadChat
 from TwitchChannelPointsMiner.classes.entities.PubsubTopic import PubsubTopic
 from TwitchChannelPointsMiner.classes.entities.Streamer import (
     Streamer,
     StreamerSettings,
 )
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
 from TwitchChannelPointsMiner.classes.Exceptions import StreamerDoesNotExistException
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
+from TwitchChannelPointsMiner.classes.ProfileCache import profile_cache
+from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubRecorder
 from TwitchChannelPointsMiner.classes.Settings import FollowersOrder, Priority, Settings
 from TwitchChannelPointsMiner.classes.Twitch import Twitch
 from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
-from TwitchChannelPointsMiner.logger import LoggerSettings, configure_loggers
+from TwitchChannelPointsMiner.logger import (
+    LoggerSettings,
+    configure_loggers,
+    is_configured,
+)
 from TwitchChannelPointsMiner.utils import (
     _millify,
     at_least_one_value_in_settings_is,
@@ -48,6 +61,15 @@ logging.getLogger("websocket").setLevel(logging.ERROR)
 
 logger = logging.getLogger(__name__)
 
+# Channel topics of a streamer, subscribed depending on its settings
+STREAMER_TOPICS = [
+    "video-playback-by-id",
+    "raid",
+    "predictions-channel-v1",
+    "community-moments-channel-v1",
+    "community-points-channel-v1",
+]
+
 
 class TwitchChannelPointsMiner:
     __slots__ = [
@@ -69,6 +91,7 @@ class TwitchChannelPointsMiner:
         "original_streamers",
         "logs_file",
         "queue_listener",
+        "pubsub_recorder",
     ]
 
     def __init__(
@@ -77,8 +100,14 @@ class TwitchChannelPointsMiner:
         password: str = None,
         claim_drops_startup: bool = False,
         enable_analytics: bool = False,
+        # Where the analytics are saved: JSON-lines files or a SQLite database
+        analytics_backend: AnalyticsBackend = AnalyticsBackend.JSONL,
+        # fsync each batch of analytics records: safer on power loss, slower
+        analytics_fsync: bool = False,
         disable_ssl_cert_verification: bool = False,
         disable_at_in_nickname: bool = False,
+        # Record all the PubSub frames in a .jsonl.gz file (replay with pubsub_replay.py)
+        pubsub_record_file: str = None,
         # Settings for logging and selenium as you can see.
         priority: list = [Priority.STREAK, Priority.DROPS, Priority.ORDER],
         # This settings will be global shared trought Settings class
@@ -124,6 +153,13 @@ class TwitchChannelPointsMiner:
                 Path().absolute(), "analytics", username
             )
             Path(Settings.analytics_path).mkdir(parents=True, exist_ok=True)
+            Settings.analytics_storage = create_storage(
+                analytics_backend, Settings.analytics_path, fsync=analytics_fsync
+            )
+            # The events are written in batches by a background thread
+            Settings.analytics_writer = AnalyticsWriter(Settings.analytics_storage)
+            Settings.analytics_writer.start()
+            event_bus.subscribe(Settings.analytics_writer.on_event)
 
         self.username = username
 
@@ -148,10 +184,16 @@ class TwitchChannelPointsMiner:
         self.sync_campaigns_thread = None
         self.ws_pool = None
 
+        self.pubsub_recorder = (
+            PubSubRecorder(pubsub_record_file)
+            if pubsub_record_file is not None
+            else None
+        )
+
         self.session_id = str(uuid.uuid4())
         self.running = False
         self.start_datetime = None
-        self.original_streamers = []
+        self.original_streamers = {}
 
         self.logs_file, self.queue_listener = configure_loggers(
             self.username, logger_settings
@@ -194,6 +236,7 @@ class TwitchChannelPointsMiner:
                 refresh=refresh,
                 days_ago=days_ago,
                 username=self.username,
+                logs_file=self.logs_file,
             )
             http_server.daemon = True
             http_server.name = "Analytics Thread"
@@ -288,6 +331,12 @@ class TwitchChannelPointsMiner:
                             extra={"emoji": ":cry:"},
                         )
 
+            # Load the avatars used by the Discord embeds in the background
+            if is_configured("discord", Settings.logger.discord):
+                profile_cache.prefetch(
+                    [streamer.username for streamer in self.streamers]
+                )
+
             # Populate the streamers with default values.
             # 1. Load channel points and auto-claim bonus
             # 2. Check if streamers are online
@@ -298,9 +347,10 @@ class TwitchChannelPointsMiner:
                 self.twitch.check_streamer_online(streamer)
                 # self.twitch.viewer_is_mod(streamer)
 
-            self.original_streamers = [
-                streamer.channel_points for streamer in self.streamers
-            ]
+            self.original_streamers = {
+                streamer.username: streamer.channel_points
+                for streamer in self.streamers
+            }
 
             # If we have at least one streamer with settings = make_predictions True
             make_predictions = at_least_one_value_in_settings_is(
@@ -332,6 +382,7 @@ class TwitchChannelPointsMiner:
                 twitch=self.twitch,
                 streamers=self.streamers,
                 events_predictions=self.events_predictions,
+                recorder=self.pubsub_recorder,
             )
 
             # Subscribe to community-points-user. Get update for points spent or gains
@@ -360,51 +411,115 @@ class TwitchChannelPointsMiner:
                 )
 
             for streamer in self.streamers:
-                self.ws_pool.submit(
-                    PubsubTopic("video-playback-by-id", streamer=streamer)
-                )
-
-                if streamer.settings.follow_raid is True:
-                    self.ws_pool.submit(PubsubTopic("raid", streamer=streamer))
-
-                if streamer.settings.make_predictions is True:
-                    self.ws_pool.submit(
-                        PubsubTopic("predictions-channel-v1", streamer=streamer)
-                    )
-
-                if streamer.settings.claim_moments is True:
-                    self.ws_pool.submit(
-                        PubsubTopic("community-moments-channel-v1", streamer=streamer)
-                    )
-
-                if streamer.settings.community_goals is True:
-                    self.ws_pool.submit(
-                        PubsubTopic("community-points-channel-v1", streamer=streamer)
-                    )
+                for topic in self.__streamer_topics(streamer):
+                    self.ws_pool.submit(topic)
 
             refresh_context = time.time()
             while self.running:
                 time.sleep(random.uniform(20, 60))
                 # Do an external control for WebSocket. Check if the thread is running
                 # Check if is not None because maybe we have already created a new connection on array+1 and now index is None
-                for index in range(0, len(self.ws_pool.ws)):
+                # Iterate over a copy, the pool can retire connections at runtime
+                for ws in list(self.ws_pool.ws):
                     if (
-                        self.ws_pool.ws[index].is_reconnecting is False
-                        and self.ws_pool.ws[index].elapsed_last_ping() > 10
+                        ws.is_reconnecting is False
+                        and ws.elapsed_last_ping() > 10
                         and internet_connection_available() is True
                     ):
                         logger.info(
-                            f"#{index} - The last PING was sent more than 10 minutes ago. Reconnecting to the WebSocket..."
+                            f"#{ws.index} - The last PING was sent more than 10 minutes ago. Reconnecting to the WebSocket..."
                         )
-                        WebSocketsPool.handle_reconnection(self.ws_pool.ws[index])
+                        WebSocketsPool.handle_reconnection(ws)
+
+                # Repack the topics in the minimum number of connections, nothing to do if already minimal
+                self.ws_pool.rebalance()
 
                 if ((time.time() - refresh_context) // 60) >= 30:
                     refresh_context = time.time()
-                    for index in range(0, len(self.streamers)):
-                        if self.streamers[index].is_online:
-                            self.twitch.load_channel_points_context(
-                                self.streamers[index]
-                            )
+                    for streamer in list(self.streamers):
+                        if streamer.is_online:
+                            self.twitch.load_channel_points_context(streamer)
+
+    def remove_streamer(self, username: str) -> bool:
+        """
+        Stop mining a streamer at runtime: its PubSub topics are unsubscribed (UNLISTEN)
+        and the connections left empty are retired. Return False if the streamer is not mined.
+        """
+        streamer = self.__find_streamer(username)
+        if streamer is None:
+            return False
+
+        # The other threads iterate over a copy of the list (or search by channel_id)
+        self.streamers.remove(streamer)
+        if self.ws_pool is not None:
+            self.ws_pool.unsubmit_streamer(streamer)
+            self.__sync_user_topics()
+        if (
+            streamer.irc_chat is not None
+            and streamer.settings.chat != ChatPresence.NEVER
+        ):
+            streamer.leave_chat()
+
+        logger.info(f"Stop mining {streamer}", extra={"emoji": ":wave:"})
+        return True
+
+    def update_streamer_settings(self, username: str, **settings) -> bool:
+        """
+        Change the settings of a streamer at runtime, e.g. update_streamer_settings("xqc", follow_raid=False).
+        The PubSub topics of the features turned on are subscribed, the ones of the features turned off
+        are unsubscribed. Return False if the streamer is not mined.
+        """
+        streamer = self.__find_streamer(username)
+        if streamer is None:
+            return False
+
+        for key, value in settings.items():
+            # StreamerSettings has __slots__: an unknown setting raises AttributeError
+            setattr(streamer.settings, key, value)
+
+        if self.ws_pool is not None:
+            topics = self.__streamer_topics(streamer)
+            for topic in topics:
+                self.ws_pool.submit(topic)
+            for name in STREAMER_TOPICS:
+                topic = PubsubTopic(name, streamer=streamer)
+                if topic not in topics:
+                    self.ws_pool.unsubmit(topic)
+            self.__sync_user_topics()
+        return True
+
+    def __find_streamer(self, username):
+        username = username.lower().strip()
+        return next(
+            (streamer for streamer in self.streamers if streamer.username == username),
+            None,
+        )
+
+    @staticmethod
+    def __streamer_topics(streamer):
+        # The channel topics of a streamer, based on the features enabled in its settings
+        topics = [PubsubTopic("video-playback-by-id", streamer=streamer)]
+        if streamer.settings.follow_raid is True:
+            topics.append(PubsubTopic("raid", streamer=streamer))
+        if streamer.settings.make_predictions is True:
+            topics.append(PubsubTopic("predictions-channel-v1", streamer=streamer))
+        if streamer.settings.claim_moments is True:
+            topics.append(
+                PubsubTopic("community-moments-channel-v1", streamer=streamer)
+            )
+        if streamer.settings.community_goals is True:
+            topics.append(PubsubTopic("community-points-channel-v1", streamer=streamer))
+        return topics
+
+    def __sync_user_topics(self):
+        # predictions-user-v1 is needed only if at least one streamer makes predictions
+        topic = PubsubTopic(
+            "predictions-user-v1", user_id=self.twitch.twitch_login.get_user_id()
+        )
+        if at_least_one_value_in_settings_is(self.streamers, "make_predictions", True):
+            self.ws_pool.submit(topic)
+        else:
+            self.ws_pool.unsubmit(topic)
 
     def end(self, signum, frame):
         if not self.running:
@@ -425,24 +540,27 @@ class TwitchChannelPointsMiner:
         if self.ws_pool is not None:
             self.ws_pool.end()
 
+        if self.pubsub_recorder is not None:
+            self.pubsub_recorder.close()
+
         if self.minute_watcher_thread is not None:
             self.minute_watcher_thread.join()
 
         if self.sync_campaigns_thread is not None:
             self.sync_campaigns_thread.join()
 
-        # Check if all the mutex are unlocked.
-        # Prevent breaks of .json file
-        for streamer in self.streamers:
-            if streamer.mutex.locked():
-                streamer.mutex.acquire()
-                streamer.mutex.release()
+        # Write the pending analytics records
+        if Settings.enable_analytics is True:
+            Settings.analytics_writer.stop()
 
         self.__print_report()
 
         # Stop the queue listener to make sure all messages have been logged
         self.queue_listener.stop()
 
+        # Then give the notifiers a few seconds to send the queued notifications
+        Settings.logger.notifications.stop()
+
         sys.exit(0)
 
     def __print_report(self):
@@ -459,6 +577,21 @@ class TwitchChannelPointsMiner:
             extra={"emoji": ":hourglass:"},
         )
 
+        for name, metrics in Settings.logger.notifications.metrics().items():
+            logger.info(
+                f"{name.capitalize()} notifications: sent {metrics['sent']}, failed {metrics['failed']}, "
+                f"retried {metrics['retried']}, dropped {metrics['dropped']}, queued {metrics['queued']}, "
+                f"merged in digests {metrics['coalesced']}, rate limited {metrics['rate_limited']}",
+                extra={"emoji": ":bell:"},
+            )
+
+        for provider, latency in http_client.latency().items():
+            logger.info(
+                f"{provider.capitalize()} latency: {latency['requests']} requests, {latency['errors']} errors, "
+                f"avg {latency['avg']}ms, max {latency['max']}ms",
+                extra={"emoji": ":stopwatch:"},
+            )
+
         if not Settings.logger.less and self.events_predictions != {}:
             print("")
             for event_id in self.events_predictions:
@@ -486,7 +619,7 @@ class TwitchChannelPointsMiner:
             if self.streamers[streamer_index].history != {}:
                 gained = (
                     self.streamers[streamer_index].channel_points
-                    - self.original_streamers[streamer_index]
+                    - self.original_streamers[self.streamers[streamer_index].username]
                 )
                 
                 from colorama import Fore
@@ -504,4 +637,4 @@ class TwitchChannelPointsMiner:
                 logger.info(
                     f"{streamer_gain}\n{streamer_history}",
                     extra={"emoji": ":moneybag:"},
-                )
\ No newline at end of file
+                )
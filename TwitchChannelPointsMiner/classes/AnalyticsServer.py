@@ -1,13 +1,21 @@
+import gzip
 import json
 import logging
 import os
-from datetime import datetime
+import sqlite3
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
 from pathlib import Path
+from queue import Empty, Full, Queue
 from threading import Thread
 
-import pandas as pd
-from flask import Flask, Response, cli, render_template, request
+from flask import Flask, Response, cli, render_template, request, stream_with_context
 
+from TwitchChannelPointsMiner.classes.AnalyticsStorage import AnalyticsRollups
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
+from TwitchChannelPointsMiner.classes.LogRotation import open_log, rotated_files
 from TwitchChannelPointsMiner.classes.Settings import Settings
 from TwitchChannelPointsMiner.utils import download_file
 
@@ -15,32 +23,109 @@ cli.show_server_banner = lambda *_: None
 logger = logging.getLogger(__name__)
 
 
-def streamers_available():
-    path = Settings.analytics_path
-    return [
-        f
-        for f in os.listdir(path)
-        if os.path.isfile(os.path.join(path, f)) and f.endswith(".json")
-    ]
-
-
-def aggregate(df, freq="30Min"):
-    df_base_events = df[(df.z == "Watch") | (df.z == "Claim")]
-    df_other_events = df[(df.z != "Watch") & (df.z != "Claim")]
-
-    be = df_base_events.groupby(
-        [pd.Grouper(freq=freq, key="datetime"), "z"]).max()
-    be = be.reset_index()
+def validators(username=None):
+    """
+    (ETag, Last-Modified) of the current request, from the write version of the streamer
+    (or of all the streamers). None if the analytics summary is not loaded yet.
+    """
+    summary = Settings.analytics_writer.summary
+    if summary.loaded is False:
+        return None
+    if username is None:
+        version, modified = summary.version, summary.modified
+    else:
+        streamer = summary.get(username)
+        if streamer is None:
+            return None
+        version, modified = streamer["version"], streamer["modified"]
+    # The default endDate is today: the same url changes at midnight
+    key = zlib.crc32(f"{request.full_path}|{date.today()}".encode())
+    return f"{username or 'all'}-{summary.instance}-{version}-{key:08x}", modified
+
+
+def not_modified(validator):
+    if validator is None:
+        return None
+    etag, modified = validator
+    if request.if_none_match:
+        unchanged = request.if_none_match.contains_weak(etag)
+    else:
+        # Last-Modified is truncated to the second: a write later in the same second is newer than the date
+        unchanged = (
+            request.if_modified_since is not None
+            and modified <= request.if_modified_since.timestamp()
+        )
+    if unchanged is False:
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+    return response
+
+
+def json_response(datas, validator=None, status=200):
+    # gzip/deflate negotiated with Accept-Encoding, only if worth it
+    body = json.dumps(datas).encode("utf-8")
+    encoding = (
+        request.accept_encodings.best_match(["gzip", "deflate"])
+        if len(body) >= 1024
+        else None
+    )
+    if encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    elif encoding == "deflate":
+        body = zlib.compress(body, 6)
+
+    response = Response(body, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if encoding is not None:
+        response.content_encoding = encoding
+    if validator is not None and status == 200:
+        set_validator(response, validator)
+    return response
+
+
+def set_validator(response, validator):
+    etag, modified = validator
+    response.set_etag(etag, weak=True)
+    response.last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+    response.cache_control.no_cache = True
+
+
+def stream_json_response(chunks, validator=None):
+    # Like json_response for a generator of str, compressed chunk by chunk
+    encoding = request.accept_encodings.best_match(["gzip", "deflate"])
+
+    def compress(chunks):
+        # wbits 31: gzip container, 15: zlib (HTTP deflate)
+        compressor = zlib.compressobj(
+            6, zlib.DEFLATED, 31 if encoding == "gzip" else 15
+        )
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8"))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    response = Response(
+        chunks if encoding is None else compress(chunks),
+        status=200,
+        mimetype="application/json",
+    )
+    response.vary.add("Accept-Encoding")
+    if encoding is not None:
+        response.content_encoding = encoding
+    if validator is not None:
+        set_validator(response, validator)
+    return response
 
-    oe = df_other_events.groupby(
-        [pd.Grouper(freq=freq, key="datetime"), "z"]).max()
-    oe = oe.reset_index()
 
-    result = pd.concat([be, oe])
-    return result
+def streamers_available():
+    # The dashboard API keeps the "<username>.json" names of the old storage
+    return [f"{username}.json" for username in Settings.analytics_storage.streamers()]
 
 
-def filter_datas(start_date, end_date, datas):
+def date_range(start_date, end_date):
     # Note: https://stackoverflow.com/questions/4676195/why-do-i-need-to-multiply-unix-timestamps-by-1000-in-javascript
     start_date = (
         datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000
@@ -52,52 +137,89 @@ def filter_datas(start_date, end_date, datas):
         if end_date is not None
         else datetime.now()
     ).replace(hour=23, minute=59, second=59).timestamp() * 1000
+    return start_date, end_date
+
+
+def downsample(series, points):
+    """
+    Largest-Triangle-Three-Buckets: keep `points` points of the series (sorted by x) preserving the shape.
+    The first and the last points are always kept, the selected points are original points (with their label).
+    """
+    if points is None or points < 3 or len(series) <= points:
+        return series
+
+    sampled = [series[0]]
+    bucket_size = (len(series) - 2) / (points - 2)
+    a = 0
+    for i in range(points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average point of the next bucket
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(series))
+        next_bucket = (
+            series[next_start:next_end] if next_start < next_end else [series[-1]]
+        )
+        avg_x = sum(p["x"] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p["y"] for p in next_bucket) / len(next_bucket)
+
+        # Point of the current bucket with the largest triangle (a, point, next average)
+        ax = series[a]["x"]
+        ay = series[a]["y"]
+        max_area = -1
+        selected = start
+        for j in range(start, end):
+            area = abs(
+                (ax - avg_x) * (series[j]["y"] - ay)
+                - (ax - series[j]["x"]) * (avg_y - ay)
+            )
+            if area > max_area:
+                max_area = area
+                selected = j
+        sampled.append(series[selected])
+        a = selected
+
+    sampled.append(series[-1])
+    return sampled
+
+
+def sort_points(points, key):
+    # The storage returns the points almost always sorted: check in O(n) before sorting
+    for i in range(1, len(points)):
+        if key(points[i - 1]) > key(points[i]):
+            return sorted(points, key=key)
+    return points
 
-    original_series = datas["series"]
-
-    if "series" in datas:
-        df = pd.DataFrame(datas["series"])
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
 
-        df = df[(df.x >= start_date) & (df.x <= end_date)]
+def filter_datas(start_date, end_date, datas):
+    start_date, end_date = date_range(start_date, end_date)
 
-        datas["series"] = (
-            df.drop(columns="datetime")
-            .sort_values(by=["x", "y"], ascending=True)
-            .to_dict("records")
-        )
-    else:
-        datas["series"] = []
+    series = sort_points(
+        datas.get("series", []), key=lambda point: (point["x"], point["y"])
+    )
+    timestamps = [point["x"] for point in series]
+    first = bisect_left(timestamps, start_date)
+    last = bisect_right(timestamps, end_date)
+    datas["series"] = series[first:last]
 
     # If no data is found within the timeframe, that usually means the streamer hasn't streamed within that timeframe
     # We create a series that shows up as a straight line on the dashboard, with 'No Stream' as labels
-    if len(datas["series"]) == 0:
-        new_end_date = start_date
-        new_start_date = 0
-        df = pd.DataFrame(original_series)
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
-
-        # Attempt to get the last known balance from before the provided timeframe
-        df = df[(df.x >= new_start_date) & (df.x <= new_end_date)]
-        last_balance = df.drop(columns="datetime").sort_values(
-            by=["x", "y"], ascending=True).to_dict("records")[-1]['y']
-
-        datas["series"] = [{'x': start_date, 'y': last_balance, 'z': 'No Stream'}, {
-            'x': end_date, 'y': last_balance, 'z': 'No Stream'}]
-
-    if "annotations" in datas:
-        df = pd.DataFrame(datas["annotations"])
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
-
-        df = df[(df.x >= start_date) & (df.x <= end_date)]
-
-        datas["annotations"] = (
-            df.drop(columns="datetime")
-            .sort_values(by="x", ascending=True)
-            .to_dict("records")
-        )
-    else:
-        datas["annotations"] = []
+    if len(datas["series"]) == 0 and first > 0:
+        # The last known balance from before the provided timeframe
+        last_balance = series[first - 1]["y"]
+        datas["series"] = [
+            {"x": start_date, "y": last_balance, "z": "No Stream"},
+            {"x": end_date, "y": last_balance, "z": "No Stream"},
+        ]
+
+    annotations = sort_points(
+        datas.get("annotations", []), key=lambda annotation: annotation["x"]
+    )
+    timestamps = [annotation["x"] for annotation in annotations]
+    first = bisect_left(timestamps, start_date)
+    last = bisect_right(timestamps, end_date)
+    datas["annotations"] = annotations[first:last]
 
     return datas
 
@@ -106,12 +228,19 @@ def read_json(streamer, return_response=True):
     start_date = request.args.get("startDate", type=str)
     end_date = request.args.get("endDate", type=str)
 
-    path = Settings.analytics_path
-    streamer = streamer if streamer.endswith(".json") else f"{streamer}.json"
+    username = streamer[:-5] if streamer.endswith(".json") else streamer
+
+    validator = validators(username) if return_response else None
+    response = not_modified(validator)
+    if response is not None:
+        return response
+
+    if return_response and request.args.get("cursor") is not None:
+        return read_delta(username, request.args.get("cursor", type=str), validator)
 
     # Check if the file exists before attempting to read it
-    if not os.path.exists(os.path.join(path, streamer)):
-        error_message = f"File '{streamer}' not found."
+    if not Settings.analytics_storage.exists(username):
+        error_message = f"File '{username}.json' not found."
         logger.error(error_message)
         if return_response:
             return Response(json.dumps({"error": error_message}), status=404, mimetype="application/json")
@@ -119,10 +248,32 @@ def read_json(streamer, return_response=True):
             return {"error": error_message}
 
     try:
-        with open(os.path.join(path, streamer), 'r') as file:
-            data = json.load(file)
-    except json.JSONDecodeError as e:
-        error_message = f"Error decoding JSON in file '{streamer}': {str(e)}"
+        # Taken before the read: a delta from this cursor can repeat some records, never miss one
+        cursor = (
+            Settings.analytics_storage.cursor(username) if return_response else None
+        )
+        # The time range is pushed down to the storage
+        start, end = date_range(start_date, end_date)
+        resolution = request.args.get("resolution", type=str)
+        if (
+            resolution in AnalyticsRollups.RESOLUTIONS
+            and Settings.analytics_writer.rollups.loaded is True
+        ):
+            # Pre-aggregated series, only the annotations are read from the storage
+            data = Settings.analytics_storage.read(
+                username, start=start, end=end, keys=("annotations",)
+            )
+            data["series"] = Settings.analytics_writer.rollups.series(
+                username, resolution, start=start, end=end
+            )
+        else:
+            data = Settings.analytics_storage.read(username, start=start, end=end)
+        if data["series"] == []:
+            # Last known balance before the time range, for the 'No Stream' line
+            last = Settings.analytics_storage.last(username, start)
+            data["series"] = [] if last is None else [last]
+    except (OSError, sqlite3.Error) as e:
+        error_message = f"Error reading the analytics of '{username}': {str(e)}"
         logger.error(error_message)
         if return_response:
             return Response(json.dumps({"error": error_message}), status=500, mimetype="application/json")
@@ -131,12 +282,73 @@ def read_json(streamer, return_response=True):
 
     # Handle filtering data, if applicable
     filtered_data = filter_datas(start_date, end_date, data)
+    # Optional downsampling of the series, the annotations are kept
+    filtered_data["series"] = downsample(
+        filtered_data["series"], request.args.get("points", type=int)
+    )
     if return_response:
-        return Response(json.dumps(filtered_data), status=200, mimetype="application/json")
+        filtered_data["cursor"] = cursor
+        return json_response(filtered_data, validator)
     else:
         return filtered_data
 
 
+def read_delta(username, cursor, validator=None):
+    """
+    Records appended after the cursor returned by the previous request, and the new cursor.
+    reset=True if the cursor is not valid anymore (e.g. compacted file): the client must reload everything.
+    """
+    try:
+        delta = Settings.analytics_storage.read_since(username, cursor)
+    except (OSError, sqlite3.Error) as e:
+        error_message = f"Error reading the analytics of '{username}': {str(e)}"
+        logger.error(error_message)
+        return Response(
+            json.dumps({"error": error_message}),
+            status=500,
+            mimetype="application/json",
+        )
+
+    if delta is None:
+        return json_response(
+            {"series": [], "annotations": [], "cursor": None, "reset": True}
+        )
+    datas, cursor = delta
+    datas["series"].sort(key=lambda point: point["x"])
+    datas["annotations"].sort(key=lambda annotation: annotation["x"])
+    return json_response(dict(datas, cursor=cursor, reset=False), validator)
+
+
+def rollups(streamer):
+    username = streamer[:-5] if streamer.endswith(".json") else streamer
+    resolution = request.args.get("resolution", "1h", type=str)
+    if resolution not in AnalyticsRollups.RESOLUTIONS:
+        error_message = f"Unknown resolution '{resolution}', use one of: {', '.join(AnalyticsRollups.RESOLUTIONS)}"
+        return Response(
+            json.dumps({"error": error_message}),
+            status=400,
+            mimetype="application/json",
+        )
+
+    validator = validators(username)
+    response = not_modified(validator)
+    if response is not None:
+        return response
+
+    start, end = date_range(
+        request.args.get("startDate", type=str), request.args.get("endDate", type=str)
+    )
+    return json_response(
+        {
+            "resolution": resolution,
+            "rows": Settings.analytics_writer.rollups.rows(
+                username, resolution, start=start, end=end
+            ),
+        },
+        validator,
+    )
+
+
 def get_challenge_points(streamer):
     datas = read_json(streamer, return_response=False)
     if "series" in datas and datas["series"]:
@@ -152,19 +364,39 @@ def get_last_activity(streamer):
 
 
 def json_all():
-    return Response(
-        json.dumps(
-            [
-                {
-                    "name": streamer.strip(".json"),
-                    "data": read_json(streamer, return_response=False),
-                }
-                for streamer in streamers_available()
-            ]
-        ),
-        status=200,
-        mimetype="application/json",
-    )
+    validator = validators()
+    response = not_modified(validator)
+    if response is not None:
+        return response
+
+    names = streamers_available()
+    # Optional filter (streamers=name1,name2) and pagination (offset, limit)
+    if request.args.get("streamers") is not None:
+        wanted = [
+            name if name.endswith(".json") else f"{name}.json"
+            for name in request.args.get("streamers", type=str).split(",")
+        ]
+        names = [name for name in names if name in wanted]
+    total = len(names)
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", type=int)
+    end = None if limit is None else offset + limit
+    names = names[offset:end]
+
+    def generate():
+        # One streamer at a time: the memory doesn't depend on the number of streamers
+        yield "["
+        for index, streamer in enumerate(names):
+            datas = {
+                "name": streamer[:-5],
+                "data": read_json(streamer, return_response=False),
+            }
+            yield ("," if index > 0 else "") + json.dumps(datas)
+        yield "]"
+
+    response = stream_json_response(stream_with_context(generate()), validator)
+    response.headers["X-Total-Count"] = str(total)
+    return response
 
 
 def index(refresh=5, days_ago=7):
@@ -176,16 +408,40 @@ def index(refresh=5, days_ago=7):
 
 
 def streamers():
-    return Response(
-        json.dumps(
-            [
-                {"name": s, "points": get_challenge_points(
-                    s), "last_activity": get_last_activity(s)}
-                for s in sorted(streamers_available())
-            ]
-        ),
-        status=200,
-        mimetype="application/json",
+    summary = Settings.analytics_writer.summary
+    if summary.loaded is False:
+        # The summary is still loading, read the storage
+        return Response(
+            json.dumps(
+                [
+                    {
+                        "name": s,
+                        "points": get_challenge_points(s),
+                        "last_activity": get_last_activity(s),
+                    }
+                    for s in sorted(streamers_available())
+                ]
+            ),
+            status=200,
+            mimetype="application/json",
+        )
+
+    validator = validators()
+    response = not_modified(validator)
+    if response is not None:
+        return response
+
+    return json_response(
+        [
+            {
+                "name": f"{username}.json",
+                "points": s["points"],
+                "last_activity": s["last_activity"],
+                "reasons": s["reasons"],
+            }
+            for username, s in sorted(summary.all().items())
+        ],
+        validator,
     )
 
 
@@ -222,7 +478,116 @@ def check_assets():
                 download_assets(assets_folder, required_files)
                 break
 
-last_sent_log_index = 0
+
+def read_log(log_file_path, cursor=None, limit=64 * 1024):
+    """
+    Read the log from the cursor "<inode>:<offset>", at most `limit` bytes cut at the last complete line.
+    Without a cursor only the last `limit` bytes are sent. If the inode changes or the file is smaller
+    than the offset the file was rotated: restart from the beginning of the new file.
+    Return (text, cursor), raise FileNotFoundError.
+    """
+    tail = False
+    with open(log_file_path, "rb") as log_file:
+        stat = os.fstat(log_file.fileno())
+        try:
+            inode, offset = [int(value) for value in cursor.split(":")]
+            if inode != stat.st_ino or offset > stat.st_size:
+                offset = 0
+        except (AttributeError, ValueError):
+            offset = max(stat.st_size - limit, 0)
+            tail = offset > 0
+        log_file.seek(offset)
+        chunk = log_file.read(limit)
+
+    if tail is True:
+        # Skip the first (partial) line of the tail
+        skipped = chunk.find(b"\n") + 1
+        chunk = chunk[skipped:]
+        offset += skipped
+    # A line could be still written, a line longer than `limit` is sent anyway
+    end = chunk.rfind(b"\n") + 1
+    chunk = chunk[:end] if end > 0 else chunk
+    return (
+        chunk.decode("utf-8", errors="replace"),
+        f"{stat.st_ino}:{offset + len(chunk)}",
+    )
+
+
+def log_files(log_file_path):
+    # The current log file first, then the rotated ones from the newest (the .gz are sent decompressed)
+    files = []
+    for filename in [log_file_path] + rotated_files(log_file_path)[::-1]:
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            # Deleted by the rotation in the meantime
+            continue
+        files.append(
+            {
+                "name": os.path.basename(filename),
+                "size": size,
+                "compressed": filename.endswith(".gz"),
+            }
+        )
+    return files
+
+
+def read_rotated_log(filename, chunk_size=64 * 1024):
+    with open_log(filename) as log_file:
+        while True:
+            chunk = log_file.read(chunk_size)
+            if chunk == "":
+                break
+            yield chunk
+
+
+def stream_log(log_file_path, cursor=None, interval=1, keep_alive=15):
+    # Server-Sent Events: a message for each new chunk of lines, the id is the cursor (Last-Event-ID on reconnection)
+    idle = 0
+    while True:
+        try:
+            text, cursor = read_log(log_file_path, cursor)
+        except FileNotFoundError:
+            text = ""
+        if text != "":
+            idle = 0
+            data = "".join(f"data: {line}\n" for line in text.rstrip("\n").split("\n"))
+            yield f"id: {cursor}\n{data}\n"
+        else:
+            idle += interval
+            if idle >= keep_alive:
+                idle = 0
+                yield ": keep-alive\n\n"
+        time.sleep(interval)
+
+
+def stream_live(keep_alive=15, buffer_size=1000):
+    """
+    Server-Sent Events of the miner state changes published on the event bus (points, online/offline,
+    bets, drops, analytics records). Each client has a bounded queue: a slow client loses events, the miner never waits.
+    """
+    events = Queue(maxsize=buffer_size)
+
+    def subscriber(event, payload):
+        try:
+            events.put_nowait((event, payload))
+        except Full:
+            pass
+
+    event_bus.subscribe(subscriber)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event, payload = events.get(timeout=keep_alive)
+            except Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+    finally:
+        # The client is gone (GeneratorExit)
+        event_bus.unsubscribe(subscriber)
+
 
 class AnalyticsServer(Thread):
     def __init__(
@@ -231,7 +596,8 @@ class AnalyticsServer(Thread):
         port: int = 5000,
         refresh: int = 5,
         days_ago: int = 7,
-        username: str = None
+        username: str = None,
+        logs_file: str = None,
     ):
         super(AnalyticsServer, self).__init__()
 
@@ -243,26 +609,50 @@ class AnalyticsServer(Thread):
         self.days_ago = days_ago
         self.username = username
 
-        def generate_log():
-            global last_sent_log_index  # Use the global variable
-
-            # Get the last received log index from the client request parameters
-            last_received_index = int(request.args.get("lastIndex", last_sent_log_index))
+        log_file_path = (
+            logs_file
+            if logs_file is not None
+            else os.path.join(Path().absolute(), "logs", f"{username}.log")
+        )
 
-            logs_path = os.path.join(Path().absolute(), "logs")
-            log_file_path = os.path.join(logs_path, f"{username}.log")
+        def generate_log():
+            # A rotated file is sent entirely, /log/files has the list
+            name = request.args.get("file", type=str)
+            if name is not None and name != os.path.basename(log_file_path):
+                rotated = {os.path.basename(f): f for f in rotated_files(log_file_path)}
+                if name not in rotated:
+                    return Response(
+                        "Log file not found.", status=404, mimetype="text/plain"
+                    )
+                return Response(
+                    read_rotated_log(rotated[name]), status=200, mimetype="text/plain"
+                )
+
+            # Each client sends the cursor of its last response
             try:
-                with open(log_file_path, "r", encoding="utf-8") as log_file:
-                    log_content = log_file.read()
-
-                # Extract new log entries since the last received index
-                new_log_entries = log_content[last_received_index:]
-                last_sent_log_index = len(log_content)  # Update the last sent index
-
-                return Response(new_log_entries, status=200, mimetype="text/plain")
-
+                text, cursor = read_log(
+                    log_file_path, request.args.get("cursor", type=str)
+                )
             except FileNotFoundError:
-                return Response("Log file not found.", status=404, mimetype="text/plain")
+                return Response(
+                    "Log file not found.", status=404, mimetype="text/plain"
+                )
+            return Response(
+                text,
+                status=200,
+                mimetype="text/plain",
+                headers={"X-Log-Cursor": cursor},
+            )
+
+        def generate_log_stream():
+            cursor = request.headers.get(
+                "Last-Event-ID", request.args.get("cursor", type=str)
+            )
+            return Response(
+                stream_log(log_file_path, cursor or None),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
         self.app = Flask(
             __name__,
@@ -281,10 +671,34 @@ class AnalyticsServer(Thread):
         self.app.add_url_rule(
             "/json/<string:streamer>", "json", read_json, methods=["GET"]
         )
-        self.app.add_url_rule("/json_all", "json_all",
-                              json_all, methods=["GET"])
         self.app.add_url_rule(
-            "/log", "log", generate_log, methods=["GET"])
+            "/rollups/<string:streamer>", "rollups", rollups, methods=["GET"]
+        )
+        self.app.add_url_rule("/json_all", "json_all", json_all, methods=["GET"])
+        self.app.add_url_rule("/log", "log", generate_log, methods=["GET"])
+        self.app.add_url_rule(
+            "/log/stream", "log_stream", generate_log_stream, methods=["GET"]
+        )
+        self.app.add_url_rule(
+            "/log/files",
+            "log_files",
+            lambda: Response(
+                json.dumps(log_files(log_file_path)),
+                status=200,
+                mimetype="application/json",
+            ),
+            methods=["GET"],
+        )
+        self.app.add_url_rule(
+            "/live",
+            "live",
+            lambda: Response(
+                stream_live(),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            ),
+            methods=["GET"],
+        )
 
     def run(self):
         logger.info(
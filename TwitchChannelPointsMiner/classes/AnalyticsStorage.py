@@ -0,0 +1,894 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from bisect import bisect_left, bisect_right, insort
+from enum import Enum, auto
+from itertools import islice
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread, local
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsBackend(Enum):
+    JSONL = auto()
+    SQLITE = auto()
+
+    def __str__(self):
+        return self.name
+
+
+class JsonLinesStorage(object):
+    """
+    Append-only analytics storage, one JSON-lines file for each streamer: <analytics_path>/<username>.jsonl
+    Each line is a record ["series", {"x": ..., "y": ..., "z": ...}] or ["annotations", {"x": ..., ...}].
+    Writing a new point costs the same whatever the size of the history.
+    A background thread compacts the files: torn lines (crash while writing), duplicates and
+    unordered records are removed. Files already clean are left untouched.
+    """
+
+    EXTENSION = ".jsonl"
+
+    def __init__(self, path: str, compact_interval: int = 60 * 60, fsync: bool = False):
+        self.path = path
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        self.mutexes = {}
+        self.mutex = Lock()
+        # Number of records appended since the last compaction, for each streamer
+        self.appended = {}
+
+        self.migrate()
+
+        self.stop_event = Event()
+        self.compact_thread = None
+        if compact_interval is not None and compact_interval > 0:
+            self.compact_thread = Thread(target=self.__compact_loop)
+            self.compact_thread.daemon = True
+            self.compact_thread.name = "Analytics compaction"
+            self.compact_thread.start()
+
+    def __mutex(self, username):
+        with self.mutex:
+            if username not in self.mutexes:
+                self.mutexes[username] = Lock()
+            return self.mutexes[username]
+
+    def fname(self, username):
+        return os.path.join(self.path, f"{username}{JsonLinesStorage.EXTENSION}")
+
+    @staticmethod
+    def encode(key, data):
+        return json.dumps([key, data], separators=(",", ":")) + "\n"
+
+    def append(self, username, key, data):
+        self.append_many(username, [(key, data)])
+
+    def append_many(self, username, records):
+        lines = "".join(JsonLinesStorage.encode(key, data) for key, data in records)
+        with self.__mutex(username):
+            with open(self.fname(username), "a", encoding="utf-8") as f:
+                f.write(lines)
+                if self.fsync is True:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.appended[username] = self.appended.get(username, 0) + len(records)
+
+    def streamers(self):
+        return sorted(
+            f[: -len(JsonLinesStorage.EXTENSION)]
+            for f in os.listdir(self.path)
+            if f.endswith(JsonLinesStorage.EXTENSION)
+            and os.path.isfile(os.path.join(self.path, f))
+        )
+
+    def exists(self, username):
+        return os.path.isfile(self.fname(username))
+
+    @staticmethod
+    def parse(lines):
+        # Return the datas dict and the number of invalid lines
+        datas = {"series": [], "annotations": []}
+        invalid = 0
+        for line in lines:
+            try:
+                key, data = json.loads(line)
+                datas[key].append(data)
+            except (ValueError, KeyError, TypeError):
+                invalid += 1
+        return datas, invalid
+
+    def read(self, username, start=None, end=None, keys=("series", "annotations")):
+        """
+        Return {"series": [...], "annotations": [...]} like the old <username>.json file.
+        start and end (timestamps in ms, included) filter the records, the whole file is parsed anyway.
+        """
+        if self.exists(username) is False:
+            return {"series": [], "annotations": []}
+        with open(self.fname(username), "r", encoding="utf-8") as f:
+            datas, invalid = JsonLinesStorage.parse(f)
+        if invalid > 0:
+            logger.debug(f"Skipped {invalid} invalid lines in {self.fname(username)}")
+        if start is not None or end is not None:
+            start = 0 if start is None else start
+            end = float("inf") if end is None else end
+            for key in datas:
+                datas[key] = [data for data in datas[key] if start <= data["x"] <= end]
+        for key in datas:
+            if key not in keys:
+                datas[key] = []
+        return datas
+
+    def records(self, username):
+        """Records (key, data) of the file in order, parsed line by line: the history is never fully in memory"""
+        if self.exists(username) is False:
+            return
+        with open(self.fname(username), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    key, data = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                if key in ["series", "annotations"]:
+                    yield key, data
+
+    def cursor(self, username):
+        """
+        Position after the last complete record: "<inode>:<offset>".
+        The inode changes when the file is compacted, the cursor is then invalid.
+        """
+        if self.exists(username) is False:
+            return "0:0"
+        with open(self.fname(username), "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 64 * 1024, 0))
+            tail = f.read()
+            inode = os.fstat(f.fileno()).st_ino
+        offset = size - len(tail) + tail.rfind(b"\n") + 1
+        return f"{inode}:{offset}"
+
+    def read_since(self, username, cursor):
+        """Records appended after the cursor and the new cursor, None if the cursor is not valid anymore"""
+        try:
+            inode, offset = [int(value) for value in cursor.split(":")]
+        except ValueError:
+            return None
+        if self.exists(username) is False:
+            return ({"series": [], "annotations": []}, cursor) if offset == 0 else None
+        with open(self.fname(username), "rb") as f:
+            stat = os.fstat(f.fileno())
+            if (inode != 0 and stat.st_ino != inode) or stat.st_size < offset:
+                return None
+            f.seek(offset)
+            chunk = f.read()
+        # Only the complete lines, a record could be still written
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        datas, _ = JsonLinesStorage.parse(chunk.decode("utf-8").splitlines())
+        return datas, f"{stat.st_ino}:{offset + len(chunk)}"
+
+    def last(self, username, before):
+        """Last point of the series with x < before, None if not found"""
+        last = None
+        for data in self.read(username, end=before - 1)["series"]:
+            if last is None or data["x"] >= last["x"]:
+                last = data
+        return last
+
+    def compact(self, username):
+        fname = self.fname(username)
+        with self.__mutex(username):
+            if os.path.isfile(fname) is False:
+                return False
+            with open(fname, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            datas, invalid = JsonLinesStorage.parse(lines)
+
+            records = []
+            for key in ["series", "annotations"]:
+                seen = set()
+                for data in datas[key]:
+                    line = JsonLinesStorage.encode(key, data)
+                    if line not in seen:
+                        seen.add(line)
+                        records.append((data.get("x", 0), len(records), line))
+            records.sort()
+
+            compacted = [record[2] for record in records]
+            self.appended[username] = 0
+            if invalid == 0 and compacted == lines:
+                return False
+
+            temp_fname = fname + ".temp"
+            with open(temp_fname, "w", encoding="utf-8") as f:
+                f.writelines(compacted)
+            os.replace(temp_fname, fname)
+
+        logger.debug(
+            f"Compacted {fname}: {len(lines)} -> {len(compacted)} records, {invalid} invalid lines"
+        )
+        return True
+
+    def __compact_loop(self):
+        while self.stop_event.wait(self.compact_interval) is False:
+            for username in list(self.appended):
+                if self.appended.get(username, 0) > 0:
+                    try:
+                        self.compact(username)
+                    except Exception:
+                        logger.error(
+                            f"Unable to compact the analytics of {username}",
+                            exc_info=True,
+                        )
+
+    def migrate(self):
+        # Convert the old <username>.json files (read-modify-write) to the append-only format
+        for f in sorted(os.listdir(self.path)):
+            if f.endswith(".json") and os.path.isfile(os.path.join(self.path, f)):
+                migrate_json_file(os.path.join(self.path, f))
+
+    def close(self):
+        self.stop_event.set()
+
+
+class SQLiteStorage(object):
+    """
+    Analytics storage in a single SQLite database (WAL mode): <analytics_path>/analytics.db
+    The series and the annotations tables are indexed on (streamer, ts), the time range of
+    read() is pushed down to the query: the cost depends on the rows returned, not on the history.
+    The writes are serialized on a single connection, each reader thread has its own connection.
+    """
+
+    FILENAME = "analytics.db"
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.fname = os.path.join(path, SQLiteStorage.FILENAME)
+        self.mutex = Lock()
+        self.readers = local()
+
+        self.connection = self.__connect()
+        with self.mutex, self.connection:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS series (
+                    streamer TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    balance INTEGER,
+                    reason TEXT
+                );
+                CREATE INDEX IF NOT EXISTS series_streamer_ts ON series (streamer, ts);
+                CREATE TABLE IF NOT EXISTS annotations (
+                    streamer TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS annotations_streamer_ts ON annotations (streamer, ts);
+                CREATE TABLE IF NOT EXISTS imports (
+                    file TEXT PRIMARY KEY,
+                    ts INTEGER NOT NULL
+                );
+                """
+            )
+
+        self.migrate()
+
+    def __connect(self):
+        connection = sqlite3.connect(self.fname, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs at checkpoints: a crash can lose the last commits, not corrupt the db.
+        # FULL syncs the WAL at each commit (each batch)
+        connection.execute(
+            f"PRAGMA synchronous={'FULL' if self.fsync is True else 'NORMAL'}"
+        )
+        return connection
+
+    def __reader(self):
+        if getattr(self.readers, "connection", None) is None:
+            self.readers.connection = self.__connect()
+        return self.readers.connection
+
+    def append(self, username, key, data):
+        self.append_many(username, [(key, data)])
+
+    def append_many(self, username, records, imported=None):
+        series = []
+        annotations = []
+        for key, data in records:
+            if key == "series":
+                series.append((username, data["x"], data.get("y"), data.get("z")))
+            else:
+                annotation = {k: v for k, v in data.items() if k != "x"}
+                annotations.append(
+                    (username, data["x"], json.dumps(annotation, separators=(",", ":")))
+                )
+        # A single transaction for the whole batch
+        with self.mutex, self.connection:
+            if series != []:
+                self.connection.executemany(
+                    "INSERT INTO series (streamer, ts, balance, reason) VALUES (?, ?, ?, ?)",
+                    series,
+                )
+            if annotations != []:
+                self.connection.executemany(
+                    "INSERT INTO annotations (streamer, ts, data) VALUES (?, ?, ?)",
+                    annotations,
+                )
+            if imported is not None:
+                # Committed with the rows: a file is never imported twice, even after a crash
+                self.connection.execute(
+                    "INSERT INTO imports (file, ts) VALUES (?, ?)",
+                    (imported, int(time.time())),
+                )
+
+    def streamers(self):
+        rows = self.__reader().execute(
+            "SELECT DISTINCT streamer FROM series UNION SELECT DISTINCT streamer FROM annotations"
+        )
+        return sorted(row[0] for row in rows)
+
+    def exists(self, username):
+        return (
+            self.__reader()
+            .execute(
+                "SELECT 1 FROM series WHERE streamer = ? UNION ALL "
+                "SELECT 1 FROM annotations WHERE streamer = ? LIMIT 1",
+                (username, username),
+            )
+            .fetchone()
+            is not None
+        )
+
+    @staticmethod
+    def point(row):
+        data = {"x": row[0], "y": row[1]}
+        if row[2] is not None:
+            data["z"] = row[2]
+        return data
+
+    def read(self, username, start=None, end=None, keys=("series", "annotations")):
+        start = 0 if start is None else start
+        end = 2**63 - 1 if end is None else end
+        connection = self.__reader()
+        series = (
+            connection.execute(
+                "SELECT ts, balance, reason FROM series "
+                "WHERE streamer = ? AND ts BETWEEN ? AND ? ORDER BY ts, rowid",
+                (username, start, end),
+            )
+            if "series" in keys
+            else []
+        )
+        annotations = (
+            connection.execute(
+                "SELECT ts, data FROM annotations "
+                "WHERE streamer = ? AND ts BETWEEN ? AND ? ORDER BY ts, rowid",
+                (username, start, end),
+            )
+            if "annotations" in keys
+            else []
+        )
+        return {
+            "series": [SQLiteStorage.point(row) for row in series],
+            "annotations": [
+                dict(x=row[0], **json.loads(row[1])) for row in annotations
+            ],
+        }
+
+    def summary(self, username):
+        """
+        Same values of AnalyticsSummary.update() with all the records, computed by aggregate queries.
+        The points gained are the difference with the previous balance (window functions, SQLite >= 3.25).
+        """
+        connection = self.__reader()
+        series, last_activity = connection.execute(
+            "SELECT COUNT(*), MAX(ts) FROM series WHERE streamer = ?", (username,)
+        ).fetchone()
+        points = connection.execute(
+            "SELECT balance FROM series WHERE streamer = ? ORDER BY ts DESC, rowid DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+        reasons = connection.execute(
+            "SELECT reason, SUM(gained) FROM ("
+            "SELECT reason, balance - LAG(balance) OVER (ORDER BY ts, rowid) AS gained "
+            "FROM series WHERE streamer = ?"
+            ") WHERE gained IS NOT NULL AND reason IS NOT NULL GROUP BY reason",
+            (username,),
+        )
+        annotations = connection.execute(
+            "SELECT COUNT(*) FROM annotations WHERE streamer = ?", (username,)
+        ).fetchone()[0]
+        return {
+            "points": 0 if points is None else points[0],
+            "last_activity": last_activity or 0,
+            "series": series,
+            "annotations": annotations,
+            "reasons": dict(reasons.fetchall()),
+        }
+
+    def rollups(self, username, size):
+        """
+        Same rows of AnalyticsRollups.update() with all the series, for buckets of size ms:
+        [[bucket, open, high, low, close, {reason: gained}], ...] sorted by bucket.
+        """
+        points = (
+            "WITH points AS ("
+            "SELECT ts - ts % :size AS bucket, balance, reason, "
+            "balance - LAG(balance) OVER (ORDER BY ts, rowid) AS gained, "
+            "ROW_NUMBER() OVER (PARTITION BY ts - ts % :size ORDER BY ts, rowid) AS first, "
+            "ROW_NUMBER() OVER (PARTITION BY ts - ts % :size ORDER BY ts DESC, rowid DESC) AS last "
+            "FROM series WHERE streamer = :streamer) "
+        )
+        parameters = {"size": size, "streamer": username}
+        connection = self.__reader()
+        rows = {
+            row[0]: list(row) + [{}]
+            for row in connection.execute(
+                points + "SELECT bucket, MAX(CASE WHEN first = 1 THEN balance END), "
+                "MAX(balance), MIN(balance), MAX(CASE WHEN last = 1 THEN balance END) "
+                "FROM points GROUP BY bucket",
+                parameters,
+            )
+        }
+        for bucket, reason, gained in connection.execute(
+            points + "SELECT bucket, reason, SUM(gained) FROM points "
+            "WHERE gained != 0 AND reason IS NOT NULL GROUP BY bucket, reason",
+            parameters,
+        ):
+            rows[bucket][5][reason] = gained
+        return [rows[bucket] for bucket in sorted(rows)]
+
+    def last(self, username, before):
+        row = (
+            self.__reader()
+            .execute(
+                "SELECT ts, balance, reason FROM series WHERE streamer = ? AND ts < ? "
+                "ORDER BY ts DESC, rowid DESC LIMIT 1",
+                (username, before),
+            )
+            .fetchone()
+        )
+        return None if row is None else SQLiteStorage.point(row)
+
+    def cursor(self, username):
+        # Last rowid of both the tables: "<series>:<annotations>"
+        connection = self.__reader()
+        series = connection.execute("SELECT MAX(rowid) FROM series").fetchone()[0]
+        annotations = connection.execute(
+            "SELECT MAX(rowid) FROM annotations"
+        ).fetchone()[0]
+        return f"{series or 0}:{annotations or 0}"
+
+    def read_since(self, username, cursor):
+        try:
+            series_rowid, annotations_rowid = [
+                int(value) for value in cursor.split(":")
+            ]
+        except ValueError:
+            return None
+        connection = self.__reader()
+        # Single read transaction: the rows and the new cursor are consistent
+        with connection:
+            connection.execute("BEGIN")
+            series = connection.execute(
+                "SELECT ts, balance, reason, rowid FROM series WHERE rowid > ? AND streamer = ? ORDER BY rowid",
+                (series_rowid, username),
+            ).fetchall()
+            annotations = connection.execute(
+                "SELECT ts, data, rowid FROM annotations WHERE rowid > ? AND streamer = ? ORDER BY rowid",
+                (annotations_rowid, username),
+            ).fetchall()
+            cursor = self.cursor(username)
+        return {
+            "series": [SQLiteStorage.point(row) for row in series],
+            "annotations": [
+                dict(x=row[0], **json.loads(row[1])) for row in annotations
+            ],
+        }, cursor
+
+    def migrate(self):
+        # Import the files of the other formats, they are renamed to .bak
+        for f in sorted(os.listdir(self.path)):
+            fname = os.path.join(self.path, f)
+            if os.path.isfile(fname) is False:
+                continue
+            if (
+                f.endswith(".json") is False
+                and f.endswith(JsonLinesStorage.EXTENSION) is False
+            ):
+                continue
+
+            # Same name, size and mtime: the file was imported, but not renamed (crash in between)
+            stat = os.stat(fname)
+            imported = f"{f}:{stat.st_size}:{int(stat.st_mtime)}"
+            if (
+                self.__reader()
+                .execute("SELECT 1 FROM imports WHERE file = ?", (imported,))
+                .fetchone()
+                is not None
+            ):
+                os.replace(fname, fname + ".bak")
+                continue
+
+            try:
+                if f.endswith(".json"):
+                    with open(fname, "r", encoding="utf-8") as file:
+                        datas = json.load(file)
+                    username = f[: -len(".json")]
+                elif f.endswith(JsonLinesStorage.EXTENSION):
+                    with open(fname, "r", encoding="utf-8") as file:
+                        datas, _ = JsonLinesStorage.parse(file)
+                    username = f[: -len(JsonLinesStorage.EXTENSION)]
+                else:
+                    continue
+            except (ValueError, OSError) as e:
+                logger.error(f"Unable to import the analytics file {fname}: {e}")
+                continue
+
+            self.append_many(
+                username,
+                [
+                    (key, data)
+                    for key in ["series", "annotations"]
+                    for data in datas.get(key, [])
+                ],
+                imported=imported,
+            )
+            os.replace(fname, fname + ".bak")
+            logger.info(
+                f"Imported {fname} in {self.fname} ({len(datas.get('series', []))} points, "
+                f"{len(datas.get('annotations', []))} annotations)"
+            )
+
+    def close(self):
+        with self.mutex:
+            self.connection.close()
+
+
+def create_storage(backend, path, fsync=False):
+    if backend == AnalyticsBackend.SQLITE:
+        return SQLiteStorage(path, fsync=fsync)
+    return JsonLinesStorage(path, fsync=fsync)
+
+
+class AnalyticsSummary(object):
+    """
+    In-memory summary of each streamer: latest balance, last activity, number of points
+    and points gained/lost for each reason. Updated with each batch written by AnalyticsWriter,
+    /streamers is served without reading the storage.
+    The write version of each streamer changes with each batch, it's used as ETag by AnalyticsServer.
+    """
+
+    def __init__(self):
+        self.streamers = {}
+        self.mutex = Lock()
+        self.loaded = False
+        # Write version and time of the last write, of all the streamers (HTTP validators)
+        self.version = 0
+        self.modified = time.time()
+        # The versions restart from 0 at every start: the ETags include this id, unique for each process
+        self.instance = f"{int(time.time() * 1000000):x}"
+
+    def update(self, username, records):
+        with self.mutex:
+            if username not in self.streamers:
+                self.streamers[username] = {
+                    "points": 0,
+                    "last_activity": 0,
+                    "series": 0,
+                    "annotations": 0,
+                    "reasons": {},
+                    "version": 0,
+                    "modified": 0,
+                }
+            summary = self.streamers[username]
+            self.version += 1
+            self.modified = time.time()
+            summary["version"] = self.version
+            summary["modified"] = self.modified
+            for key, data in records:
+                if key != "series":
+                    summary["annotations"] += 1
+                    continue
+                if summary["series"] > 0 and "z" in data:
+                    gained = data["y"] - summary["points"]
+                    summary["reasons"][data["z"]] = (
+                        summary["reasons"].get(data["z"], 0) + gained
+                    )
+                summary["series"] += 1
+                summary["points"] = data["y"]
+                summary["last_activity"] = max(summary["last_activity"], data["x"])
+
+    def load(self, username, summary):
+        # Summary of the whole history computed by the storage (SQLiteStorage.summary)
+        with self.mutex:
+            self.version += 1
+            self.streamers[username] = dict(
+                summary, version=self.version, modified=self.modified
+            )
+
+    def get(self, username):
+        with self.mutex:
+            if username not in self.streamers:
+                return None
+            summary = self.streamers[username]
+            return dict(summary, reasons=dict(summary["reasons"]))
+
+    def all(self):
+        with self.mutex:
+            return {
+                username: dict(summary, reasons=dict(summary["reasons"]))
+                for username, summary in self.streamers.items()
+            }
+
+
+class AnalyticsRollups(object):
+    """
+    Time-bucket rollups of the series for each streamer, at 5 minutes, 1 hour and 1 day (UTC):
+    open/high/low/close balance and points gained/lost for each reason.
+    Updated with each batch written by AnalyticsWriter, the long ranges of the dashboard
+    read these rows instead of the raw points. The 5 minutes buckets are kept for RETENTION.
+    """
+
+    RESOLUTIONS = {"5m": 5 * 60 * 1000, "1h": 60 * 60 * 1000, "1d": 24 * 60 * 60 * 1000}
+    RETENTION = {"5m": 31 * 24 * 60 * 60 * 1000, "1h": None, "1d": None}
+
+    def __init__(self):
+        # {username: {resolution: ([bucket, ...] sorted, {bucket: [open, high, low, close, {reason: gained}]})}}
+        self.streamers = {}
+        # Last balance of each streamer, the points gained are computed from it
+        self.balances = {}
+        self.mutex = Lock()
+        self.loaded = False
+
+    def update(self, username, records):
+        with self.mutex:
+            if username not in self.streamers:
+                self.streamers[username] = {
+                    resolution: ([], {}) for resolution in AnalyticsRollups.RESOLUTIONS
+                }
+            rollups = self.streamers[username]
+            for key, data in records:
+                if key != "series":
+                    continue
+                x, y = data["x"], data["y"]
+                gained = y - self.balances[username] if username in self.balances else 0
+                self.balances[username] = y
+                for resolution, size in AnalyticsRollups.RESOLUTIONS.items():
+                    buckets, rows = rollups[resolution]
+                    bucket = x - x % size
+                    if bucket not in rows:
+                        rows[bucket] = [y, y, y, y, {}]
+                        if buckets == [] or bucket > buckets[-1]:
+                            buckets.append(bucket)
+                        else:
+                            insort(buckets, bucket)
+                        self.__prune(resolution, buckets, rows)
+                        if bucket not in rows:
+                            continue  # Older than the retention
+                    row = rows[bucket]
+                    row[1] = max(row[1], y)
+                    row[2] = min(row[2], y)
+                    row[3] = y
+                    if gained != 0 and "z" in data:
+                        row[4][data["z"]] = row[4].get(data["z"], 0) + gained
+
+    def load(self, username, resolution, rows, balance):
+        # Rows of the whole history computed by the storage (SQLiteStorage.rollups), sorted by bucket
+        with self.mutex:
+            if username not in self.streamers:
+                self.streamers[username] = {
+                    resolution: ([], {}) for resolution in AnalyticsRollups.RESOLUTIONS
+                }
+            buckets = [row[0] for row in rows]
+            rows = {row[0]: row[1:] for row in rows}
+            if buckets != []:
+                self.__prune(resolution, buckets, rows)
+            self.streamers[username][resolution] = (buckets, rows)
+            if balance is not None:
+                self.balances[username] = balance
+
+    @staticmethod
+    def __prune(resolution, buckets, rows):
+        retention = AnalyticsRollups.RETENTION[resolution]
+        if retention is not None:
+            index = bisect_left(buckets, buckets[-1] - retention)
+            for bucket in buckets[:index]:
+                del rows[bucket]
+            del buckets[:index]
+
+    def rows(self, username, resolution, start=None, end=None):
+        with self.mutex:
+            if username not in self.streamers:
+                return []
+            buckets, rows = self.streamers[username][resolution]
+            first = 0 if start is None else bisect_left(buckets, start)
+            last = len(buckets) if end is None else bisect_right(buckets, end)
+            return [
+                {
+                    "x": bucket,
+                    "open": rows[bucket][0],
+                    "high": rows[bucket][1],
+                    "low": rows[bucket][2],
+                    "close": rows[bucket][3],
+                    "gains": dict(rows[bucket][4]),
+                }
+                for bucket in buckets[first:last]
+            ]
+
+    def series(self, username, resolution, start=None, end=None):
+        # A point for each bucket (close balance), labelled with the reason of the largest gain
+        return [
+            {
+                "x": row["x"],
+                "y": row["close"],
+                "z": max(row["gains"], key=lambda reason: abs(row["gains"][reason]))
+                if row["gains"] != {}
+                else "Watch",
+            }
+            for row in self.rows(username, resolution, start=start, end=end)
+        ]
+
+
+class AnalyticsWriter(Thread):
+    """
+    Write-behind buffer for the analytics: append() only puts the record in a bounded queue,
+    this thread writes the records in batches every flush_interval seconds or flush_size records.
+    When the queue is full append() blocks until the writer catches up (backpressure).
+    stop() writes all the pending records and closes the storage.
+    """
+
+    STOP = object()
+    # Records of a JSON-lines file given to the indexes at once by __load()
+    LOAD_CHUNK = 10000
+
+    def __init__(
+        self,
+        storage,
+        flush_interval: float = 5,
+        flush_size: int = 500,
+        buffer_size: int = 10000,
+    ):
+        super(AnalyticsWriter, self).__init__()
+        self.daemon = True
+        self.name = "Analytics writer"
+
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.queue = Queue(maxsize=buffer_size)
+        self.written = 0
+        self.summary = AnalyticsSummary()
+        self.rollups = AnalyticsRollups()
+        # Updated with each batch
+        self.indexes = [self.summary, self.rollups]
+
+    def append(self, username, key, data):
+        try:
+            self.queue.put_nowait((username, key, data))
+        except Full:
+            logger.warning(
+                f"Analytics buffer full ({self.queue.maxsize} records), waiting for the writer"
+            )
+            self.queue.put((username, key, data))
+
+    def on_event(self, event, payload):
+        # Subscriber of the event bus: Streamer publishes the analytics records
+        if event in ["series", "annotations"]:
+            self.append(payload["streamer"], event, payload["data"])
+
+    def __load(self):
+        # Full scan of the storage, only once at startup. Never the whole history of a streamer in memory:
+        # aggregate queries on SQLite, the JSON-lines files are streamed in chunks
+        started = time.time()
+        for username in self.storage.streamers():
+            if isinstance(self.storage, SQLiteStorage):
+                summary = self.storage.summary(username)
+                self.summary.load(username, summary)
+                for resolution, size in AnalyticsRollups.RESOLUTIONS.items():
+                    self.rollups.load(
+                        username,
+                        resolution,
+                        self.storage.rollups(username, size),
+                        summary["points"] if summary["series"] > 0 else None,
+                    )
+                continue
+            records = self.storage.records(username)
+            chunk = list(islice(records, AnalyticsWriter.LOAD_CHUNK))
+            while chunk != []:
+                for index in self.indexes:
+                    index.update(username, chunk)
+                chunk = list(islice(records, AnalyticsWriter.LOAD_CHUNK))
+        for index in self.indexes:
+            index.loaded = True
+        logger.debug(
+            f"Loaded the analytics summary and rollups of {len(self.summary.streamers)} streamers "
+            f"in {round(time.time() - started, 2)}s"
+        )
+
+    def run(self):
+        # Before the first batch: the indexes see each record exactly once
+        try:
+            self.__load()
+        except Exception:
+            logger.error("Unable to load the analytics summary", exc_info=True)
+
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            try:
+                record = self.queue.get(timeout=timeout)
+            except Empty:
+                record = None
+
+            if record is AnalyticsWriter.STOP:
+                self.__flush(batch)
+                break
+            if record is not None:
+                batch.append(record)
+                if deadline is None:
+                    deadline = time.time() + self.flush_interval
+
+            if batch != [] and (
+                len(batch) >= self.flush_size or time.time() >= deadline
+            ):
+                self.__flush(batch)
+                batch = []
+                deadline = None
+
+    def __flush(self, batch):
+        streamers = {}
+        for username, key, data in batch:
+            streamers.setdefault(username, []).append((key, data))
+        for username in streamers:
+            try:
+                self.storage.append_many(username, streamers[username])
+                self.written += len(streamers[username])
+                for index in self.indexes:
+                    index.update(username, streamers[username])
+            except Exception:
+                logger.error(
+                    f"Unable to write {len(streamers[username])} analytics records of {username}",
+                    exc_info=True,
+                )
+
+    def stop(self):
+        if self.is_alive() is True:
+            self.queue.put(AnalyticsWriter.STOP)
+            self.join()
+        self.storage.close()
+
+
+def migrate_json_file(fname):
+    """
+    Convert <username>.json to <username>.jsonl, the original file is renamed <username>.json.bak.
+    Records already present in the .jsonl file are kept after the migrated ones.
+    """
+    started = time.time()
+    try:
+        with open(fname, "r", encoding="utf-8") as f:
+            datas = json.load(f)
+    except (ValueError, OSError) as e:
+        logger.error(f"Unable to migrate the analytics file {fname}: {e}")
+        return False
+
+    jsonl_fname = os.path.splitext(fname)[0] + JsonLinesStorage.EXTENSION
+    temp_fname = jsonl_fname + ".temp"
+    with open(temp_fname, "w", encoding="utf-8") as f:
+        for key in ["series", "annotations"]:
+            for data in datas.get(key, []):
+                f.write(JsonLinesStorage.encode(key, data))
+        if os.path.isfile(jsonl_fname):
+            with open(jsonl_fname, "r", encoding="utf-8") as current:
+                f.writelines(current)
+    os.replace(temp_fname, jsonl_fname)
+    os.replace(fname, fname + ".bak")
+
+    logger.info(
+        f"Migrated {fname} to {jsonl_fname} ({len(datas.get('series', []))} points, "
+        f"{len(datas.get('annotations', []))} annotations) in {round(time.time() - started, 2)}s"
+    )
+    return True
@@ -5,8 +5,9 @@ from threading import Thread
 
 from irc.bot import SingleServerIRCBot
 
-from TwitchChannelPointsMiner.constants import IRC, IRC_PORT
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
 from TwitchChannelPointsMiner.classes.Settings import Events, Settings
+from TwitchChannelPointsMiner.constants import IRC, IRC_PORT
 
 logger = logging.getLogger(__name__)
 
@@ -72,8 +73,15 @@ class ClientIRC(SingleServerIRCBot):
             nick = event.source.split("!", 1)[0]
             # chan = event.target
 
-            logger.info(f"{nick} at {self.channel} wrote: {msg}", extra={
-                        "emoji": ":speech_balloon:", "event": Events.CHAT_MENTION})
+            event_bus.publish(
+                Events.CHAT_MENTION,
+                origin=f"{__name__}.on_pubmsg",
+                message=f"{nick} at {self.channel} wrote: {msg}",
+                emoji=":speech_balloon:",
+                streamer=self.channel.lstrip("#"),
+                nickname=nick,
+                text=msg,
+            )
     # """
 
 
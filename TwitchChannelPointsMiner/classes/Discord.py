@@ -1,205 +1,10 @@
-import re
-import time
 from textwrap import dedent
 from typing import Dict, Optional, Any
-from functools import lru_cache
-
-import requests
 
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
+from TwitchChannelPointsMiner.classes.ProfileCache import profile_cache
 from TwitchChannelPointsMiner.classes.Settings import Events
-
-
-class EventParser:
-    """Parser für verschiedene Event-Message-Typen"""
-    
-    @staticmethod
-    def parse_streamer_status(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Streamer Online/Offline Messages"""
-        pattern = r"Streamer\(username=([^,]+),.*channel_points=([^)]+)\) is (Online|Offline)!"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'username': match.group(1),
-                'channel_points': match.group(2),
-                'status': match.group(3).lower()
-            }
-        return None
-
-    @staticmethod
-    def parse_points_gain(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Channel Points Gewinne (+X → Streamer...)"""
-        pattern = r"[+](\d+) → Streamer\(username=([^,]+),.*channel_points=([^)]+)\) - Reason: (\w+)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'gained': int(match.group(1)),
-                'username': match.group(2),
-                'channel_points': match.group(3),
-                'reason': match.group(4)
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_result(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Bet Ergebnisse (WIN/LOSE)"""
-        if "Result: WIN" in message:
-            gained_match = re.search(r'Gained: \+([^,)]+)', message)
-            username_match = re.search(r'username=([^,]+)', message)
-            points_match = re.search(r'channel_points=([^)]+)', message)
-            
-            if all([gained_match, username_match, points_match]):
-                return {
-                    'result': 'win',
-                    'gained': gained_match.group(1),
-                    'username': username_match.group(1),
-                    'channel_points': points_match.group(1)
-                }
-        elif "Result: LOSE" in message:
-            lost_match = re.search(r'Lost: \-([^,)]+)', message)
-            username_match = re.search(r'username=([^,]+)', message)
-            points_match = re.search(r'channel_points=([^)]+)', message)
-            
-            if all([lost_match, username_match, points_match]):
-                return {
-                    'result': 'lose',
-                    'lost': lost_match.group(1),
-                    'username': username_match.group(1),
-                    'channel_points': points_match.group(1)
-                }
-        return None
-
-    @staticmethod
-    def parse_raid_join(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Raid Events"""
-        pattern = r"Joining raid from Streamer\(username=([^,]+),.*\) to ([^!]+)!"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'from_username': match.group(1),
-                'to_username': match.group(2)
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_start(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Bet Start Events"""
-        pattern = r"Place the bet after: ([^s]+)s for: EventPrediction.*username=([^,]+).*title=([^)]+)\)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'wait_time': match.group(1),
-                'username': match.group(2),
-                'title': match.group(3)
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_filter(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Bet Filter Messages (zu wenig Points)"""
-        pattern = r"Streamer\(username=([^,]+),.*channel_points=([^)]+)\) have only (\d+) channel points and the minimum for bet is: (\d+)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'username': match.group(1),
-                'channel_points': match.group(2),
-                'current_points': int(match.group(3)),
-                'minimum_points': int(match.group(4))
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_refund(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Bet Refund Messages"""
-        # Pattern für: EventPrediction(...username=X...title=Y...) - Decision: Z - Result: REFUND, Refunded: +0
-        pattern = r"EventPrediction\(.*username=([^,]+),.*title=([^)]+)\).*Decision:\s*(\d+):\s*([^-]+)\s*-\s*Result:\s*REFUND"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'username': match.group(1),
-                'title': match.group(2),
-                'decision': match.group(3),
-                'decision_text': match.group(4).strip(),
-                'result': 'refund'
-            }
-        return None
-
-    @staticmethod
-    def parse_drop_claim(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Drop Claim Events"""
-        # Pattern für: 📦 Claim Drop(id=X, name=Y, benefit=Z, minutes_required=A, has_preconditions_met=B, current_minutes_watched=C, percentage_progress=D%, drop_instance_id=E, is_claimed=F)
-        pattern = r"📦\s+Claim Drop\(id=([^,]+),\s*name=([^,]+),\s*benefit=([^,]+),\s*minutes_required=(\d+),\s*has_preconditions_met=(\w+),\s*current_minutes_watched=(\d+),\s*percentage_progress=([^%]+)%,\s*drop_instance_id=([^,]+),\s*is_claimed=(\w+)\)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'drop_id': match.group(1),
-                'name': match.group(2),
-                'benefit': match.group(3),
-                'minutes_required': int(match.group(4)),
-                'preconditions_met': match.group(5) == 'True',
-                'current_minutes': int(match.group(6)),
-                'percentage': match.group(7),
-                'instance_id': match.group(8),
-                'is_claimed': match.group(9) == 'True'
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_going_to_complete(message: str) -> Optional[Dict[str, Any]]:
-        """Parst 'Going to complete bet' Messages"""
-        # Pattern für: 🍀 Going to complete bet for EventPrediction(event_id=X, streamer=Streamer(username=Y, channel_id=Z, channel_points=A), title=B)
-        pattern = r"🍀\s+Going to complete bet for EventPrediction\(event_id=([^,]+),\s*streamer=Streamer\(username=([^,]+),\s*channel_id=([^,]+),\s*channel_points=([^)]+)\),\s*title=([^)]+)\)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'event_id': match.group(1),
-                'username': match.group(2),
-                'channel_id': match.group(3),
-                'channel_points': match.group(4),
-                'title': match.group(5)
-            }
-        return None
-
-    @staticmethod
-    def parse_bet_placement(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Bet Placement Messages"""
-        # Pattern für: 🍀 Place 5k channel points on: SCHWEINEAIM OLDIES (BLUE), Points: 2M, Users: 59 (67.05%), Odds: 1.52 (65.79%)
-        pattern = r"🍀\s+Place\s+([^\s]+)\s+channel points on:\s+([^,]+),\s+Points:\s+([^,]+),\s+Users:\s+(\d+)\s+\(([^%]+)%\),\s+Odds:\s+([^\s]+)\s+\(([^%]+)%\)"
-        match = re.search(pattern, message)
-        if match:
-            return {
-                'bet_amount': match.group(1),
-                'choice': match.group(2),
-                'total_points': match.group(3),
-                'users_count': int(match.group(4)),
-                'users_percentage': match.group(5),
-                'odds': match.group(6),
-                'odds_percentage': match.group(7)
-            }
-        return None
-
-    @staticmethod
-    def parse_chat_message(message: str) -> Optional[Dict[str, Any]]:
-        """Parst Chat Messages"""
-        # Pattern für: 💬 username at #channel wrote: message
-        pattern1 = r"💬\s+([^\s]+)\s+at\s+#([^\s]+)\s+wrote:\s*(.+)"
-        match1 = re.search(pattern1, message)
-        if match1:
-            return {
-                'username': match1.group(1),
-                'channel': match1.group(2),
-                'content': match1.group(3)
-            }
-        
-        # Fallback Pattern für: 💬 username in #channel: message
-        pattern2 = r"💬\s+([^\s]+)\s+in\s+#([^\s]+):\s*(.+)"
-        match2 = re.search(pattern2, message)
-        if match2:
-            return {
-                'username': match2.group(1),
-                'channel': match2.group(2),
-                'content': match2.group(3)
-            }
-        return None
+from TwitchChannelPointsMiner.utils import _millify
 
 
 class DiscordEmbedBuilder:
@@ -224,17 +29,21 @@ class DiscordEmbedBuilder:
     @staticmethod
     def create_base_embed(username: str, title: str, color: str) -> Dict[str, Any]:
         """Erstellt Basis Embed Structure"""
-        return {
+        embed = {
             "username": "Twitch Channel Points Miner",
             "avatar_url": "https://i.imgur.com/X9fEkhT.png",
             "embeds": [{
                 "title": title,
                 "url": f"https://twitch.tv/{username}",
                 "color": DiscordEmbedBuilder.COLORS.get(color, 0x708090),
-                "thumbnail": {"url": get_streamer_icon_cached(username)},
                 "fields": []
             }]
         }
+        # Blockiert nie: fehlt das Avatar noch, wird es im Hintergrund geladen und das Embed hat kein Thumbnail
+        icon_url = profile_cache.avatar(username)
+        if icon_url is not None:
+            embed["embeds"][0]["thumbnail"] = {"url": icon_url}
+        return embed
 
     @staticmethod
     def add_field(embed: Dict[str, Any], name: str, value: str, inline: bool = False):
@@ -314,9 +123,6 @@ class DiscordEmbedBuilder:
         embed["embeds"][0]["description"] = f"**+{data['gained']} Points** 📺\n💰 Total: **{data['channel_points']}**"
         embed["embeds"][0]["color"] = 0x4a90e2  # Schönes Blau
         
-        # Kleineres Thumbnail für weniger Platz
-        embed["embeds"][0]["thumbnail"] = {"url": get_streamer_icon_cached(data['username'])}
-        
         return embed
 
     @staticmethod
@@ -551,9 +357,8 @@ class DiscordEmbedBuilder:
     @staticmethod
     def create_bet_placement_embed(data: Dict[str, Any]) -> Dict[str, Any]:
         """Erstellt Bet Placement Embed"""
-        # Username aus vorherigem Context verwenden oder "Unknown"
-        username = "twitch"  # Fallback
-        
+        username = data.get("username") or "twitch"  # Fallback
+
         embed = DiscordEmbedBuilder.create_base_embed(
             username,
             f"🎲 Bet platziert - {data['bet_amount']} Points!",
@@ -574,9 +379,8 @@ class DiscordEmbedBuilder:
         
         # Potential Winnings berechnen
         try:
-            bet_amount_clean = data['bet_amount'].replace('k', '000').replace('K', '000')
-            bet_amount_num = float(bet_amount_clean)
-            odds_num = float(data['odds'])
+            bet_amount_num = float(data["amount"])
+            odds_num = float(data["odds"])
             potential_win = int(bet_amount_num * odds_num)
             DiscordEmbedBuilder.add_field(embed, "🏆 Möglicher Gewinn", f"~{potential_win:,} Points", True)
         except:
@@ -586,163 +390,200 @@ class DiscordEmbedBuilder:
         
         return embed
 
+    @staticmethod
+    def from_event(event, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Erstellt das Embed aus den strukturierten Daten des Events (EventBus), None = einfache Nachricht"""
+        username = payload.get("streamer")
+        channel_points = (
+            _millify(payload["balance"]) if payload.get("balance") is not None else None
+        )
 
-# Icon Caching mit TTL
-_icon_cache = {}
-_cache_ttl = 3600  # 1 Stunde
+        if event == Events.STREAMER_ONLINE:
+            return DiscordEmbedBuilder.create_online_embed(
+                {"username": username, "channel_points": channel_points}
+            )
 
+        if event == Events.STREAMER_OFFLINE:
+            return DiscordEmbedBuilder.create_offline_embed(
+                {"username": username, "channel_points": channel_points}
+            )
+
+        if event in [
+            Events.GAIN_FOR_WATCH,
+            Events.GAIN_FOR_CLAIM,
+            Events.GAIN_FOR_RAID,
+        ]:
+            return DiscordEmbedBuilder.create_points_embed(
+                {
+                    "gained": payload["amount"],
+                    "username": username,
+                    "channel_points": channel_points,
+                    "reason": payload["reason"],
+                }
+            )
+
+        if event == Events.BET_WIN:
+            return DiscordEmbedBuilder.create_bet_embed(
+                {
+                    "result": "win",
+                    "gained": _millify(payload["amount"]),
+                    "username": username,
+                    "channel_points": channel_points,
+                }
+            )
+
+        if event == Events.BET_LOSE:
+            return DiscordEmbedBuilder.create_bet_embed(
+                {
+                    "result": "lose",
+                    "lost": _millify(abs(payload["amount"])),
+                    "username": username,
+                    "channel_points": channel_points,
+                }
+            )
+
+        if event == Events.BET_REFUND:
+            return DiscordEmbedBuilder.create_refund_embed(
+                {
+                    "username": username,
+                    "title": payload["title"],
+                    "decision": payload["decision"],
+                    "decision_text": payload["outcome"],
+                }
+            )
+
+        if event == Events.JOIN_RAID:
+            return DiscordEmbedBuilder.create_raid_embed(
+                {"from_username": username, "to_username": payload["target"]}
+            )
+
+        if event == Events.BET_START:
+            return DiscordEmbedBuilder.create_bet_start_embed(
+                {
+                    "wait_time": round(payload["wait_time"], 2),
+                    "username": username,
+                    "title": payload["title"],
+                }
+            )
+
+        if event == Events.BET_FILTERS and payload.get("minimum_points") is not None:
+            return DiscordEmbedBuilder.create_filter_embed(
+                {
+                    "username": username,
+                    "channel_points": channel_points,
+                    "current_points": payload["balance"],
+                    "minimum_points": payload["minimum_points"],
+                }
+            )
+
+        if event == Events.CHAT_MENTION:
+            return DiscordEmbedBuilder.create_chat_embed(
+                {
+                    "username": payload["nickname"],
+                    "channel": username,
+                    "content": payload["text"],
+                }
+            )
+
+        if event == Events.DROP_CLAIM:
+            return DiscordEmbedBuilder.create_drop_embed(
+                {
+                    "name": payload["drop"],
+                    "benefit": payload["benefit"],
+                    "minutes_required": payload["minutes_required"],
+                    "current_minutes": payload["current_minutes"],
+                    "percentage": payload["percentage"],
+                    "preconditions_met": payload["preconditions_met"] is True,
+                    "is_claimed": payload["is_claimed"],
+                }
+            )
+
+        if event == Events.BET_GENERAL and payload.get("odds") is not None:
+            return DiscordEmbedBuilder.create_bet_placement_embed(
+                {
+                    "username": username,
+                    "amount": payload["amount"],
+                    "bet_amount": _millify(payload["amount"]),
+                    "choice": f"{payload['outcome']} ({payload['color']})",
+                    "total_points": _millify(payload["total_points"]),
+                    "users_count": payload["total_users"],
+                    "users_percentage": payload["percentage_users"],
+                    "odds": payload["odds"],
+                    "odds_percentage": payload["odds_percentage"],
+                }
+            )
+
+        if (
+            event == Events.BET_GENERAL
+            and payload.get("amount") is None
+            and payload.get("event_id") is not None
+        ):
+            return DiscordEmbedBuilder.create_bet_going_embed(
+                {
+                    "event_id": payload["event_id"],
+                    "username": username,
+                    "channel_id": payload["channel_id"],
+                    "channel_points": channel_points,
+                    "title": payload["title"],
+                }
+            )
 
-@lru_cache(maxsize=100)
-def get_streamer_icon_cached(username: str) -> Optional[str]:
-    """Cached Version der Icon-Funktion für bessere Performance"""
-    current_time = time.time()
-    
-    # Cache Check
-    if username in _icon_cache:
-        cached_data = _icon_cache[username]
-        if current_time - cached_data['timestamp'] < _cache_ttl:
-            return cached_data['url']
-    
-    # Icon neu laden
-    try:
-        response = requests.get(f"https://www.twitch.tv/{username}", timeout=5)
-        match = re.search(r'meta property="og:image" content="(.*?)"', response.text)
-        icon_url = match.group(1) if match else None
-        
-        # In Cache speichern
-        _icon_cache[username] = {
-            'url': icon_url,
-            'timestamp': current_time
-        }
-        
-        return icon_url
-    except:
         return None
 
 
 class Discord:
-    """Verbesserte Discord Klasse mit Event-Parser und Embed-System"""
-    __slots__ = ["webhook_api", "events", "_session"]
+    """Discord Klasse mit Embed-System, die Embeds werden aus den Events (EventBus) erstellt"""
+
+    __slots__ = ["webhook_api", "events"]
 
     def __init__(self, webhook_api: str, events: list):
         self.webhook_api = webhook_api
         self.events = [str(e) for e in events]
-        self._session = requests.Session()  # Session für bessere Performance
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         """Haupt Send-Methode mit Event-basiertem Routing"""
         if str(event) not in self.events:
             return
 
-        # Event-spezifische Behandlung
+        # Die Daten kommen strukturiert vom EventBus, keine Regex über die Log-Nachricht
         embed_data = None
-        
         try:
-            if event == Events.STREAMER_ONLINE:
-                data = EventParser.parse_streamer_status(message)
-                if data and data['status'] == 'online':
-                    embed_data = DiscordEmbedBuilder.create_online_embed(data)
-            
-            elif event == Events.STREAMER_OFFLINE:
-                data = EventParser.parse_streamer_status(message)
-                if data and data['status'] == 'offline':
-                    embed_data = DiscordEmbedBuilder.create_offline_embed(data)
-            
-            elif event in [Events.GAIN_FOR_WATCH, Events.GAIN_FOR_CLAIM, Events.GAIN_FOR_RAID]:
-                data = EventParser.parse_points_gain(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_points_embed(data)
-            
-            elif event in [Events.BET_WIN, Events.BET_LOSE]:
-                data = EventParser.parse_bet_result(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_bet_embed(data)
-            
-            elif "Result: REFUND" in message:
-                data = EventParser.parse_bet_refund(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_refund_embed(data)
-            
-            elif event == Events.JOIN_RAID:
-                data = EventParser.parse_raid_join(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_raid_embed(data)
-            
-            elif event == Events.BET_START:
-                data = EventParser.parse_bet_start(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_bet_start_embed(data)
-            
-            elif event == Events.BET_FILTERS:
-                data = EventParser.parse_bet_filter(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_filter_embed(data)
-            
-            elif event == Events.CHAT_MENTION:
-                data = EventParser.parse_chat_message(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_chat_embed(data)
-            
-            elif event == Events.DROP_CLAIM or "Claim Drop" in message:
-                data = EventParser.parse_drop_claim(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_drop_embed(data)
-            
-            elif "Going to complete bet" in message:
-                data = EventParser.parse_bet_going_to_complete(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_bet_going_embed(data)
-            
-            elif "Place " in message and "channel points on:" in message:
-                data = EventParser.parse_bet_placement(message)
-                if data:
-                    embed_data = DiscordEmbedBuilder.create_bet_placement_embed(data)
-
-            # Embed senden falls erstellt
-            if embed_data:
-                self._send_embed(embed_data)
-            else:
-                # Fallback: Simple Message
-                self._send_simple_message(message)
-                
-        except Exception as e:
+            if payload:
+                embed_data = DiscordEmbedBuilder.from_event(event, payload)
+        except (KeyError, TypeError, ValueError) as e:
             print(f"Discord Error: {e}")
             # Fallback bei Fehlern
+            embed_data = None
+
+        # Netzwerkfehler werden nicht abgefangen: der NotificationDispatcher zählt und wiederholt sie
+        if embed_data:
+            self._send_embed(embed_data)
+        else:
+            # Fallback: Simple Message
             self._send_simple_message(message)
 
     def _send_embed(self, embed_data: Dict[str, Any]) -> None:
         """Sendet Embed Message"""
-        try:
-            self._session.post(
-                    url=self.webhook_api,
-                json=embed_data,
-                timeout=10
-            )
-        except requests.RequestException as e:
-            print(f"Discord Embed Send Error: {e}")
+        http_client.post(
+            "discord",
+            url=self.webhook_api,
+            json=embed_data,
+        ).raise_for_status()
 
     def _send_simple_message(self, message: str) -> None:
         """Sendet einfache Text Message"""
-        try:
-            self._session.post(
-                    url=self.webhook_api,
-                data={
-                    "content": dedent(str(message)),
-                    "username": "Twitch Channel Points Miner",
-                    "avatar_url": "https://i.imgur.com/X9fEkhT.png",
-                },
-                timeout=10
-            )
-        except requests.RequestException as e:
-            print(f"Discord Simple Send Error: {e}")
-
-    def __del__(self):
-        """Cleanup Session"""
-        if hasattr(self, '_session'):
-            self._session.close()
+        http_client.post(
+            "discord",
+            url=self.webhook_api,
+            data={
+                "content": dedent(str(message)),
+                "username": "Twitch Channel Points Miner",
+                "avatar_url": "https://i.imgur.com/X9fEkhT.png",
+            },
+        ).raise_for_status()
 
 
 # Backwards compatibility
 def get_streamer_icon(username):
     """Legacy function für Backwards Compatibility"""
-    return get_streamer_icon_cached(username)
\ No newline at end of file
+    return profile_cache.avatar(username)
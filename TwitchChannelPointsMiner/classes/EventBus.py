@@ -0,0 +1,45 @@
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus(object):
+    """
+    In-process publish/subscribe of the miner state changes.
+    The event is an Events member (STREAMER_ONLINE, GAIN_FOR_WATCH, BET_WIN, DROP_CLAIM, ...) for what is logged and
+    notified: the payload has the human readable message, emoji, level and the structured fields
+    (streamer, channel_id, balance, amount, reason, ...). It's a string for the raw state of the dashboard
+    (points, series, annotations). Logging, notifications, analytics and the dashboard are all subscribers.
+    The callbacks are called on the thread of the publisher: they must be fast, e.g. put the event in a queue.
+    """
+
+    __slots__ = ["subscribers", "mutex"]
+
+    def __init__(self):
+        self.subscribers = []
+        self.mutex = Lock()
+
+    def subscribe(self, callback):
+        with self.mutex:
+            self.subscribers = self.subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        with self.mutex:
+            self.subscribers = [
+                subscriber for subscriber in self.subscribers if subscriber != callback
+            ]
+
+    def publish(self, event, **payload):
+        # The list is replaced on (un)subscribe, never modified: no lock needed to iterate
+        for callback in self.subscribers:
+            try:
+                callback(event, payload)
+            except Exception:
+                logger.error(
+                    f"Exception raised by a subscriber of {event}", exc_info=True
+                )
+
+
+# Shared by the whole process, like Settings
+event_bus = EventBus()
@@ -1,9 +1,9 @@
 from textwrap import dedent
 
-import requests
-
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
 from TwitchChannelPointsMiner.classes.Settings import Events
 
+
 class Gotify(object):
     __slots__ = ["endpoint", "priority", "events"]
 
@@ -12,12 +12,13 @@ class Gotify(object):
         self.priority = priority
         self.events = [str(e) for e in events]
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         if str(event) in self.events:
-            requests.post(
+            http_client.post(
+                "gotify",
                 url=self.endpoint,
                 data={
                     "message": dedent(message),
                     "priority": self.priority
                 },
-            )
+            ).raise_for_status()
@@ -0,0 +1,106 @@
+import logging
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient(object):
+    """
+    HTTP transport shared by all the notifiers (Telegram, Discord, Webhook, Matrix, Pushover, Gotify).
+    One pool of keep-alive connections per host, so a notification doesn't pay a new TLS handshake.
+    Only the connection errors are retried here (the request was never sent): the NotificationDispatcher
+    handles the retries with backoff, 429 and 5xx.
+    """
+
+    __slots__ = ["session", "timeout", "stats", "mutex"]
+
+    def __init__(
+        self,
+        timeout: float = 10,
+        pool_hosts: int = 10,
+        pool_size: int = 4,
+        connect_retries: int = 2,
+    ):
+        self.timeout = timeout
+        self.stats = {}
+        self.mutex = Lock()
+
+        # pool_size is the max number of connections to the same host, pool_block waits for a free one
+        adapter = HTTPAdapter(
+            pool_connections=pool_hosts,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(
+                total=connect_retries,
+                connect=connect_retries,
+                read=0,
+                status=0,
+                backoff_factor=0.5,
+                raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self, provider: str, method: str, url: str, **kwargs
+    ) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = False
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            self.__record(provider, elapsed, error)
+            logger.debug(
+                "%s %s request%s in %.0fms",
+                provider,
+                method,
+                " failed" if error is True else "",
+                elapsed * 1000,
+                extra={"latency": round(elapsed * 1000)},
+            )
+
+    def get(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.request(provider, "GET", url, **kwargs)
+
+    def post(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.request(provider, "POST", url, **kwargs)
+
+    def latency(self) -> dict:
+        # Delivery latency of each provider, in milliseconds
+        with self.mutex:
+            return {
+                provider: {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "avg": round(stats["total"] / stats["requests"] * 1000, 1),
+                    "max": round(stats["max"] * 1000, 1),
+                    "last": round(stats["last"] * 1000, 1),
+                }
+                for provider, stats in self.stats.items()
+            }
+
+    def __record(self, provider, elapsed, error):
+        with self.mutex:
+            stats = self.stats.setdefault(
+                provider, {"requests": 0, "errors": 0, "total": 0, "max": 0, "last": 0}
+            )
+            stats["requests"] += 1
+            stats["errors"] += 1 if error is True else 0
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["last"] = elapsed
+
+
+# Shared by all the notifiers, like the event_bus
+http_client = HttpClient()
@@ -0,0 +1,176 @@
+import gzip
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from logging.handlers import BaseRotatingHandler
+from threading import Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+# <log file>.2024-05-01_10-00-00(.1)(.gz) - also the <log file>.2024-05-01 of the old TimedRotatingFileHandler
+ROTATED_SUFFIX = re.compile(
+    r"^(?P<date>\d{4}-\d{2}-\d{2}(?:_\d{2}-\d{2}-\d{2})?)(?:\.(?P<index>\d+))?(?P<gz>\.gz)?$"
+)
+
+
+def rotated_files(filename: str) -> list:
+    """The rotated files of a log file, oldest first"""
+    folder, base = os.path.split(os.path.abspath(filename))
+    files = []
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return files
+    for name in names:
+        if name.startswith(f"{base}.") is False:
+            continue
+        prefix = len(base) + 1
+        match = ROTATED_SUFFIX.match(name[prefix:])
+        if match is not None:
+            # .2 before .10 for the rotations in the same second
+            files.append(
+                (
+                    (match.group("date"), int(match.group("index") or 0)),
+                    os.path.join(folder, name),
+                )
+            )
+    return [filename for _, filename in sorted(files)]
+
+
+def rotated_at(filename: str, rotated: str) -> float:
+    # Rotation time from the name of the file, not from the mtime (changed by the compression)
+    prefix = len(os.path.basename(filename)) + 1
+    suffix = os.path.basename(rotated)[prefix:]
+    date = ROTATED_SUFFIX.match(suffix).group("date")
+    return datetime.strptime(
+        date, "%Y-%m-%d_%H-%M-%S" if "_" in date else "%Y-%m-%d"
+    ).timestamp()
+
+
+def open_log(filename: str):
+    # Rotated files could be compressed, read them as text in both cases
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8", errors="replace")
+    return open(filename, "r", encoding="utf-8", errors="replace")
+
+
+class CompressedRotatingFileHandler(BaseRotatingHandler):
+    """
+    Rotate the log file every `interval` seconds or when it's bigger than `max_bytes` (the first that happens).
+    The rotated files are compressed with gzip in a background thread, the logs are never blocked.
+    Then the rotated files older than `max_age` seconds are deleted, and the oldest ones until
+    the current file plus the rotated files fit in `max_total_bytes`. 0/None disable a limit.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        interval: float = 86400,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age: float = 7 * 86400,
+        max_total_bytes: int = 500 * 1024 * 1024,
+        compress: bool = True,
+        encoding: str = "utf-8",
+    ):
+        BaseRotatingHandler.__init__(
+            self, filename, "a", encoding=encoding, delay=False
+        )
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self.mutex = Lock()
+
+        # Like TimedRotatingFileHandler, an existing file is rotated an interval after its last write
+        started = (
+            os.stat(self.baseFilename).st_mtime
+            if os.path.exists(self.baseFilename)
+            else time.time()
+        )
+        self.rollover_at = None if not self.interval else started + self.interval
+
+        # Rotated files left by a previous run (not compressed yet, or over the budget)
+        self.__background()
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes and self.stream is not None:
+            # Checked before the write: the file is at most one record bigger than max_bytes
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        now = time.time()
+        rotated = f"{self.baseFilename}.{time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(now))}"
+        # More rotations in the same second (max_bytes very small)
+        candidate, index = rotated, 0
+        while os.path.exists(candidate) or os.path.exists(f"{candidate}.gz"):
+            index += 1
+            candidate = f"{rotated}.{index}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, candidate)
+
+        self.stream = self._open()
+        if self.rollover_at is not None:
+            self.rollover_at = now + self.interval
+
+        self.__background()
+
+    def __background(self):
+        Thread(
+            target=self.__compress_and_clean,
+            name="Log rotation",
+            daemon=True,
+        ).start()
+
+    def __compress_and_clean(self):
+        # One cleanup at time: each one compresses all the rotated files not compressed yet
+        with self.mutex:
+            try:
+                if self.compress is True:
+                    for filename in rotated_files(self.baseFilename):
+                        if filename.endswith(".gz") is False:
+                            self.__compress(filename)
+                self.__clean()
+            except OSError as e:
+                logger.error(f"Unable to rotate {self.baseFilename}: {e}")
+
+    @staticmethod
+    def __compress(filename):
+        # Write a temporary file: if the miner is stopped the original is still there
+        temporary = f"{filename}.gz.tmp"
+        with open(filename, "rb") as source, gzip.open(
+            temporary, "wb", compresslevel=6
+        ) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(temporary, f"{filename}.gz")
+        os.remove(filename)
+
+    def __clean(self):
+        files = rotated_files(self.baseFilename)
+        if self.max_age:
+            expired = time.time() - self.max_age
+            for filename in [
+                f for f in files if rotated_at(self.baseFilename, f) < expired
+            ]:
+                os.remove(filename)
+                files.remove(filename)
+
+        if self.max_total_bytes:
+            total = sum(os.path.getsize(f) for f in files)
+            if os.path.exists(self.baseFilename):
+                total += os.path.getsize(self.baseFilename)
+            # Oldest first, the current file is never deleted
+            while files != [] and total > self.max_total_bytes:
+                filename = files.pop(0)
+                total -= os.path.getsize(filename)
+                os.remove(filename)
@@ -1,9 +1,9 @@
 from textwrap import dedent
 
 import logging
-import requests
 from urllib.parse import quote
 
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
 from TwitchChannelPointsMiner.classes.Settings import Events
 
 
@@ -15,13 +15,10 @@ class Matrix(object):
         self.room_id = quote(room_id)
         self.events = [str(e) for e in events]
 
-        body = requests.post(
+        body = http_client.post(
+            "matrix",
             url=f"https://{self.homeserver}/_matrix/client/r0/login",
-            json={
-                "user": username,
-                "password": password,
-                "type": "m.login.password"
-            }
+            json={"user": username, "password": password, "type": "m.login.password"},
         ).json()
 
         self.access_token = body.get("access_token")
@@ -29,12 +26,10 @@ class Matrix(object):
         if not self.access_token:
             logging.getLogger(__name__).info("Invalid Matrix password provided. Notifications will not be sent.")
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         if str(event) in self.events:
-            requests.post(
+            http_client.post(
+                "matrix",
                 url=f"https://{self.homeserver}/_matrix/client/r0/rooms/{self.room_id}/send/m.room.message?access_token={self.access_token}",
-                json={
-                    "body": dedent(message),
-                    "msgtype": "m.text"
-                }
-            )
+                json={"body": dedent(message), "msgtype": "m.text"},
+            ).raise_for_status()
@@ -0,0 +1,532 @@
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from enum import Enum, auto
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+
+import requests
+
+from TwitchChannelPointsMiner.classes.Settings import Events
+from TwitchChannelPointsMiner.utils import emojize_alias, remove_emoji
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+
+# Requests allowed per provider: (tokens, seconds).
+# Discord webhooks accept ~30 messages per minute, Telegram ~20 per minute in the same group
+RATE_LIMITS = {
+    "discord": (30, 60),
+    "telegram": (20, 60),
+}
+DEFAULT_RATE_LIMIT = (60, 60)
+
+# High volume events merged in a single digest message
+COALESCE_EVENTS = [
+    Events.GAIN_FOR_WATCH,
+    Events.GAIN_FOR_CLAIM,
+    Events.GAIN_FOR_WATCH_STREAK,
+    Events.BET_WIN,
+    Events.BET_LOSE,
+    Events.BET_REFUND,
+    Events.DROP_STATUS,
+]
+
+
+class DropPolicy(Enum):
+    DROP_NEWEST = auto()
+    DROP_OLDEST = auto()
+
+    def __str__(self):
+        return self.name
+
+
+def is_retryable(exception):
+    # Network errors, timeouts, rate limits and server errors can succeed later.
+    # A 4xx (wrong token, wrong chat_id...) will fail again: don't insist
+    if isinstance(exception, requests.exceptions.HTTPError):
+        response = exception.response
+        return (
+            response is None
+            or response.status_code == 429
+            or response.status_code >= 500
+        )
+    return isinstance(exception, requests.exceptions.RequestException)
+
+
+def retry_after(exception):
+    # Seconds to wait from a 429 response: Retry-After header (seconds or HTTP date),
+    # or the retry_after field in the JSON body (Discord, Telegram)
+    response = getattr(exception, "response", None)
+    if response is None or response.status_code != 429:
+        return None
+
+    value = response.headers.get("Retry-After")
+    if value is not None:
+        try:
+            return max(0, float(value))
+        except ValueError:
+            try:
+                return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    try:
+        body = response.json()
+        value = body.get("retry_after", body.get("parameters", {}).get("retry_after"))
+        return max(0, float(value)) if value is not None else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def format_window(seconds):
+    return f"{int(seconds // 60)} min" if seconds >= 60 else f"{int(seconds)} s"
+
+
+class TokenBucket(object):
+    """
+    Rate limit of a provider, shared by all the workers of the notifier.
+    pause() empties the bucket for the time asked by a 429 response.
+    """
+
+    __slots__ = ["capacity", "rate", "tokens", "updated", "paused_until", "mutex"]
+
+    def __init__(self, tokens: int, seconds: float):
+        self.capacity = tokens
+        self.rate = tokens / seconds
+        self.tokens = tokens
+        self.updated = time.time()
+        self.paused_until = 0
+        self.mutex = Lock()
+
+    def acquire(self, stopping: Event) -> bool:
+        # Wait for a token, False if the notifier is stopping in the meantime
+        while True:
+            with self.mutex:
+                now = time.time()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            if stopping.wait(wait) is True:
+                return False
+
+    def pause(self, seconds: float):
+        with self.mutex:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.tokens = 0
+
+
+class Digest(object):
+    """
+    Events of the same type received in a window, e.g. '+1,250 points across 14 channels in the last 10 min'.
+    With a single event the original message is sent.
+    """
+
+    __slots__ = [
+        "event",
+        "started",
+        "count",
+        "first",
+        "payload",
+        "amount",
+        "channels",
+        "messages",
+    ]
+
+    def __init__(self, event):
+        self.event = event
+        self.started = time.time()
+        self.count = 0
+        self.first = None
+        self.payload = None
+        self.amount = None
+        self.channels = {}
+        self.messages = {}
+
+    def add(self, message: str, payload: dict):
+        self.count += 1
+        if self.first is None:
+            self.first = message
+            self.payload = payload
+        streamer = payload.get("streamer") or "-"
+        amount = payload.get("amount")
+        if amount is not None:
+            self.amount = (self.amount or 0) + amount
+            self.channels[streamer] = self.channels.get(streamer, 0) + amount
+        else:
+            self.channels[streamer] = self.channels.get(streamer, 0)
+            # Without an amount (e.g. DROP_STATUS) the latest message of each channel is kept
+            self.messages[streamer] = message
+
+    def message(self, prefix: str = "", limit: int = 10) -> str:
+        if self.count == 1:
+            return self.first
+
+        window = format_window(max(time.time() - self.started, 1))
+        channels = len(self.channels)
+        if self.amount is not None:
+            sign = "+" if self.amount >= 0 else ""
+            header = (
+                f"{prefix}{sign}{self.amount:,} points across {channels} channel{'s' if channels > 1 else ''} "
+                f"in the last {window} - {self.event} x{self.count}"
+            )
+            top = sorted(
+                self.channels.items(), key=lambda item: abs(item[1]), reverse=True
+            )
+            lines = [
+                f"{name} {'+' if value >= 0 else ''}{value:,}"
+                for name, value in top[:limit]
+            ]
+            if len(top) > limit:
+                lines.append(f"and {len(top) - limit} more")
+            return header + "\n" + ", ".join(lines)
+
+        header = (
+            f"{prefix}{self.event} x{self.count} across {channels} channel{'s' if channels > 1 else ''} "
+            f"in the last {window}"
+        )
+        lines = list(self.messages.values())[-limit:]
+        return "\n".join([header] + lines)
+
+
+class NotifierQueue(object):
+    """
+    Bounded queue and worker threads of a single notifier (Telegram, Discord, ...).
+    A slow or unreachable provider only fills its own queue, the other notifiers and the loggers are not affected.
+    """
+
+    __slots__ = [
+        "name",
+        "notifier",
+        "queue",
+        "threads",
+        "retries",
+        "backoff",
+        "max_backoff",
+        "drop_policy",
+        "bucket",
+        "coalesce_window",
+        "coalesce_events",
+        "digests",
+        "prefix",
+        "stopping",
+        "mutex",
+        "sent",
+        "failed",
+        "retried",
+        "dropped",
+        "coalesced",
+        "rate_limited",
+        "last_error",
+    ]
+
+    def __init__(
+        self,
+        name: str,
+        notifier,
+        queue_size: int = 100,
+        workers: int = 1,
+        retries: int = 3,
+        backoff: float = 2,
+        max_backoff: float = 60,
+        drop_policy: DropPolicy = DropPolicy.DROP_OLDEST,
+        rate_limit: tuple = DEFAULT_RATE_LIMIT,
+        coalesce_window: float = 0,
+        coalesce_events: list = None,
+        prefix: str = "",
+    ):
+        self.name = name
+        self.notifier = notifier
+        self.queue = Queue(maxsize=queue_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.drop_policy = drop_policy
+        self.bucket = TokenBucket(*rate_limit)
+        self.coalesce_window = coalesce_window
+        self.coalesce_events = [str(e) for e in (coalesce_events or [])]
+        self.digests = {}
+        self.prefix = prefix
+        self.stopping = Event()
+        self.mutex = Lock()
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.last_error = None
+
+        self.threads = [
+            Thread(target=self.__work, name=f"Notifier-{name}-{index}", daemon=True)
+            for index in range(0, max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, message: str, event, payload: dict = None) -> bool:
+        if payload is None:
+            payload = {}
+        if self.stopping.is_set():
+            return False
+        if self.coalesce_window > 0 and str(event) in self.coalesce_events:
+            with self.mutex:
+                if str(event) not in self.digests:
+                    self.digests[str(event)] = Digest(event)
+                self.digests[str(event)].add(message, payload)
+            return True
+        return self.__enqueue(message, event, payload)
+
+    def flush(self, force: bool = False):
+        # Queue the digests whose window is over (all of them on stop)
+        now = time.time()
+        with self.mutex:
+            expired = [
+                key
+                for key, digest in self.digests.items()
+                if force is True or now - digest.started >= self.coalesce_window
+            ]
+            digests = [self.digests.pop(key) for key in expired]
+            self.coalesced += sum(digest.count - 1 for digest in digests)
+        for digest in digests:
+            # A digest of a single event keeps its fields (e.g. for the Discord embeds)
+            self.__enqueue(
+                digest.message(self.prefix),
+                digest.event,
+                digest.payload if digest.count == 1 else {},
+            )
+
+    def close(self):
+        self.flush(force=True)
+        # The workers send what is already queued (one attempt each, no more retries)
+        self.stopping.set()
+        for _ in self.threads:
+            while True:
+                try:
+                    self.queue.put_nowait(STOP)
+                    break
+                except Full:
+                    # Make room for the STOP, the oldest message would not be sent in time anyway
+                    try:
+                        self.queue.get_nowait()
+                        self.__count("dropped")
+                    except Empty:
+                        pass
+
+    def join(self, deadline: float):
+        for thread in self.threads:
+            thread.join(timeout=max(0, deadline - time.time()))
+
+    def metrics(self) -> dict:
+        with self.mutex:
+            return {
+                "queued": self.queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "rate_limited": self.rate_limited,
+                "last_error": self.last_error,
+            }
+
+    def __enqueue(self, message, event, payload) -> bool:
+        try:
+            self.queue.put_nowait((message, event, payload))
+            return True
+        except Full:
+            pass
+
+        if self.drop_policy == DropPolicy.DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                pass
+            try:
+                self.queue.put_nowait((message, event, payload))
+            except Full:
+                pass
+        self.__count("dropped")
+        return False
+
+    def __count(self, key, error=None):
+        with self.mutex:
+            setattr(self, key, getattr(self, key) + 1)
+            if error is not None:
+                self.last_error = error
+            dropped = self.dropped
+
+        # Log the first drop, then once every 100 to avoid flooding the console
+        if key == "dropped" and dropped % 100 == 1:
+            logger.warning(
+                f"{self.name} notifications queue is full, {dropped} messages dropped so far"
+            )
+
+    def __work(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                return
+            self.__send(*item)
+
+    def __send(self, message, event, payload):
+        for attempt in range(0, self.retries + 1):
+            # On stop the queued messages are sent without waiting for the bucket
+            if (
+                self.stopping.is_set() is False
+                and self.bucket.acquire(self.stopping) is False
+            ):
+                self.__count("failed", "stopped while rate limited")
+                return
+            try:
+                self.notifier.send(message, event, payload)
+                self.__count("sent")
+                return
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt == self.retries or is_retryable(e) is False:
+                    self.__count("failed", error)
+                    logger.debug(
+                        f"Unable to send the {self.name} notification: {error}"
+                    )
+                    return
+
+                delay = min(self.backoff * (2**attempt), self.max_backoff)
+                wait = retry_after(e)
+                if wait is not None:
+                    # The provider tells how long to wait: pause all the workers of this notifier
+                    self.__count("rate_limited", error)
+                    self.bucket.pause(wait)
+                    delay = 0
+                else:
+                    self.__count("retried", error)
+                # On stop don't wait the backoff, the message is lost
+                if self.stopping.wait(delay) is True:
+                    self.__count("failed", error)
+                    return
+
+
+class NotificationDispatcher(object):
+    """
+    Send the notifications out of the logging thread.
+    The formatter only enqueues the message; every notifier has its own NotifierQueue.
+    """
+
+    __slots__ = [
+        "queue_size",
+        "workers",
+        "retries",
+        "backoff",
+        "max_backoff",
+        "drop_policy",
+        "rate_limits",
+        "coalesce_window",
+        "coalesce_events",
+        "prefix",
+        "emoji",
+        "level",
+        "queues",
+        "flusher",
+        "stopped",
+    ]
+
+    def __init__(
+        self,
+        queue_size: int = 100,
+        workers: int = 1,
+        retries: int = 3,
+        backoff: float = 2,
+        max_backoff: float = 60,
+        drop_policy: DropPolicy = DropPolicy.DROP_OLDEST,
+        rate_limits: dict = None,
+        coalesce_window: float = 0,
+        coalesce_events: list = None,
+    ):
+        self.queue_size = queue_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.drop_policy = drop_policy
+        self.rate_limits = {**RATE_LIMITS, **(rate_limits or {})}
+        # Digests are opt-in: with coalesce_window=0 every event is sent as soon as possible
+        self.coalesce_window = coalesce_window
+        self.coalesce_events = (
+            list(COALESCE_EVENTS) if coalesce_events is None else coalesce_events
+        )
+        self.prefix = ""
+        self.emoji = True
+        self.level = logging.NOTSET
+        self.queues = {}
+        self.flusher = None
+        self.stopped = Event()
+
+    def register(self, name: str, notifier):
+        if name not in self.queues:
+            self.queues[name] = NotifierQueue(
+                name,
+                notifier,
+                queue_size=self.queue_size,
+                workers=self.workers,
+                retries=self.retries,
+                backoff=self.backoff,
+                max_backoff=self.max_backoff,
+                drop_policy=self.drop_policy,
+                rate_limit=self.rate_limits.get(name, DEFAULT_RATE_LIMIT),
+                coalesce_window=self.coalesce_window,
+                coalesce_events=self.coalesce_events,
+                prefix=self.prefix,
+            )
+
+        if self.coalesce_window > 0 and self.flusher is None:
+            self.flusher = Thread(
+                target=self.__flush_digests, name="Notifier-digests", daemon=True
+            )
+            self.flusher.start()
+
+    def notify(self, name: str, message: str, event, payload: dict = None) -> bool:
+        queue = self.queues.get(name)
+        # Filter here the events of the notifier, no reason to queue a message that will be ignored
+        if queue is None or str(event) not in queue.notifier.events:
+            return False
+        return queue.put(message, event, payload)
+
+    def on_event(self, event, payload):
+        # Subscriber of the event bus. Same text of the console: emoji (or no emoji at all) and username
+        if payload.get("message") is None or self.queues == {}:
+            return
+        # Same level of the console handler (console_level), the events hidden from the console are not notified
+        if payload.get("level", logging.INFO) < self.level:
+            return
+        message = payload["message"]
+        if self.emoji is True and payload.get("emoji") is not None:
+            message = f"{emojize_alias(payload['emoji'])}  {message.strip()}"
+        elif self.emoji is False:
+            message = remove_emoji(message.replace("\u2192", "-->"))
+        message = self.prefix + message
+
+        for name in self.queues:
+            self.notify(name, message, event, payload)
+
+    def stop(self, timeout: float = 10):
+        self.stopped.set()
+        # All the notifiers drain their queue in parallel within the same deadline
+        deadline = time.time() + timeout
+        for queue in self.queues.values():
+            queue.close()
+        for queue in self.queues.values():
+            queue.join(deadline)
+
+    def metrics(self) -> dict:
+        return {name: queue.metrics() for name, queue in self.queues.items()}
+
+    def __flush_digests(self):
+        while self.stopped.wait(1) is False:
+            for queue in list(self.queues.values()):
+                queue.flush()
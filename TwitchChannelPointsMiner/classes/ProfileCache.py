@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
+from TwitchChannelPointsMiner.constants import CLIENT_ID, GQLOperations
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCache(object):
+    """
+    Avatars of the streamers, used by the Discord embeds.
+    The lookups never block: a missing or expired avatar is queued and fetched in the background,
+    in batches of `batch_size` logins with a single GQL query. The cache is saved on disk,
+    so the avatars are not downloaded again at every start.
+    """
+
+    __slots__ = [
+        "path",
+        "ttl",
+        "batch_size",
+        "delay",
+        "retry",
+        "profiles",
+        "pending",
+        "loaded",
+        "mutex",
+        "wakeup",
+        "thread",
+    ]
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: float = 86400,
+        batch_size: int = 50,
+        delay: float = 1,
+        retry: float = 60,
+    ):
+        self.path = (
+            path
+            if path is not None
+            else os.path.join(Path().absolute(), "cache", "profiles.json")
+        )
+        self.ttl = ttl
+        # Twitch accepts max 100 logins in a users() query
+        self.batch_size = min(batch_size, 100)
+        # Seconds to wait for more logins before sending a batch
+        self.delay = delay
+        # Seconds to wait after a failed batch
+        self.retry = retry
+
+        self.profiles = {}
+        self.pending = set()
+        self.loaded = False
+        self.mutex = Lock()
+        self.wakeup = Event()
+        self.thread = None
+
+    def avatar(self, username: str) -> str or None:
+        # Return what we have (even if expired) and refresh it in the background
+        username = username.lower()
+        with self.mutex:
+            self.__load()
+            profile = self.profiles.get(username)
+            if profile is None or self.__expired(profile):
+                self.__schedule(username)
+            return None if profile is None else profile["avatar"]
+
+    def prefetch(self, usernames: list) -> None:
+        with self.mutex:
+            self.__load()
+            for username in usernames:
+                username = username.lower()
+                profile = self.profiles.get(username)
+                if profile is None or self.__expired(profile):
+                    self.__schedule(username)
+
+    def __expired(self, profile):
+        return time.time() - profile["updated"] >= self.ttl
+
+    def __schedule(self, username):
+        self.pending.add(username)
+        if self.thread is None:
+            self.thread = Thread(target=self.__run, name="Profile cache", daemon=True)
+            self.thread.start()
+        self.wakeup.set()
+
+    def __run(self):
+        while True:
+            self.wakeup.wait()
+            # Give the other notifications a chance to join the same batch
+            time.sleep(self.delay)
+            with self.mutex:
+                # The logins already cached since they were scheduled are not asked again
+                self.pending = {
+                    username
+                    for username in self.pending
+                    if username not in self.profiles
+                    or self.__expired(self.profiles[username])
+                }
+                batch = sorted(self.pending)[: self.batch_size]
+                self.pending.difference_update(batch)
+                if self.pending == set():
+                    self.wakeup.clear()
+            if batch == []:
+                continue
+
+            try:
+                avatars = self.__fetch(batch)
+            except Exception as e:
+                logger.debug(f"Unable to fetch the avatars of {batch}: {e}")
+                with self.mutex:
+                    self.pending.update(batch)
+                    self.wakeup.set()
+                time.sleep(self.retry)
+                continue
+
+            now = time.time()
+            with self.mutex:
+                for username in batch:
+                    # The logins not returned by Twitch are cached too (avatar None), so we don't ask again
+                    self.profiles[username] = {
+                        "avatar": avatars.get(username),
+                        "updated": now,
+                    }
+                self.__save()
+
+    def __fetch(self, usernames):
+        response = http_client.post(
+            "twitch",
+            url=GQLOperations.url,
+            json={
+                "query": GQLOperations.ProfileImages,
+                "variables": {"logins": usernames},
+            },
+            headers={"Client-Id": CLIENT_ID},
+        )
+        response.raise_for_status()
+        users = response.json()["data"]["users"]
+        return {
+            user["login"]: user["profileImageURL"] for user in users if user is not None
+        }
+
+    def __load(self):
+        if self.loaded is True:
+            return
+        self.loaded = True
+        try:
+            with open(self.path, "r") as file:
+                self.profiles = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.debug(f"Unable to read {self.path}: {e}")
+
+    def __save(self):
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            temp = f"{self.path}.tmp"
+            with open(temp, "w") as file:
+                json.dump(self.profiles, file)
+            os.replace(temp, self.path)
+        except OSError as e:
+            logger.debug(f"Unable to write {self.path}: {e}")
+
+
+# Shared by the Discord notifier and the miner
+profile_cache = ProfileCache()
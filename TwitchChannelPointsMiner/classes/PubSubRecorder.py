@@ -0,0 +1,282 @@
+import gzip
+import json
+import logging
+import time
+import tracemalloc
+from threading import Lock
+
+from TwitchChannelPointsMiner.classes.entities.Streamer import (
+    Streamer,
+    StreamerSettings,
+)
+from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+from TwitchChannelPointsMiner.logger import LoggerSettings
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubRecorder(object):
+    """
+    Append the raw PubSub frames, with the receive timestamp and the connection index,
+    to a gzip compressed JSON-lines file: {"t": 1700000000.123, "ws": 0, "m": "<raw frame>"}
+    """
+
+    __slots__ = ["path", "file", "mutex", "frames"]
+
+    def __init__(self, path: str):
+        self.path = path
+        # Append mode: a new gzip member for each session, gzip.open reads them as a single stream
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        self.mutex = Lock()
+        self.frames = 0
+
+    def sent(self, request):
+        # Only the received frames are recorded, the replay sends its own requests
+        pass
+
+    def record(self, index, message):
+        line = json.dumps(
+            {"t": round(time.time(), 3), "ws": index, "m": message},
+            separators=(",", ":"),
+        )
+        with self.mutex:
+            if self.file is not None:
+                self.file.write(line + "\n")
+                self.frames += 1
+
+    def close(self):
+        with self.mutex:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                logger.info(f"Recorded {self.frames} PubSub frames in {self.path}")
+
+
+def load_frames(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line != "":
+                yield json.loads(line)
+
+
+class StubTwitchLogin(object):
+    def __init__(self, username="replay", user_id="0"):
+        self.username = username
+        self.user_id = user_id
+
+    def get_auth_token(self):
+        return "replay"
+
+    def get_user_id(self):
+        return self.user_id
+
+
+class StubTwitch(object):
+    """
+    Replace the side effects of Twitch (GQL requests) used by WebSocketsPool.on_message.
+    Every call is only counted.
+    """
+
+    def __init__(self):
+        self.twitch_login = StubTwitchLogin()
+        self.calls = {}
+
+    def __count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def claim_bonus(self, streamer, claim_id):
+        self.__count("claim_bonus")
+
+    def claim_moment(self, streamer, moment_id):
+        self.__count("claim_moment")
+
+    def check_streamer_online(self, streamer):
+        self.__count("check_streamer_online")
+
+    def update_raid(self, streamer, raid):
+        self.__count("update_raid")
+        streamer.raid = raid
+
+    def make_predictions(self, event):
+        self.__count("make_predictions")
+
+    def contribute_to_community_goals(self, streamer):
+        self.__count("contribute_to_community_goals")
+
+
+class ReplayWebSocket(object):
+    """Only the attributes of TwitchWebSocket used by WebSocketsPool.on_message, without a socket"""
+
+    def __init__(self, index, parent_pool):
+        self.index = index
+        # A pool without connections, used for the checks done at pool level (is_duplicate)
+        self.parent_pool = parent_pool
+        self.twitch = parent_pool.twitch
+        self.streamers = parent_pool.streamers
+        self.events_predictions = parent_pool.events_predictions
+        self.recorder = None
+        self.last_message = None
+        self.last_pong = time.time()
+        self.is_reconnecting = True  # RECONNECT frames must not spawn a new connection
+        self.is_closed = True
+        self.forced_close = True
+        self.keep_running = False
+
+
+class PubSubReplay(object):
+    """
+    Feed the recorded frames into WebSocketsPool.on_message.
+    speed: 1.0 is real time, 10.0 is 10x, None (or 0) is max speed without sleeping.
+    With track_allocations=True the memory allocated by each handler is traced (slower).
+    """
+
+    def __init__(self, path, speed=None, track_allocations=False):
+        self.path = path
+        self.speed = speed
+        self.track_allocations = track_allocations
+
+        self.twitch = StubTwitch()
+        self.events_predictions = {}
+        self.streamers = []
+        self.pool = WebSocketsPool(self.twitch, self.streamers, self.events_predictions)
+        self.ws = {}
+        self.stats = {}
+        self.errors = 0
+
+    def __prepare(self):
+        # One streamer for each channel found in the recording
+        if isinstance(Settings.logger, LoggerSettings) is False:
+            Settings.logger = LoggerSettings()
+        Settings.enable_analytics = False
+
+        channels = []
+        for frame in load_frames(self.path):
+            try:
+                response = json.loads(frame["m"])
+                if response["type"] == "MESSAGE":
+                    channel_id = response["data"]["topic"].split(".")[1]
+                    if channel_id not in channels:
+                        channels.append(channel_id)
+            except (ValueError, KeyError, IndexError):
+                continue
+
+        settings = StreamerSettings()
+        settings.default()
+        settings.bet.default()
+        for channel_id in channels:
+            streamer = Streamer(f"channel-{channel_id}", settings=settings)
+            streamer.channel_id = channel_id
+            streamer.is_online = True
+            self.streamers.append(streamer)
+
+    def __websocket(self, index):
+        if index not in self.ws:
+            self.ws[index] = ReplayWebSocket(index, self.pool)
+        return self.ws[index]
+
+    @staticmethod
+    def handler_name(raw):
+        try:
+            response = json.loads(raw)
+            if response["type"] != "MESSAGE":
+                return response["type"]
+            topic = response["data"]["topic"].split(".")[0]
+            return f"{topic}/{json.loads(response['data']['message'])['type']}"
+        except (ValueError, KeyError, TypeError):
+            return "INVALID"
+
+    def __account(self, name, elapsed, allocated):
+        if name not in self.stats:
+            self.stats[name] = {"count": 0, "time": 0.0, "max": 0.0, "allocated": 0}
+        stats = self.stats[name]
+        stats["count"] += 1
+        stats["time"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        stats["allocated"] += allocated
+
+    def run(self):
+        self.__prepare()
+        if self.track_allocations is True:
+            tracemalloc.start()
+
+        frames = 0
+        busy = 0.0
+        first_recorded = None
+        started = time.perf_counter()
+        for frame in load_frames(self.path):
+            if self.speed:
+                first_recorded = (
+                    frame["t"] if first_recorded is None else first_recorded
+                )
+                delay = (frame["t"] - first_recorded) / self.speed - (
+                    time.perf_counter() - started
+                )
+                if delay > 0:
+                    time.sleep(delay)
+
+            ws = self.__websocket(frame.get("ws", 0))
+            allocated = 0
+            if self.track_allocations is True:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+
+            start = time.perf_counter()
+            try:
+                WebSocketsPool.on_message(ws, frame["m"])
+            except Exception:
+                # A broken dispatch path must not be measured as a fast one
+                self.errors += 1
+                logger.error("Exception raised during the replay", exc_info=True)
+            elapsed = time.perf_counter() - start
+
+            if self.track_allocations is True:
+                allocated = max(tracemalloc.get_traced_memory()[1] - before, 0)
+
+            busy += elapsed
+            frames += 1
+            self.__account(PubSubReplay.handler_name(frame["m"]), elapsed, allocated)
+
+        if self.track_allocations is True:
+            tracemalloc.stop()
+
+        return {
+            "frames": frames,
+            "errors": self.errors,
+            "wall_time": time.perf_counter() - started,
+            "busy_time": busy,
+            "messages_per_second": frames / busy if busy > 0 else 0,
+            "handlers": self.stats,
+            "track_allocations": self.track_allocations,
+            "side_effects": self.twitch.calls,
+        }
+
+    @staticmethod
+    def report(result):
+        lines = [
+            f"Frames: {result['frames']}, wall time: {result['wall_time']:.3f}s, "
+            f"busy time: {result['busy_time']:.3f}s, {result['messages_per_second']:.0f} messages/s, "
+            f"errors: {result['errors']}",
+            f"{'Handler':<60} {'Count':>8} {'Avg (us)':>10} {'Max (us)':>10} {'Alloc/msg (B)':>14}",
+        ]
+        for name, stats in sorted(
+            result["handlers"].items(), key=lambda x: x[1]["time"], reverse=True
+        ):
+            allocated = (
+                stats["allocated"] // stats["count"]
+                if result["track_allocations"] is True
+                else "-"
+            )
+            lines.append(
+                f"{name:<60} {stats['count']:>8} {stats['time'] / stats['count'] * 1e6:>10.1f} "
+                f"{stats['max'] * 1e6:>10.1f} {allocated:>14}"
+            )
+        if result["side_effects"] != {}:
+            lines.append(
+                "Side effects: "
+                + ", ".join(
+                    f"{k}={v}" for k, v in sorted(result["side_effects"].items())
+                )
+            )
+        return "\n".join(lines)
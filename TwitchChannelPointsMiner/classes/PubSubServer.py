@@ -0,0 +1,547 @@
+import base64
+import hashlib
+import json
+import logging
+import random
+import socket
+import socketserver
+import struct
+import time
+import uuid
+from datetime import datetime, timezone
+from threading import Lock, Thread
+
+from TwitchChannelPointsMiner.utils import create_nonce
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Topics that require an auth_token in the LISTEN request
+USER_TOPICS = ["community-points-user-v1", "predictions-user-v1"]
+
+# Messages per second for each subscribed topic
+DEFAULT_RATES = {
+    "community-points-user-v1": 1 / 60,
+    "video-playback-by-id": 1 / 30,
+    "predictions-channel-v1": 1 / 600,
+    "raid": 1 / 1800,
+}
+
+
+def timestamp():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class PubSubConnection(object):
+    __slots__ = ["sock", "address", "topics", "mutex", "closed", "predictions"]
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.topics = []
+        self.mutex = Lock()
+        self.closed = False
+        # Active prediction for each predictions-channel-v1 topic: {topic: [event, updates]}
+        self.predictions = {}
+
+    def send_frame(self, payload, opcode=0x1):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(length)
+        elif length < 65536:
+            header.append(126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(127)
+            header += struct.pack("!Q", length)
+        with self.mutex:
+            if self.closed is False:
+                try:
+                    self.sock.sendall(bytes(header) + payload)
+                except OSError:
+                    self.closed = True
+
+    def send(self, data):
+        self.send_frame(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    def close(self):
+        self.send_frame(b"", opcode=0x8)
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class PubSubRequestHandler(socketserver.BaseRequestHandler):
+    def __recv_exactly(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed")
+            data += chunk
+        return data
+
+    def __handshake(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return False
+            request += chunk
+
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        if "sec-websocket-key" not in headers:
+            return False
+
+        accept = base64.b64encode(
+            hashlib.sha1(
+                (headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()
+            ).digest()
+        ).decode()
+        self.request.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        return True
+
+    def __read_frame(self):
+        first, second = self.__recv_exactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.__recv_exactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.__recv_exactly(8))[0]
+        mask = self.__recv_exactly(4) if second & 0x80 else None
+        payload = self.__recv_exactly(length)
+        if mask is not None:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def handle(self):
+        if self.__handshake() is False:
+            return
+
+        server = self.server.pubsub
+        connection = PubSubConnection(self.request, self.client_address)
+        server.register(connection)
+        try:
+            while connection.closed is False:
+                opcode, payload = self.__read_frame()
+                if opcode == 0x8:  # Close
+                    break
+                elif opcode == 0x9:  # Ping
+                    connection.send_frame(payload, opcode=0xA)
+                elif opcode == 0x1:  # Text
+                    server.on_request(connection, payload.decode("utf-8"))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            connection.closed = True
+            server.unregister(connection)
+
+
+class ThreadingPubSubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+class PubSubServer(Thread):
+    """
+    Local stand-in for the Twitch PubSub server (wss://pubsub-edge.twitch.tv/v1), for load tests only.
+    Speaks the protocol used by TwitchWebSocket: LISTEN/UNLISTEN with nonce responses, PING/PONG, RECONNECT,
+    ERR_BADAUTH for the user topics and the topics limit for each connection.
+    Synthetic messages are generated for all the subscribed topics, at rates (messages per second for each topic)
+    multiplied by scale.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        rates: dict = None,
+        scale: float = 1.0,
+        max_topics: int = 50,
+        bad_auth_tokens: list = None,
+        reconnect_every: int = None,
+        tick: float = 0.1,
+    ):
+        super(PubSubServer, self).__init__()
+        self.daemon = True
+        self.name = "PubSub Server"
+
+        self.host = host
+        self.port = port
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.scale = scale
+        self.max_topics = max_topics
+        self.bad_auth_tokens = [] if bad_auth_tokens is None else bad_auth_tokens
+        self.reconnect_every = reconnect_every
+        self.tick = tick
+
+        self.connections = []
+        # Channels seen in the LISTEN requests, used as channel_id of the community-points-user-v1 messages
+        self.channels = []
+        self.channel_ids = set()
+        self.mutex = Lock()
+        self.running = False
+        self.stats = {
+            "connections": 0,
+            "listen": 0,
+            "unlisten": 0,
+            "errors": 0,
+            "messages": 0,
+        }
+
+        self.server = ThreadingPubSubServer((host, port), PubSubRequestHandler)
+        self.server.pubsub = self
+        # The real port, if 0 was requested
+        self.port = self.server.server_address[1]
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def register(self, connection):
+        with self.mutex:
+            self.connections.append(connection)
+            self.stats["connections"] += 1
+
+    def unregister(self, connection):
+        with self.mutex:
+            if connection in self.connections:
+                self.connections.remove(connection)
+
+    def on_request(self, connection, raw):
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            connection.send(
+                {"type": "RESPONSE", "nonce": "", "error": "ERR_BADMESSAGE"}
+            )
+            return
+
+        if request.get("type") == "PING":
+            connection.send({"type": "PONG"})
+        elif request.get("type") in ["LISTEN", "UNLISTEN"]:
+            data = request.get("data", {})
+            topics = data.get("topics", [])
+            error = ""
+            if request["type"] == "LISTEN":
+                if any(t.split(".")[0] in USER_TOPICS for t in topics) and (
+                    not data.get("auth_token")
+                    or data.get("auth_token") in self.bad_auth_tokens
+                ):
+                    error = "ERR_BADAUTH"
+                elif len(set(connection.topics + topics)) > self.max_topics:
+                    error = "ERR_BADMESSAGE"
+                else:
+                    for topic in topics:
+                        if topic not in connection.topics:
+                            connection.topics.append(topic)
+                        self.__add_channel(topic)
+                    self.stats["listen"] += len(topics)
+            else:
+                for topic in topics:
+                    if topic in connection.topics:
+                        connection.topics.remove(topic)
+                    connection.predictions.pop(topic, None)
+                self.stats["unlisten"] += len(topics)
+
+            if error != "":
+                self.stats["errors"] += 1
+            connection.send(
+                {"type": "RESPONSE", "nonce": request.get("nonce", ""), "error": error}
+            )
+        else:
+            connection.send(
+                {
+                    "type": "RESPONSE",
+                    "nonce": request.get("nonce", ""),
+                    "error": "ERR_BADMESSAGE",
+                }
+            )
+
+    def __add_channel(self, topic):
+        name, _, channel_id = topic.partition(".")
+        if name not in USER_TOPICS and channel_id not in self.channel_ids:
+            with self.mutex:
+                self.channel_ids.add(channel_id)
+                self.channels.append(channel_id)
+
+    def reconnect_all(self):
+        # Like Twitch during a server maintenance: RECONNECT and close after a grace period
+        with self.mutex:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.send({"type": "RECONNECT"})
+        time.sleep(1)
+        for connection in connections:
+            connection.close()
+        logger.info(f"RECONNECT sent to {len(connections)} connections")
+
+    def __message(self, topic, connection):
+        name, _, channel_id = topic.partition(".")
+        if name == "community-points-user-v1":
+            channel_id = random.choice(self.channels) if self.channels != [] else "0"
+            if random.random() < 0.9:
+                data = {
+                    "type": "points-earned",
+                    "data": {
+                        "timestamp": timestamp(),
+                        "channel_id": channel_id,
+                        "point_gain": {
+                            "user_id": channel_id,
+                            "channel_id": channel_id,
+                            "total_points": 10,
+                            "reason_code": "WATCH",
+                        },
+                        "balance": {
+                            "user_id": channel_id,
+                            "channel_id": channel_id,
+                            "balance": random.randint(1000, 100000),
+                        },
+                    },
+                }
+            else:
+                data = {
+                    "type": "claim-available",
+                    "data": {
+                        "timestamp": timestamp(),
+                        "claim": {"id": str(uuid.uuid4()), "channel_id": channel_id},
+                    },
+                }
+        elif name == "video-playback-by-id":
+            data = {
+                "type": "viewcount",
+                "server_time": round(time.time(), 3),
+                "viewers": random.randint(1, 50000),
+            }
+        elif name == "raid":
+            data = {
+                "type": "raid_update_v2",
+                "raid": {
+                    "id": str(uuid.uuid4()),
+                    "source_id": channel_id,
+                    "target_id": str(random.randint(1, 10**8)),
+                    "target_login": f"target{random.randint(1, 10**4)}",
+                    "viewer_count": random.randint(1, 5000),
+                },
+            }
+        elif name == "predictions-channel-v1":
+            event, updates = connection.predictions.get(topic, (None, 0))
+            if event is None:
+                event = {
+                    "id": str(uuid.uuid4()),
+                    "channel_id": channel_id,
+                    "created_at": timestamp(),
+                    "title": "Synthetic prediction",
+                    "status": "ACTIVE",
+                    "prediction_window_seconds": 120,
+                    "outcomes": [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "color": color,
+                            "title": color,
+                            "total_points": 0,
+                            "total_users": 0,
+                            "top_predictors": [],
+                        }
+                        for color in ["BLUE", "PINK"]
+                    ],
+                }
+                message_type = "event-created"
+            else:
+                for outcome in event["outcomes"]:
+                    outcome["total_users"] += random.randint(1, 20)
+                    outcome["total_points"] += random.randint(100, 20000)
+                message_type = "event-updated"
+                updates += 1
+                if updates >= 10:
+                    event["status"] = "LOCKED"
+            connection.predictions[topic] = (
+                (event, updates) if event["status"] == "ACTIVE" else (None, 0)
+            )
+            data = {
+                "type": message_type,
+                "data": {"timestamp": timestamp(), "event": event},
+            }
+        else:
+            return None
+
+        return {
+            "type": "MESSAGE",
+            "data": {
+                "topic": topic,
+                "message": json.dumps(data, separators=(",", ":")),
+            },
+        }
+
+    def __traffic(self):
+        last_reconnect = time.time()
+        while self.running:
+            started = time.time()
+            with self.mutex:
+                connections = list(self.connections)
+            for connection in connections:
+                for topic in list(connection.topics):
+                    rate = self.rates.get(topic.split(".")[0], 0) * self.scale
+                    # Number of messages in this tick, the fractional part is randomized
+                    expected = rate * self.tick
+                    count = int(expected) + (1 if random.random() < expected % 1 else 0)
+                    for _ in range(count):
+                        message = self.__message(topic, connection)
+                        if message is not None:
+                            connection.send(message)
+                            self.stats["messages"] += 1
+
+            if (
+                self.reconnect_every is not None
+                and time.time() - last_reconnect > self.reconnect_every
+            ):
+                last_reconnect = time.time()
+                Thread(target=self.reconnect_all, daemon=True).start()
+
+            time.sleep(max(self.tick - (time.time() - started), 0))
+
+    def run(self):
+        self.running = True
+        Thread(target=self.__traffic, name="PubSub Server traffic", daemon=True).start()
+        logger.info(f"PubSub server running on {self.url}")
+        self.server.serve_forever()
+
+    def stop(self):
+        self.running = False
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CountingRecorder(object):
+    """
+    Used as WebSocketsPool recorder: count the received frames and time the subscriptions.
+    The LISTEN requests are registered by sent() with their nonce, a subscription is complete
+    when the RESPONSE with the same nonce is received.
+    After a RECONNECT (a reconnection storm) the time until all the topics are subscribed again is measured.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.mutex = Lock()
+        self.pending = set()
+        self.responses = 0
+        self.topics = 0
+        # Reconnection storm in progress: [started, LISTEN responses received since then]
+        self.storm = None
+        self.reconnections = []
+
+    def sent(self, request):
+        if request.get("type") == "LISTEN":
+            with self.mutex:
+                self.pending.add(request["nonce"])
+
+    def record(self, index, message):
+        self.frames += 1
+        if '"RESPONSE"' in message:
+            nonce = json.loads(message).get("nonce")
+            with self.mutex:
+                if nonce in self.pending:
+                    self.pending.discard(nonce)
+                    self.responses += 1
+                    if self.storm is not None:
+                        self.storm[1] += 1
+                        # Every topic is subscribed again
+                        if self.storm[1] >= self.topics:
+                            self.reconnections.append(time.time() - self.storm[0])
+                            self.storm = None
+        elif '"RECONNECT"' in message:
+            with self.mutex:
+                if self.storm is None:
+                    self.storm = [time.time(), 0]
+
+    def close(self):
+        pass
+
+
+def run_load_test(url, channels=1000, duration=60, topics=None, timeout=300):
+    """
+    Connect a WebSocketsPool (with stubbed Twitch side effects) to url and listen to the topics of channels
+    synthetic streamers. Return the subscription time (until the RESPONSE of every LISTEN), the CPU time
+    for each received message and the time to subscribe again after each RECONNECT (server reconnect_every).
+    """
+    from TwitchChannelPointsMiner import constants
+    from TwitchChannelPointsMiner.classes.entities.PubsubTopic import PubsubTopic
+    from TwitchChannelPointsMiner.classes.entities.Streamer import (
+        Streamer,
+        StreamerSettings,
+    )
+    from TwitchChannelPointsMiner.classes.PubSubRecorder import StubTwitch
+    from TwitchChannelPointsMiner.classes.Settings import Settings
+    from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+    from TwitchChannelPointsMiner.logger import LoggerSettings
+
+    constants.WEBSOCKET = url
+    Settings.logger = LoggerSettings()
+    Settings.enable_analytics = False
+    Settings.disable_ssl_cert_verification = False
+    topics = (
+        ["video-playback-by-id", "raid", "predictions-channel-v1"]
+        if topics is None
+        else topics
+    )
+
+    settings = StreamerSettings()
+    settings.default()
+    settings.bet.default()
+    streamers = []
+    for index in range(0, channels):
+        streamer = Streamer(f"channel-{index}", settings=settings)
+        streamer.channel_id = str(index + 1)
+        streamers.append(streamer)
+
+    # The sockets of this pool register the nonce of each LISTEN (recorder.sent) before it's sent
+    recorder = CountingRecorder()
+    recorder.topics = 1 + channels * len(topics)
+    pool = WebSocketsPool(StubTwitch(), streamers, {}, recorder=recorder)
+
+    started = time.time()
+    pool.submit(PubsubTopic("community-points-user-v1", user_id=create_nonce(8)))
+    for streamer in streamers:
+        for topic in topics:
+            pool.submit(PubsubTopic(topic, streamer=streamer))
+    while recorder.responses < recorder.topics and time.time() - started < timeout:
+        time.sleep(0.01)
+    setup_time = time.time() - started
+
+    cpu, frames = time.process_time(), recorder.frames
+    time.sleep(duration)
+    cpu, frames = time.process_time() - cpu, recorder.frames - frames
+    pool.end()
+
+    reconnections = recorder.reconnections
+    return {
+        "connections": len(pool.ws),
+        "topics": sum(len(ws.topics) for ws in pool.ws),
+        "subscribed": recorder.responses >= recorder.topics,
+        "setup_time": setup_time,
+        "frames": frames,
+        "cpu_time": cpu,
+        "cpu_per_message": cpu / frames if frames > 0 else 0,
+        "reconnections": len(reconnections),
+        "reconnect_time_avg": sum(reconnections) / len(reconnections)
+        if reconnections != []
+        else 0,
+        "reconnect_time_max": max(reconnections, default=0),
+    }
@@ -1,7 +1,6 @@
 from textwrap import dedent
 
-import requests
-
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
 from TwitchChannelPointsMiner.classes.Settings import Events
 
 
@@ -15,9 +14,10 @@ class Pushover(object):
         self.sound = sound
         self.events = [str(e) for e in events]
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         if str(event) in self.events:
-            requests.post(
+            http_client.post(
+                "pushover",
                 url="https://api.pushover.net/1/messages.json",
                 data={
                     "user": self.userkey,
@@ -27,4 +27,4 @@ class Pushover(object):
                     "priority": self.priority,
                     "sound": self.sound,
                 },
-            )
+            ).raise_for_status()
@@ -20,8 +20,16 @@ class FollowersOrder(Enum):
 
 # Empty object shared between class
 class Settings(object):
-    __slots__ = ["logger", "streamer_settings",
-                 "enable_analytics", "disable_ssl_cert_verification", "disable_at_in_nickname"]
+    __slots__ = [
+        "logger",
+        "streamer_settings",
+        "enable_analytics",
+        "analytics_path",
+        "analytics_storage",
+        "analytics_writer",
+        "disable_ssl_cert_verification",
+        "disable_at_in_nickname",
+    ]
 
 
 class Events(Enum):
@@ -1,7 +1,6 @@
 from textwrap import dedent
 
-import requests
-
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
 from TwitchChannelPointsMiner.classes.Settings import Events
 
 
@@ -16,9 +15,10 @@ class Telegram(object):
         self.events = [str(e) for e in events]
         self.disable_notification = disable_notification
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         if str(event) in self.events:
-            requests.post(
+            http_client.post(
+                "telegram",
                 url=self.telegram_api,
                 data={
                     "chat_id": self.chat_id,
@@ -26,4 +26,4 @@ class Telegram(object):
                     "disable_web_page_preview": True,  # include link to twitch streamer?
                     "disable_notification": self.disable_notification,  # no sound, notif just in tray
                 },
-            )
+            ).raise_for_status()
@@ -22,9 +22,11 @@ from typing import Dict, Any
 # from base64 import urlsafe_b64decode
 # from datetime import datetime
 
+from TwitchChannelPointsMiner.classes.entities.Bet import OutcomeKeys
 from TwitchChannelPointsMiner.classes.entities.Campaign import Campaign
 from TwitchChannelPointsMiner.classes.entities.CommunityGoal import CommunityGoal
 from TwitchChannelPointsMiner.classes.entities.Drop import Drop
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
 from TwitchChannelPointsMiner.classes.Exceptions import (
     StreamerDoesNotExistException,
     StreamerIsOfflineException,
@@ -239,10 +241,14 @@ class Twitch(object):
             json_data["variables"] = {"input": {"raidID": raid.raid_id}}
             self.post_gql_request(json_data)
 
-            logger.info(
-                f"Joining raid from {streamer} to {raid.target_login}!",
-                extra={"emoji": ":performing_arts:",
-                       "event": Events.JOIN_RAID},
+            event_bus.publish(
+                Events.JOIN_RAID,
+                origin=f"{__name__}.update_raid",
+                message=f"Joining raid from {streamer} to {raid.target_login}!",
+                emoji=":performing_arts:",
+                streamer=streamer.username,
+                channel_id=streamer.channel_id,
+                target=raid.target_login,
             )
 
     def viewer_is_mod(self, streamer):
@@ -288,9 +294,15 @@ class Twitch(object):
                     "X-Device-Id": self.device_id,
                 },
             )
-            logger.debug(
-                f"Data: {json_data}, Status code: {response.status_code}, Content: {response.text}"
-            )
+            # Decoding the body and printing the request is expensive, only when someone reads it
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Data: %s, Status code: %s, Content: %s",
+                    json_data,
+                    response.status_code,
+                    response.text,
+                    extra={"latency": round(response.elapsed.total_seconds() * 1000)},
+                )
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(
@@ -376,21 +388,23 @@ class Twitch(object):
     def send_minute_watched_events(self, streamers, priority, chunk_size=3):
         while self.running:
             try:
+                # Snapshot: the streamers can be removed at runtime, the indexes must not shift
+                watched = list(streamers)
                 streamers_index = [
                     i
-                    for i in range(0, len(streamers))
-                    if streamers[i].is_online is True
+                    for i in range(0, len(watched))
+                    if watched[i].is_online is True
                     and (
-                        streamers[i].online_at == 0
-                        or (time.time() - streamers[i].online_at) > 30
+                        watched[i].online_at == 0
+                        or (time.time() - watched[i].online_at) > 30
                     )
                 ]
 
                 for index in streamers_index:
-                    if (streamers[index].stream.update_elapsed() / 60) > 10:
+                    if (watched[index].stream.update_elapsed() / 60) > 10:
                         # Why this user It's currently online but the last updated was more than 10minutes ago?
                         # Please perform a manually update and check if the user it's online
-                        self.check_streamer_online(streamers[index])
+                        self.check_streamer_online(watched[index])
 
                 streamers_watching = []
                 for prior in priority:
@@ -404,8 +418,7 @@ class Twitch(object):
                         and len(streamers_watching) < 2
                     ):
                         items = [
-                            {"points": streamers[index].channel_points,
-                                "index": index}
+                            {"points": watched[index].channel_points, "index": index}
                             for index in streamers_index
                         ]
                         items = sorted(
@@ -427,19 +440,15 @@ class Twitch(object):
                         """
                         for index in streamers_index:
                             if (
-                                streamers[index].settings.watch_streak is True
-                                and streamers[index].stream.watch_streak_missing is True
+                                watched[index].settings.watch_streak is True
+                                and watched[index].stream.watch_streak_missing is True
                                 and (
-                                    streamers[index].offline_at == 0
-                                    or (
-                                        (time.time() -
-                                         streamers[index].offline_at)
-                                        // 60
-                                    )
+                                    watched[index].offline_at == 0
+                                    or ((time.time() - watched[index].offline_at) // 60)
                                     > 30
                                 )
                                 # fix #425
-                                and streamers[index].stream.minute_watched < 7
+                                and watched[index].stream.minute_watched < 7
                             ):
                                 streamers_watching.append(index)
                                 if len(streamers_watching) == 2:
@@ -447,7 +456,7 @@ class Twitch(object):
 
                     elif prior == Priority.DROPS and len(streamers_watching) < 2:
                         for index in streamers_index:
-                            if streamers[index].drops_condition() is True:
+                            if watched[index].drops_condition() is True:
                                 streamers_watching.append(index)
                                 if len(streamers_watching) == 2:
                                     break
@@ -456,12 +465,11 @@ class Twitch(object):
                         streamers_with_multiplier = [
                             index
                             for index in streamers_index
-                            if streamers[index].viewer_has_points_multiplier()
+                            if watched[index].viewer_has_points_multiplier()
                         ]
                         streamers_with_multiplier = sorted(
                             streamers_with_multiplier,
-                            key=lambda x: streamers[x].total_points_multiplier(
-                            ),
+                            key=lambda x: watched[x].total_points_multiplier(),
                             reverse=True,
                         )
                         streamers_watching += streamers_with_multiplier[:2]
@@ -483,7 +491,7 @@ class Twitch(object):
                         json_data = copy.deepcopy(
                             GQLOperations.PlaybackAccessToken)
                         json_data["variables"] = {
-                            "login": streamers[index].username,
+                            "login": watched[index].username,
                             "isLive": True,
                             "isVod": False,
                             "vodID": "",
@@ -496,7 +504,9 @@ class Twitch(object):
                             responsePlaybackAccessToken = self.post_gql_request(
                                 json_data)
                             logger.debug(
-                                f"Sent PlaybackAccessToken request for {streamers[index]}")
+                                "Sent PlaybackAccessToken request for %s",
+                                watched[index],
+                            )
 
                             if 'data' not in responsePlaybackAccessToken:
                                 logger.error(
@@ -516,13 +526,14 @@ class Twitch(object):
 
                         except Exception as e:
                             logger.error(
-                                f"Error fetching PlaybackAccessToken for {streamers[index]}: {str(e)}")
+                                f"Error fetching PlaybackAccessToken for {watched[index]}: {str(e)}"
+                            )
                             continue
 
                         # encoded_value = quote(json.dumps(value))
 
                         # Construct the URL for the broadcast qualities
-                        RequestBroadcastQualitiesURL = f"https://usher.ttvnw.net/api/channel/hls/{streamers[index].username}.m3u8?sig={signature}&token={value}"
+                        RequestBroadcastQualitiesURL = f"https://usher.ttvnw.net/api/channel/hls/{watched[index].username}.m3u8?sig={signature}&token={value}"
 
                         # Get list of video qualities
                         responseBroadcastQualities = requests.get(
@@ -531,7 +542,9 @@ class Twitch(object):
                             timeout=20,
                         )  # timeout=60
                         logger.debug(
-                            f"Send RequestBroadcastQualitiesURL request for {streamers[index]} - Status code: {responseBroadcastQualities.status_code}"
+                            "Send RequestBroadcastQualitiesURL request for %s - Status code: %s",
+                            watched[index],
+                            responseBroadcastQualities.status_code,
                         )
                         if responseBroadcastQualities.status_code != 200:
                             continue
@@ -550,7 +563,9 @@ class Twitch(object):
                             timeout=20,
                         )  # timeout=60
                         logger.debug(
-                            f"Send BroadcastLowestQualityURL request for {streamers[index]} - Status code: {responseStreamURLList.status_code}"
+                            "Send BroadcastLowestQualityURL request for %s - Status code: %s",
+                            watched[index],
+                            responseStreamURLList.status_code,
                         )
                         if responseStreamURLList.status_code != 200:
                             continue
@@ -568,24 +583,28 @@ class Twitch(object):
                             timeout=20,
                         )  # timeout=60
                         logger.debug(
-                            f"Send StreamLowestQualityURL request for {streamers[index]} - Status code: {responseStreamLowestQualityURL.status_code}"
+                            "Send StreamLowestQualityURL request for %s - Status code: %s",
+                            watched[index],
+                            responseStreamLowestQualityURL.status_code,
                         )
                         if responseStreamLowestQualityURL.status_code != 200:
                             continue
                         # End of fix for 2024/5 API Change
                         ##################################
                         response = requests.post(
-                            streamers[index].stream.spade_url,
-                            data=streamers[index].stream.encode_payload(),
+                            watched[index].stream.spade_url,
+                            data=watched[index].stream.encode_payload(),
                             headers={"User-Agent": self.user_agent},
                             # timeout=60,
                             timeout=20,
                         )
                         logger.debug(
-                            f"Send minute watched request for {streamers[index]} - Status code: {response.status_code}"
+                            "Send minute watched request for %s - Status code: %s",
+                            watched[index],
+                            response.status_code,
                         )
                         if response.status_code == 204:
-                            streamers[index].stream.update_minute_watched()
+                            watched[index].stream.update_minute_watched()
 
                             """
                             Remember, you can only earn progress towards a time-based Drop on one participating channel at a time.  [ ! ! ! ]
@@ -593,7 +612,7 @@ class Twitch(object):
                             For time-based Drops, if you are unable to claim the Drop in time, you will be able to claim it from the inventory page until the Drops campaign ends.
                             """
 
-                            for campaign in streamers[index].stream.campaigns:
+                            for campaign in watched[index].stream.campaigns:
                                 for drop in campaign.drops:
                                     # We could add .has_preconditions_met condition inside is_printable
                                     if (
@@ -601,45 +620,25 @@ class Twitch(object):
                                         and drop.is_printable is True
                                     ):
                                         drop_messages = [
-                                            f"{streamers[index]} is streaming {streamers[index].stream}",
+                                            f"{watched[index]} is streaming {watched[index].stream}",
                                             f"Campaign: {campaign}",
                                             f"Drop: {drop}",
                                             f"{drop.progress_bar()}",
                                         ]
-                                        for single_line in drop_messages:
-                                            logger.info(
-                                                single_line,
-                                                extra={
-                                                    "event": Events.DROP_STATUS,
-                                                    "skip_telegram": True,
-                                                    "skip_discord": True,
-                                                    "skip_webhook": True,
-                                                    "skip_matrix": True,
-                                                    "skip_gotify": True
-                                                },
-                                            )
-
-                                        if Settings.logger.telegram is not None:
-                                            Settings.logger.telegram.send(
-                                                "\n".join(drop_messages),
-                                                Events.DROP_STATUS,
-                                            )
-
-                                        if Settings.logger.discord is not None:
-                                            Settings.logger.discord.send(
-                                                "\n".join(drop_messages),
-                                                Events.DROP_STATUS,
-                                            )
-                                        if Settings.logger.webhook is not None:
-                                            Settings.logger.webhook.send(
-                                                "\n".join(drop_messages),
-                                                Events.DROP_STATUS,
-                                            )
-                                        if Settings.logger.gotify is not None:
-                                            Settings.logger.gotify.send(
-                                                "\n".join(drop_messages),
-                                                Events.DROP_STATUS,
-                                            )
+                                        # Logged line by line, notified as a single message
+                                        event_bus.publish(
+                                            Events.DROP_STATUS,
+                                            origin=f"{__name__}.send_minute_watched_events",
+                                            message="\n".join(drop_messages),
+                                            streamer=watched[index].username,
+                                            channel_id=watched[index].channel_id,
+                                            campaign=campaign.name,
+                                            drop=drop.name,
+                                            benefit=drop.benefit,
+                                            minutes_required=drop.minutes_required,
+                                            current_minutes=drop.current_minutes_watched,
+                                            percentage=drop.percentage_progress,
+                                        )
 
                     except requests.exceptions.ConnectionError as e:
                         logger.error(
@@ -695,39 +694,58 @@ class Twitch(object):
         decision = event.bet.calculate(event.streamer.channel_points)
         # selector_index = 0 if decision["choice"] == "A" else 1
 
-        logger.info(
-            f"Going to complete bet for {event}",
-            extra={
-                "emoji": ":four_leaf_clover:",
-                "event": Events.BET_GENERAL,
-            },
+        # Fields shared by all the events of this prediction
+        prediction = {
+            "streamer": event.streamer.username,
+            "channel_id": event.streamer.channel_id,
+            "balance": event.streamer.channel_points,
+            "event_id": event.event_id,
+            "title": event.title,
+        }
+
+        event_bus.publish(
+            Events.BET_GENERAL,
+            origin=f"{__name__}.make_predictions",
+            message=f"Going to complete bet for {event}",
+            emoji=":four_leaf_clover:",
+            **prediction,
         )
         if event.status == "ACTIVE":
             skip, compared_value = event.bet.skip()
             if skip is True:
-                logger.info(
-                    f"Skip betting for the event {event}",
-                    extra={
-                        "emoji": ":pushpin:",
-                        "event": Events.BET_FILTERS,
-                    },
+                event_bus.publish(
+                    Events.BET_FILTERS,
+                    origin=f"{__name__}.make_predictions",
+                    message=f"Skip betting for the event {event}",
+                    emoji=":pushpin:",
+                    **prediction,
                 )
-                logger.info(
-                    f"Skip settings {event.bet.settings.filter_condition}, current value is: {compared_value}",
-                    extra={
-                        "emoji": ":pushpin:",
-                        "event": Events.BET_FILTERS,
-                    },
+                event_bus.publish(
+                    Events.BET_FILTERS,
+                    origin=f"{__name__}.make_predictions",
+                    message=f"Skip settings {event.bet.settings.filter_condition}, current value is: {compared_value}",
+                    emoji=":pushpin:",
+                    compared_value=compared_value,
+                    **prediction,
                 )
             else:
                 if decision["amount"] >= 10:
-                    logger.info(
+                    outcome = event.bet.get_decision()
+                    event_bus.publish(
+                        Events.BET_GENERAL,
                         # f"Place {_millify(decision['amount'])} channel points on: {event.bet.get_outcome(selector_index)}",
-                        f"Place {_millify(decision['amount'])} channel points on: {event.bet.get_outcome(decision['choice'])}",
-                        extra={
-                            "emoji": ":four_leaf_clover:",
-                            "event": Events.BET_GENERAL,
-                        },
+                        origin=f"{__name__}.make_predictions",
+                        message=f"Place {_millify(decision['amount'])} channel points on: {event.bet.get_outcome(decision['choice'])}",
+                        emoji=":four_leaf_clover:",
+                        amount=decision["amount"],
+                        outcome=outcome["title"],
+                        color=outcome["color"],
+                        total_points=outcome[OutcomeKeys.TOTAL_POINTS],
+                        total_users=outcome[OutcomeKeys.TOTAL_USERS],
+                        percentage_users=outcome[OutcomeKeys.PERCENTAGE_USERS],
+                        odds=outcome[OutcomeKeys.ODDS],
+                        odds_percentage=outcome[OutcomeKeys.ODDS_PERCENTAGE],
+                        **prediction,
                     )
 
                     json_data = copy.deepcopy(GQLOperations.MakePrediction)
@@ -747,35 +765,43 @@ class Twitch(object):
                         and response["data"]["makePrediction"]["error"] is not None
                     ):
                         error_code = response["data"]["makePrediction"]["error"]["code"]
-                        logger.error(
-                            f"Failed to place bet, error: {error_code}",
-                            extra={
-                                "emoji": ":four_leaf_clover:",
-                                "event": Events.BET_FAILED,
-                            },
+                        event_bus.publish(
+                            Events.BET_FAILED,
+                            origin=f"{__name__}.make_predictions",
+                            message=f"Failed to place bet, error: {error_code}",
+                            emoji=":four_leaf_clover:",
+                            level=logging.ERROR,
+                            error=error_code,
+                            **prediction,
                         )
                 else:
-                    logger.info(
-                        f"Bet won't be placed as the amount {_millify(decision['amount'])} is less than the minimum required 10",
-                        extra={
-                            "emoji": ":four_leaf_clover:",
-                            "event": Events.BET_GENERAL,
-                        },
+                    event_bus.publish(
+                        Events.BET_GENERAL,
+                        origin=f"{__name__}.make_predictions",
+                        message=f"Bet won't be placed as the amount {_millify(decision['amount'])} is less than the minimum required 10",
+                        emoji=":four_leaf_clover:",
+                        amount=decision["amount"],
+                        **prediction,
                     )
         else:
-            logger.info(
-                f"Oh no! The event is not active anymore! Current status: {event.status}",
-                extra={
-                    "emoji": ":disappointed_relieved:",
-                    "event": Events.BET_FAILED,
-                },
+            event_bus.publish(
+                Events.BET_FAILED,
+                origin=f"{__name__}.make_predictions",
+                message=f"Oh no! The event is not active anymore! Current status: {event.status}",
+                emoji=":disappointed_relieved:",
+                status=event.status,
+                **prediction,
             )
 
     def claim_bonus(self, streamer, claim_id):
         if Settings.logger.less is False:
-            logger.info(
-                f"Claiming the bonus for {streamer}!",
-                extra={"emoji": ":gift:", "event": Events.BONUS_CLAIM},
+            event_bus.publish(
+                Events.BONUS_CLAIM,
+                origin=f"{__name__}.claim_bonus",
+                message=f"Claiming the bonus for {streamer}!",
+                emoji=":gift:",
+                streamer=streamer.username,
+                channel_id=streamer.channel_id,
             )
 
         json_data = copy.deepcopy(GQLOperations.ClaimCommunityPoints)
@@ -787,10 +813,13 @@ class Twitch(object):
     # === MOMENTS === #
     def claim_moment(self, streamer, moment_id):
         if Settings.logger.less is False:
-            logger.info(
-                f"Claiming the moment for {streamer}!",
-                extra={"emoji": ":video_camera:",
-                       "event": Events.MOMENT_CLAIM},
+            event_bus.publish(
+                Events.MOMENT_CLAIM,
+                origin=f"{__name__}.claim_moment",
+                message=f"Claiming the moment for {streamer}!",
+                emoji=":video_camera:",
+                streamer=streamer.username,
+                channel_id=streamer.channel_id,
             )
 
         json_data = copy.deepcopy(GQLOperations.CommunityMomentCallout_Claim)
@@ -880,8 +909,20 @@ class Twitch(object):
         return campaigns
 
     def claim_drop(self, drop):
-        logger.info(
-            f"Claim {drop}", extra={"emoji": ":package:", "event": Events.DROP_CLAIM}
+        event_bus.publish(
+            Events.DROP_CLAIM,
+            origin=f"{__name__}.claim_drop",
+            message=f"Claim {drop}",
+            emoji=":package:",
+            drop=drop.name,
+            drop_id=drop.id,
+            drop_instance_id=drop.drop_instance_id,
+            benefit=drop.benefit,
+            minutes_required=drop.minutes_required,
+            current_minutes=drop.current_minutes_watched,
+            percentage=drop.percentage_progress,
+            preconditions_met=drop.has_preconditions_met,
+            is_claimed=drop.is_claimed,
         )
 
         json_data = copy.deepcopy(GQLOperations.DropsPage_ClaimDropRewards)
@@ -28,9 +28,9 @@ class TwitchWebSocket(WebSocketApp):
         self.twitch = parent_pool.twitch
         self.streamers = parent_pool.streamers
         self.events_predictions = parent_pool.events_predictions
+        self.recorder = parent_pool.recorder
 
-        self.last_message_timestamp = None
-        self.last_message_type_channel = None
+        self.last_message = None
 
         self.last_pong = time.time()
         self.last_ping = time.time()
@@ -46,6 +46,13 @@ class TwitchWebSocket(WebSocketApp):
         nonce = create_nonce()
         self.send({"type": "LISTEN", "nonce": nonce, "data": data})
 
+    def unlisten(self, topic, auth_token=None):
+        data = {"topics": [str(topic)]}
+        if topic.is_user_topic() and auth_token is not None:
+            data["auth_token"] = auth_token
+        nonce = create_nonce()
+        self.send({"type": "UNLISTEN", "nonce": nonce, "data": data})
+
     def ping(self):
         self.send({"type": "PING"})
         self.last_ping = time.time()
@@ -53,7 +60,9 @@ class TwitchWebSocket(WebSocketApp):
     def send(self, request):
         try:
             request_str = json.dumps(request, separators=(",", ":"))
-            logger.debug(f"#{self.index} - Send: {request_str}")
+            if self.recorder is not None:
+                self.recorder.sent(request)
+            logger.debug("#%s - Send: %s", self.index, request_str)
             super().send(request_str)
         except WebSocketConnectionClosedException:
             self.is_closed = True
@@ -3,7 +3,7 @@ import logging
 import random
 import time
 # import os
-from threading import Thread, Timer
+from threading import RLock, Thread, Timer
 # from pathlib import Path
 
 from dateutil import parser
@@ -12,9 +12,10 @@ from TwitchChannelPointsMiner.classes.entities.CommunityGoal import CommunityGoa
 from TwitchChannelPointsMiner.classes.entities.EventPrediction import EventPrediction
 from TwitchChannelPointsMiner.classes.entities.Message import Message
 from TwitchChannelPointsMiner.classes.entities.Raid import Raid
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
 from TwitchChannelPointsMiner.classes.Settings import Events, Settings
 from TwitchChannelPointsMiner.classes.TwitchWebSocket import TwitchWebSocket
-from TwitchChannelPointsMiner.constants import WEBSOCKET
+from TwitchChannelPointsMiner import constants
 from TwitchChannelPointsMiner.utils import (
     get_streamer_index,
     internet_connection_available,
@@ -22,15 +23,53 @@ from TwitchChannelPointsMiner.utils import (
 
 logger = logging.getLogger(__name__)
 
+# Message types handled in on_message for each topic.
+# Used as pre-filter: everything else is dropped before the inner JSON is decoded.
+HANDLED_MESSAGE_TYPES = Message.prefilter(
+    {
+        "community-points-user-v1": [
+            "points-earned",
+            "points-spent",
+            "claim-available",
+        ],
+        "video-playback-by-id": ["stream-up", "stream-down", "viewcount"],
+        "raid": ["raid_update_v2"],
+        "community-moments-channel-v1": ["active"],
+        "predictions-channel-v1": ["event-created", "event-updated"],
+        "predictions-user-v1": ["prediction-result", "prediction-made"],
+        "community-points-channel-v1": [
+            "community-goal-created",
+            "community-goal-updated",
+            "community-goal-deleted",
+        ],
+    }
+)
 
-class WebSocketsPool:
-    __slots__ = ["ws", "twitch", "streamers", "events_predictions"]
 
-    def __init__(self, twitch, streamers, events_predictions):
+class WebSocketsPool:
+    __slots__ = [
+        "ws",
+        "twitch",
+        "streamers",
+        "events_predictions",
+        "recorder",
+        "mutex",
+        "moving",
+        "seen",
+    ]
+
+    def __init__(self, twitch, streamers, events_predictions, recorder=None):
         self.ws = []
         self.twitch = twitch
         self.streamers = streamers
         self.events_predictions = events_predictions
+        # PubSubRecorder instance, if not None all the received frames are recorded
+        self.recorder = recorder
+        self.mutex = RLock()
+        # Topics moved by rebalance (topic -> until), live on two connections for a while
+        self.moving = {}
+        # (identifier, timestamp) of the messages received on a moving topic
+        self.seen = set()
 
     """
     API Limits
@@ -38,14 +77,128 @@ class WebSocketsPool:
     - We recommend that a single client IP address establishes no more than 10 simultaneous connections.
     The two limits above are likely to be relaxed for approved third-party applications, as we start to better understand third-party requirements.
     """
+    MAX_TOPICS = 50
+    # Seconds a moved topic is considered live on both connections (LISTEN and UNLISTEN responses)
+    MOVE_WINDOW = 30
 
     def submit(self, topic):
-        # Check if we need to create a new WebSocket instance
-        if self.ws == [] or len(self.ws[-1].topics) >= 50:
-            self.ws.append(self.__new(len(self.ws)))
-            self.__start(-1)
+        with self.mutex:
+            if self.__find(topic) != -1:
+                return
 
-        self.__submit(-1, topic)
+            # Use the first connection with a free slot, create a new WebSocket instance only if all are full
+            index = next(
+                (
+                    i
+                    for i in range(0, len(self.ws))
+                    if len(self.ws[i].topics) < WebSocketsPool.MAX_TOPICS
+                ),
+                -1,
+            )
+            if index == -1:
+                self.ws.append(self.__new(len(self.ws)))
+                self.__start(self.ws[-1])
+                index = len(self.ws) - 1
+
+            self.__submit(index, topic)
+
+    def unsubmit(self, topic, retire=True):
+        with self.mutex:
+            index = self.__find(topic)
+            if index == -1:
+                return False
+
+            self.__unsubmit(index, topic)
+            self.moving.pop(str(topic), None)
+            # Close the connection if there is nothing left to listen on it
+            if retire is True and self.ws[index].topics == []:
+                self.__retire(index)
+            return True
+
+    def unsubmit_streamer(self, streamer):
+        # Remove all the channel topics (video-playback-by-id, raid, predictions-channel-v1, ...) of a streamer
+        with self.mutex:
+            topics = [
+                topic
+                for ws in self.ws
+                for topic in ws.topics
+                if topic.is_user_topic() is False
+                and str(topic.streamer.channel_id) == str(streamer.channel_id)
+            ]
+            for topic in topics:
+                self.unsubmit(topic)
+            return len(topics)
+
+    def rebalance(self):
+        """
+        Repack the topics in the minimum number of connections (MAX_TOPICS per connection).
+        Topics are moved from the emptiest connections to the free slots of the fullest ones,
+        the new LISTEN is sent before the UNLISTEN so no message is lost, and the copies received on both
+        connections meanwhile are dropped by is_duplicate. Empty connections are retired.
+        """
+        with self.mutex:
+            total = sum(len(ws.topics) for ws in self.ws)
+            if len(self.ws) <= -(-total // WebSocketsPool.MAX_TOPICS):
+                return 0, 0
+
+            moved = 0
+            order = sorted(
+                range(0, len(self.ws)),
+                key=lambda i: len(self.ws[i].topics),
+                reverse=True,
+            )
+            head, tail = 0, len(order) - 1
+            while head < tail:
+                dst, src = self.ws[order[head]], self.ws[order[tail]]
+                if len(dst.topics) >= WebSocketsPool.MAX_TOPICS:
+                    head += 1
+                elif src.topics == []:
+                    tail -= 1
+                else:
+                    topic = src.topics[-1]
+                    self.moving[str(topic)] = time.time() + WebSocketsPool.MOVE_WINDOW
+                    self.__submit(order[head], topic)
+                    self.__unsubmit(order[tail], topic)
+                    moved += 1
+
+            retired = 0
+            for index in range(len(self.ws) - 1, -1, -1):
+                if self.ws[index].topics == []:
+                    self.__retire(index)
+                    retired += 1
+
+            if moved > 0 or retired > 0:
+                logger.info(
+                    f"Rebalanced WebSocket pool: {moved} topics moved, {retired} connections retired, {len(self.ws)} active"
+                )
+            return moved, retired
+
+    def is_duplicate(self, message):
+        # The per-connection check (ws.last_message) can't see the copy received on the other connection
+        if self.moving == {}:
+            return False
+        with self.mutex:
+            now = time.time()
+            self.moving = {
+                topic: until for topic, until in self.moving.items() if until > now
+            }
+            if self.moving == {}:
+                self.seen.clear()
+                return False
+            if f"{message.topic}.{message.topic_user}" not in self.moving:
+                return False
+
+            key = (message.identifier, message.timestamp)
+            if key in self.seen:
+                return True
+            self.seen.add(key)
+            return False
+
+    def __find(self, topic):
+        for index in range(0, len(self.ws)):
+            if topic in self.ws[index].topics:
+                return index
+        return -1
 
     def __submit(self, index, topic):
         # Topic in topics should never happen. Anyway prevent any types of duplicates
@@ -57,11 +210,29 @@ class WebSocketsPool:
         else:
             self.ws[index].listen(topic, self.twitch.twitch_login.get_auth_token())
 
+    def __unsubmit(self, index, topic):
+        if topic in self.ws[index].topics:
+            self.ws[index].topics.remove(topic)
+
+        if topic in self.ws[index].pending_topics:
+            self.ws[index].pending_topics.remove(topic)
+        elif self.ws[index].is_opened is True:
+            self.ws[index].unlisten(topic, self.twitch.twitch_login.get_auth_token())
+
+    def __retire(self, index):
+        ws = self.ws.pop(index)
+        ws.forced_close = True
+        ws.close()
+        # Keep ws.index aligned with the position in the array (used by handle_reconnection)
+        for i in range(index, len(self.ws)):
+            self.ws[i].index = i
+        logger.info(f"#{index} - WebSocket retired, no topics left")
+
     def __new(self, index):
         return TwitchWebSocket(
             index=index,
             parent_pool=self,
-            url=WEBSOCKET,
+            url=constants.WEBSOCKET,
             on_message=WebSocketsPool.on_message,
             on_open=WebSocketsPool.on_open,
             on_error=WebSocketsPool.on_error,
@@ -69,26 +240,25 @@ class WebSocketsPool:
             # on_close=WebSocketsPool.handle_reconnection, # Do nothing.
         )
 
-    def __start(self, index):
+    def __start(self, ws):
         if Settings.disable_ssl_cert_verification is True:
             import ssl
 
             thread_ws = Thread(
-                target=lambda: self.ws[index].run_forever(
-                    sslopt={"cert_reqs": ssl.CERT_NONE}
-                )
+                target=lambda: ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
             )
             logger.warn("SSL certificate verification is disabled! Be aware!")
         else:
-            thread_ws = Thread(target=lambda: self.ws[index].run_forever())
+            thread_ws = Thread(target=lambda: ws.run_forever())
         thread_ws.daemon = True
-        thread_ws.name = f"WebSocket #{self.ws[index].index}"
+        thread_ws.name = f"WebSocket #{ws.index}"
         thread_ws.start()
 
     def end(self):
-        for index in range(0, len(self.ws)):
-            self.ws[index].forced_close = True
-            self.ws[index].close()
+        with self.mutex:
+            for index in range(0, len(self.ws)):
+                self.ws[index].forced_close = True
+                self.ws[index].close()
 
     @staticmethod
     def on_open(ws):
@@ -96,8 +266,10 @@ class WebSocketsPool:
             ws.is_opened = True
             ws.ping()
 
-            for topic in ws.pending_topics:
-                ws.listen(topic, ws.twitch.twitch_login.get_auth_token())
+            with ws.parent_pool.mutex:
+                for topic in ws.pending_topics:
+                    ws.listen(topic, ws.twitch.twitch_login.get_auth_token())
+                ws.pending_topics = []
 
             while ws.is_closed is False:
                 # Else: the ws is currently in reconnecting phase, you can't do ping or other operation.
@@ -143,7 +315,7 @@ class WebSocketsPool:
 
             if ws.forced_close is False:
                 logger.info(
-                    f"#{ws.index} - Reconnecting to Twitch PubSub server in ~60 seconds"
+                    f"#{ws.index} - Reconnecting to Twitch PubSub server in ~30 seconds"
                 )
                 time.sleep(30)
 
@@ -156,47 +328,66 @@ class WebSocketsPool:
 
                 # Why not create a new ws on the same array index? Let's try.
                 self = ws.parent_pool
-                # Create a new connection.
-                self.ws[ws.index] = self.__new(ws.index)
-
-                self.__start(ws.index)  # Start a new thread.
-                time.sleep(30)
-
-                for topic in ws.topics:
-                    self.__submit(ws.index, topic)
+                with self.mutex:
+                    # The connection was retired by the pool while we were waiting
+                    if ws.forced_close is True:
+                        return
+                    # Create a new connection.
+                    self.ws[ws.index] = self.__new(ws.index)
+                    # Topics are queued as pending and sent by on_open
+                    for topic in ws.topics:
+                        self.__submit(ws.index, topic)
+                    self.__start(self.ws[ws.index])  # Start a new thread.
 
     @staticmethod
     def on_message(ws, message):
-        logger.debug(f"#{ws.index} - Received: {message.strip()}")
+        if ws.recorder is not None:
+            ws.recorder.record(ws.index, message)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("#%s - Received: %s", ws.index, message.strip())
         response = json.loads(message)
 
         if response["type"] == "MESSAGE":
-            # We should create a Message class ...
+            # Drop the uninteresting messages before decoding the inner JSON
+            if Message.is_relevant(response["data"], HANDLED_MESSAGE_TYPES) is False:
+                return
+
             message = Message(response["data"])
 
             # If we have more than one PubSub connection, messages may be duplicated
             # Check the concatenation between message_type.top.channel_id
+            # The timestamp is compared (and computed) only if the identifier matches
             if (
-                ws.last_message_type_channel is not None
-                and ws.last_message_timestamp is not None
-                and ws.last_message_timestamp == message.timestamp
-                and ws.last_message_type_channel == message.identifier
+                ws.last_message is not None
+                and ws.last_message.identifier == message.identifier
+                and ws.last_message.timestamp == message.timestamp
             ):
                 return
 
-            ws.last_message_timestamp = message.timestamp
-            ws.last_message_type_channel = message.identifier
+            ws.last_message = message
+
+            # A topic moved by rebalance is received on two connections for a while
+            if ws.parent_pool.is_duplicate(message) is True:
+                return
 
-            streamer_index = get_streamer_index(ws.streamers, message.channel_id)
+            # Snapshot: the streamers can be removed at runtime, the index must not shift
+            streamers = list(ws.streamers)
+            streamer_index = get_streamer_index(streamers, message.channel_id)
             if streamer_index != -1:
                 try:
                     if message.topic == "community-points-user-v1":
                         if message.type in ["points-earned", "points-spent"]:
                             balance = message.data["balance"]["balance"]
-                            ws.streamers[streamer_index].channel_points = balance
+                            streamers[streamer_index].channel_points = balance
+                            event_bus.publish(
+                                "points",
+                                streamer=streamers[streamer_index].username,
+                                balance=balance,
+                            )
                             # Analytics switch
                             if Settings.enable_analytics is True:
-                                ws.streamers[streamer_index].persistent_series(
+                                streamers[streamer_index].persistent_series(
                                     event_type=message.data["point_gain"]["reason_code"]
                                     if message.type == "points-earned"
                                     else "Spent"
@@ -206,38 +397,44 @@ class WebSocketsPool:
                             earned = message.data["point_gain"]["total_points"]
                             reason_code = message.data["point_gain"]["reason_code"]
 
-                            logger.info(
-                                f"+{earned} → {ws.streamers[streamer_index]} - Reason: {reason_code}.",
-                                extra={
-                                    "emoji": ":rocket:",
-                                    "event": Events.get(f"GAIN_FOR_{reason_code}"),
-                                },
+                            # Unknown reasons are published with the raw name, to be logged anyway
+                            event_bus.publish(
+                                Events.get(f"GAIN_FOR_{reason_code}")
+                                or f"GAIN_FOR_{reason_code}",
+                                origin=f"{__name__}.on_message",
+                                message=f"+{earned} → {streamers[streamer_index]} - Reason: {reason_code}.",
+                                emoji=":rocket:",
+                                streamer=streamers[streamer_index].username,
+                                channel_id=streamers[streamer_index].channel_id,
+                                balance=streamers[streamer_index].channel_points,
+                                amount=earned,
+                                reason=reason_code,
                             )
-                            ws.streamers[streamer_index].update_history(
+                            streamers[streamer_index].update_history(
                                 reason_code, earned
                             )
                             # Analytics switch
                             if Settings.enable_analytics is True:
-                                ws.streamers[streamer_index].persistent_annotations(
+                                streamers[streamer_index].persistent_annotations(
                                     reason_code, f"+{earned} - {reason_code}"
                                 )
                         elif message.type == "claim-available":
                             ws.twitch.claim_bonus(
-                                ws.streamers[streamer_index],
+                                streamers[streamer_index],
                                 message.data["claim"]["id"],
                             )
 
                     elif message.topic == "video-playback-by-id":
                         # There is stream-up message type, but it's sent earlier than the API updates
                         if message.type == "stream-up":
-                            ws.streamers[streamer_index].stream_up = time.time()
+                            streamers[streamer_index].stream_up = time.time()
                         elif message.type == "stream-down":
-                            if ws.streamers[streamer_index].is_online is True:
-                                ws.streamers[streamer_index].set_offline()
+                            if streamers[streamer_index].is_online is True:
+                                streamers[streamer_index].set_offline()
                         elif message.type == "viewcount":
-                            if ws.streamers[streamer_index].stream_up_elapsed():
+                            if streamers[streamer_index].stream_up_elapsed():
                                 ws.twitch.check_streamer_online(
-                                    ws.streamers[streamer_index]
+                                    streamers[streamer_index]
                                 )
 
                     elif message.topic == "raid":
@@ -246,12 +443,12 @@ class WebSocketsPool:
                                 message.message["raid"]["id"],
                                 message.message["raid"]["target_login"],
                             )
-                            ws.twitch.update_raid(ws.streamers[streamer_index], raid)
+                            ws.twitch.update_raid(streamers[streamer_index], raid)
 
                     elif message.topic == "community-moments-channel-v1":
                         if message.type == "active":
                             ws.twitch.claim_moment(
-                                ws.streamers[streamer_index], message.data["moment_id"]
+                                streamers[streamer_index], message.data["moment_id"]
                             )
 
                     elif message.topic == "predictions-channel-v1":
@@ -271,11 +468,11 @@ class WebSocketsPool:
                                     event_dict["prediction_window_seconds"]
                                 )
                                 # Reduce prediction window by 3/6s - Collect more accurate data for decision
-                                prediction_window_seconds = ws.streamers[
+                                prediction_window_seconds = streamers[
                                     streamer_index
                                 ].get_prediction_window(prediction_window_seconds)
                                 event = EventPrediction(
-                                    ws.streamers[streamer_index],
+                                    streamers[streamer_index],
                                     event_id,
                                     event_dict["title"],
                                     parser.parse(event_dict["created_at"]),
@@ -284,10 +481,10 @@ class WebSocketsPool:
                                     event_dict["outcomes"],
                                 )
                                 if (
-                                    ws.streamers[streamer_index].is_online
+                                    streamers[streamer_index].is_online
                                     and event.closing_bet_after(current_tmsp) > 0
                                 ):
-                                    streamer = ws.streamers[streamer_index]
+                                    streamer = streamers[streamer_index]
                                     bet_settings = streamer.settings.bet
                                     if (
                                         bet_settings.minimum_points is None
@@ -307,20 +504,27 @@ class WebSocketsPool:
                                         place_bet_thread.daemon = True
                                         place_bet_thread.start()
 
-                                        logger.info(
-                                            f"Place the bet after: {start_after}s for: {ws.events_predictions[event_id]}",
-                                            extra={
-                                                "emoji": ":alarm_clock:",
-                                                "event": Events.BET_START,
-                                            },
+                                        event_bus.publish(
+                                            Events.BET_START,
+                                            origin=f"{__name__}.on_message",
+                                            message=f"Place the bet after: {start_after}s for: {ws.events_predictions[event_id]}",
+                                            emoji=":alarm_clock:",
+                                            streamer=streamer.username,
+                                            channel_id=streamer.channel_id,
+                                            event_id=event_id,
+                                            title=event.title,
+                                            wait_time=start_after,
                                         )
                                     else:
-                                        logger.info(
-                                            f"{streamer} have only {streamer.channel_points} channel points and the minimum for bet is: {bet_settings.minimum_points}",
-                                            extra={
-                                                "emoji": ":pushpin:",
-                                                "event": Events.BET_FILTERS,
-                                            },
+                                        event_bus.publish(
+                                            Events.BET_FILTERS,
+                                            origin=f"{__name__}.on_message",
+                                            message=f"{streamer} have only {streamer.channel_points} channel points and the minimum for bet is: {bet_settings.minimum_points}",
+                                            emoji=":pushpin:",
+                                            streamer=streamer.username,
+                                            channel_id=streamer.channel_id,
+                                            balance=streamer.channel_points,
+                                            minimum_points=bet_settings.minimum_points,
                                         )
 
                         elif (
@@ -352,32 +556,41 @@ class WebSocketsPool:
                                 decision = event_prediction.bet.get_decision()
                                 choice = event_prediction.bet.decision["choice"]
 
-                                logger.info(
-                                    (
+                                event_bus.publish(
+                                    Events.get(f"BET_{event_prediction.result['type']}")
+                                    or f"BET_{event_prediction.result['type']}",
+                                    origin=f"{__name__}.on_message",
+                                    message=(
                                         f"{event_prediction} - Decision: {choice}: {decision['title']} "
                                         f"({decision['color']}) - Result: {event_prediction.result['string']}"
                                     ),
-                                    extra={
-                                        "emoji": ":bar_chart:",
-                                        "event": Events.get(
-                                            f"BET_{event_prediction.result['type']}"
-                                        ),
-                                    },
+                                    emoji=":bar_chart:",
+                                    streamer=streamers[streamer_index].username,
+                                    channel_id=streamers[streamer_index].channel_id,
+                                    balance=streamers[streamer_index].channel_points,
+                                    event_id=event_id,
+                                    title=event_prediction.title,
+                                    result=event_prediction.result["type"],
+                                    decision=choice,
+                                    outcome=decision["title"],
+                                    amount=points["gained"],
+                                    placed=points["placed"],
+                                    won=points["won"],
                                 )
 
-                                ws.streamers[streamer_index].update_history(
+                                streamers[streamer_index].update_history(
                                     "PREDICTION", points["gained"]
                                 )
 
                                 # Remove duplicate history records from previous message sent in community-points-user-v1
                                 if event_prediction.result["type"] == "REFUND":
-                                    ws.streamers[streamer_index].update_history(
+                                    streamers[streamer_index].update_history(
                                         "REFUND",
                                         -points["placed"],
                                         counter=-1,
                                     )
                                 elif event_prediction.result["type"] == "WIN":
-                                    ws.streamers[streamer_index].update_history(
+                                    streamers[streamer_index].update_history(
                                         "PREDICTION",
                                         -points["won"],
                                         counter=-1,
@@ -386,7 +599,7 @@ class WebSocketsPool:
                                 if event_prediction.result["type"]:
                                     # Analytics switch
                                     if Settings.enable_analytics is True:
-                                        ws.streamers[
+                                        streamers[
                                             streamer_index
                                         ].persistent_annotations(
                                             event_prediction.result["type"],
@@ -396,28 +609,35 @@ class WebSocketsPool:
                                 event_prediction.bet_confirmed = True
                                 # Analytics switch
                                 if Settings.enable_analytics is True:
-                                    ws.streamers[streamer_index].persistent_annotations(
+                                    streamers[streamer_index].persistent_annotations(
                                         "PREDICTION_MADE",
                                         f"Decision: {event_prediction.bet.decision['choice']} - {event_prediction.title}",
                                     )
                     elif message.topic == "community-points-channel-v1":
                         if message.type == "community-goal-created":
                             # TODO Untested, hard to find this happening live
-                            ws.streamers[streamer_index].add_community_goal(
+                            streamers[streamer_index].add_community_goal(
                                 CommunityGoal.from_pubsub(message.data["community_goal"])
                             )
                         elif message.type == "community-goal-updated":
-                            ws.streamers[streamer_index].update_community_goal(
+                            streamers[streamer_index].update_community_goal(
                                 CommunityGoal.from_pubsub(message.data["community_goal"])
                             )
                         elif message.type == "community-goal-deleted":
                             # TODO Untested, not sure what the message format for this is,
                             #      https://github.com/sammwyy/twitch-ps/blob/master/main.js#L417
                             #      suggests that it should be just the entire, now deleted, goal model
-                            ws.streamers[streamer_index].delete_community_goal(message.data["community_goal"]["id"])
+                            streamers[streamer_index].delete_community_goal(
+                                message.data["community_goal"]["id"]
+                            )
 
-                        if message.type in ["community-goal-updated", "community-goal-created"]:
-                            ws.twitch.contribute_to_community_goals(ws.streamers[streamer_index])
+                        if message.type in [
+                            "community-goal-updated",
+                            "community-goal-created",
+                        ]:
+                            ws.twitch.contribute_to_community_goals(
+                                streamers[streamer_index]
+                            )
 
                 except Exception:
                     logger.error(
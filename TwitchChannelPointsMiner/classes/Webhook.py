@@ -1,7 +1,6 @@
 from textwrap import dedent
 
-import requests
-
+from TwitchChannelPointsMiner.classes.HttpClient import http_client
 from TwitchChannelPointsMiner.classes.Settings import Events
 
 
@@ -13,14 +12,14 @@ class Webhook(object):
         self.method = method
         self.events = [str(e) for e in events]
 
-    def send(self, message: str, event: Events) -> None:
+    def send(self, message: str, event: Events, payload: dict = None) -> None:
         
         if str(event) in self.events:
             url = self.endpoint + f"?event_name={str(event)}&message={message}" 
             
             if self.method.lower() == "get":
-                requests.get(url=url)
+                http_client.get("webhook", url=url).raise_for_status()
             elif self.method.lower() == "post":
-                requests.post(url=url)
+                http_client.post("webhook", url=url).raise_for_status()
             else:
                 raise ValueError("Invalid method, use POST or GET")
@@ -4,29 +4,34 @@ from TwitchChannelPointsMiner.utils import server_time
 
 
 class Message(object):
+    """
+    PubSub message, parsed lazily.
+    Only the topic is split on creation; the inner JSON and all the derived
+    fields (type, data, timestamp, channel_id, identifier) are computed on first access.
+    """
+
     __slots__ = [
         "topic",
         "topic_user",
-        "message",
-        "type",
-        "data",
-        "timestamp",
-        "channel_id",
-        "identifier",
+        "raw",
+        "_message",
+        "_type",
+        "_data",
+        "_timestamp",
+        "_channel_id",
+        "_identifier",
     ]
 
     def __init__(self, data):
         self.topic, self.topic_user = data["topic"].split(".")
+        self.raw = data["message"]
 
-        self.message = json.loads(data["message"])
-        self.type = self.message["type"]
-
-        self.data = self.message["data"] if "data" in self.message else None
-
-        self.timestamp = self.__get_timestamp()
-        self.channel_id = self.__get_channel_id()
-
-        self.identifier = f"{self.type}.{self.topic}.{self.channel_id}"
+        self._message = None
+        self._type = None
+        self._data = None
+        self._timestamp = None
+        self._channel_id = None
+        self._identifier = None
 
     def __repr__(self):
         return f"{self.message}"
@@ -34,6 +39,77 @@ class Message(object):
     def __str__(self):
         return f"{self.message}"
 
+    @staticmethod
+    def prefilter(handled_types):
+        """
+        Build the lookup table used by is_relevant from a dict {topic: [message types]}.
+        A None list means that all the message types of the topic are relevant.
+        """
+        return {
+            topic: None
+            if types is None
+            else tuple(f'"{message_type}"' for message_type in types)
+            for topic, types in handled_types.items()
+        }
+
+    @staticmethod
+    def is_relevant(data, prefilter):
+        """
+        Cheap pre-filter on the raw PubSub frame, the inner JSON is not decoded.
+        A message is relevant if the topic is handled and at least one of the handled types
+        appears as a quoted string in the raw message.
+        A false positive only costs a full decode, a false negative is not possible.
+        """
+        topic = data["topic"].partition(".")[0]
+        if topic not in prefilter:
+            return False
+        types = prefilter[topic]
+        if types is None:
+            return True
+        raw = data["message"]
+        for quoted_type in types:
+            if quoted_type in raw:
+                return True
+        return False
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = json.loads(self.raw)
+            self._type = self._message["type"]
+            self._data = self._message["data"] if "data" in self._message else None
+        return self._message
+
+    @property
+    def type(self):
+        if self._message is None:
+            self.message
+        return self._type
+
+    @property
+    def data(self):
+        if self._message is None:
+            self.message
+        return self._data
+
+    @property
+    def timestamp(self):
+        if self._timestamp is None:
+            self._timestamp = self.__get_timestamp()
+        return self._timestamp
+
+    @property
+    def channel_id(self):
+        if self._channel_id is None:
+            self._channel_id = self.__get_channel_id()
+        return self._channel_id
+
+    @property
+    def identifier(self):
+        if self._identifier is None:
+            self._identifier = f"{self.type}.{self.topic}.{self.channel_id}"
+        return self._identifier
+
     def __get_timestamp(self):
         return (
             server_time(self.message)
@@ -14,3 +14,9 @@ class PubsubTopic(object):
             return f"{self.topic}.{self.user_id}"
         else:
             return f"{self.topic}.{self.streamer.channel_id}"
+
+    def __eq__(self, other):
+        return isinstance(other, PubsubTopic) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
@@ -64,7 +64,7 @@ class Stream(object):
         )
         self.__last_update = time.time()
 
-        logger.debug(f"Update: {self}")
+        logger.debug("Update: %s", self)
 
     def __repr__(self):
         return f"Stream(title={self.title}, game={self.__str_game()}, tags={self.__str_tags()})"
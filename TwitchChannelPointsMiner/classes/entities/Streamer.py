@@ -1,13 +1,11 @@
-import json
 import logging
-import os
 import time
 from datetime import datetime
-from threading import Lock
 
 from TwitchChannelPointsMiner.classes.Chat import ChatPresence, ThreadChat
 from TwitchChannelPointsMiner.classes.entities.Bet import BetSettings, DelayMode
 from TwitchChannelPointsMiner.classes.entities.Stream import Stream
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
 from TwitchChannelPointsMiner.classes.Settings import Events, Settings
 from TwitchChannelPointsMiner.constants import URL
 from TwitchChannelPointsMiner.utils import _millify
@@ -87,7 +85,6 @@ class Streamer(object):
         "raid",
         "history",
         "streamer_url",
-        "mutex",
     ]
 
     def __init__(self, username, settings=None):
@@ -112,8 +109,6 @@ class Streamer(object):
 
         self.streamer_url = f"{URL}/{self.username}"
 
-        self.mutex = Lock()
-
     def __repr__(self):
         return f"Streamer(username={self.username}, channel_id={self.channel_id}, channel_points={_millify(self.channel_points)})"
 
@@ -130,13 +125,14 @@ class Streamer(object):
             self.is_online = False
 
         self.toggle_chat()
-
-        logger.info(
-            f"{self} is Offline!",
-            extra={
-                "emoji": ":sleeping:",
-                "event": Events.STREAMER_OFFLINE,
-            },
+        event_bus.publish(
+            Events.STREAMER_OFFLINE,
+            origin=f"{__name__}.set_offline",
+            message=f"{self} is Offline!",
+            emoji=":sleeping:",
+            streamer=self.username,
+            channel_id=self.channel_id,
+            balance=self.channel_points,
         )
 
     def set_online(self):
@@ -146,13 +142,14 @@ class Streamer(object):
             self.stream.init_watch_streak()
 
         self.toggle_chat()
-
-        logger.info(
-            f"{self} is Online!",
-            extra={
-                "emoji": ":partying_face:",
-                "event": Events.STREAMER_ONLINE,
-            },
+        event_bus.publish(
+            Events.STREAMER_ONLINE,
+            origin=f"{__name__}.set_online",
+            message=f"{self} is Online!",
+            emoji=":partying_face:",
+            streamer=self.username,
+            channel_id=self.channel_id,
+            balance=self.channel_points,
         )
 
     def print_history(self):
@@ -236,8 +233,9 @@ class Streamer(object):
     def persistent_series(self, event_type="Watch"):
         self.__save_json("series", event_type=event_type)
 
-    def __save_json(self, key, data={}, event_type="Watch"):
+    def __save_json(self, key, data=None, event_type="Watch"):
         # https://stackoverflow.com/questions/4676195/why-do-i-need-to-multiply-unix-timestamps-by-1000-in-javascript
+        data = {} if data is None else data
         now = datetime.now().replace(microsecond=0)
         data.update({"x": round(datetime.timestamp(now) * 1000)})
 
@@ -246,20 +244,8 @@ class Streamer(object):
             if event_type is not None:
                 data.update({"z": event_type.replace("_", " ").title()})
 
-        fname = os.path.join(Settings.analytics_path, f"{self.username}.json")
-        temp_fname = fname + ".temp"  # Temporary file name
-
-        with self.mutex:
-            # Create and write to the temporary file
-            with open(temp_fname, "w") as temp_file:
-                json_data = json.load(open(fname, "r")) if os.path.isfile(fname) else {}
-                if key not in json_data:
-                    json_data[key] = []
-                json_data[key].append(data)
-                json.dump(json_data, temp_file, indent=4)
-
-            # Replace the original file with the temporary file
-            os.replace(temp_fname, fname)
+        # The AnalyticsWriter (storage) and the dashboard are subscribers
+        event_bus.publish(key, streamer=self.username, data=data)
 
     def leave_chat(self):
         if self.irc_chat is not None:
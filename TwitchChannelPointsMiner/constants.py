@@ -1,10 +1,13 @@
+import os
+
 # Twitch endpoints
 URL = "https://www.twitch.tv"               # Browser, Apps
 # URL = "https://m.twitch.tv"               # Mobile Browser
 # URL = "https://android.tv.twitch.tv"      # TV
 IRC = "irc.chat.twitch.tv"
 IRC_PORT = 6667
-WEBSOCKET = "wss://pubsub-edge.twitch.tv/v1"
+# Set TWITCH_PUBSUB_URL (e.g. ws://127.0.0.1:8765 with pubsub_server.py) to use a local PubSub server for load tests
+WEBSOCKET = os.environ.get("TWITCH_PUBSUB_URL", "wss://pubsub-edge.twitch.tv/v1")
 CLIENT_ID = "ue6666qo983tsx6so1t0vnawi233wa"        # TV
 # CLIENT_ID = "kimne78kx3ncx6brgo4mv6wki5h1ko"      # Browser
 # CLIENT_ID = "r8s4dac0uhzifbpu9sjdiwzctle17ff"     # Mobile Browser
@@ -227,3 +230,8 @@ class GQLOperations:
             }
         }
     }
+    # Not a persisted query: used by the ProfileCache to get the avatars of many streamers at once
+    ProfileImages = (
+        "query ProfileImages($logins: [String!]) "
+        "{ users(logins: $logins) { login profileImageURL(width: 300) } }"
+    )
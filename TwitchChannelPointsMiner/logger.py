@@ -1,24 +1,32 @@
+import json
 import logging
 import os
 import platform
 import queue
 import pytz
 import sys
-from datetime import datetime
-from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from datetime import datetime, timezone
+from itertools import count
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
-import emoji
 from colorama import Fore, init
 
 from TwitchChannelPointsMiner.classes.Discord import Discord
+from TwitchChannelPointsMiner.classes.EventBus import event_bus
+from TwitchChannelPointsMiner.classes.LogRotation import CompressedRotatingFileHandler
 from TwitchChannelPointsMiner.classes.Webhook import Webhook
 from TwitchChannelPointsMiner.classes.Matrix import Matrix
+from TwitchChannelPointsMiner.classes.NotificationDispatcher import (
+    NotificationDispatcher,
+)
 from TwitchChannelPointsMiner.classes.Settings import Events
 from TwitchChannelPointsMiner.classes.Telegram import Telegram
 from TwitchChannelPointsMiner.classes.Pushover import Pushover
 from TwitchChannelPointsMiner.classes.Gotify import Gotify
-from TwitchChannelPointsMiner.utils import remove_emoji
+from TwitchChannelPointsMiner.utils import emojize_alias, remove_emoji
+
+NOTIFIERS = ["telegram", "discord", "webhook", "matrix", "pushover", "gotify"]
 
 
 # Fore: BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE, RESET.
@@ -59,7 +67,7 @@ class ColorPalette(object):
                     setattr(self, k.upper(), getattr(Fore, kwargs[k].upper()))
 
     def get(self, key):
-        color = getattr(self, str(key)) if str(key) in dir(self) else None
+        color = getattr(self, str(key), None)
         return Fore.RESET if color is None else color
 
 
@@ -81,6 +89,12 @@ class LoggerSettings:
         "matrix",
         "pushover",
         "gotify",
+        "notifications",
+        "debug_sampling",
+        "json_file",
+        "max_bytes",
+        "max_total_bytes",
+        "compress",
         "username"
     ]
 
@@ -102,6 +116,12 @@ class LoggerSettings:
         matrix: Matrix or None = None,
         pushover: Pushover or None = None,
         gotify: Gotify or None = None,
+        notifications: NotificationDispatcher or None = None,
+        debug_sampling: dict or None = None,
+        json_file: bool = False,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_total_bytes: int = 500 * 1024 * 1024,
+        compress: bool = True,
         username: str or None = None
     ):
         self.save = save
@@ -120,13 +140,34 @@ class LoggerSettings:
         self.matrix = matrix
         self.pushover = pushover
         self.gotify = gotify
+        self.notifications = notifications
+        self.debug_sampling = debug_sampling
+        self.json_file = json_file
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
         self.username = username
 
 
+class DebugSampler(logging.Filter):
+    """Keep one DEBUG record every `rate` for a noisy logger, the other levels always pass"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self.counter = count()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        return next(self.counter) % self.rate == 0
+
+
 class FileFormatter(logging.Formatter):
     def __init__(self, *, fmt, settings: LoggerSettings, datefmt=None):
         self.settings = settings
         self.timezone = None
+        self.last_time = (None, None)
         if settings.time_zone:
             try:
                 self.timezone = pytz.timezone(settings.time_zone)
@@ -137,17 +178,22 @@ class FileFormatter(logging.Formatter):
         logging.Formatter.__init__(self, fmt=fmt, datefmt=datefmt)
 
     def formatTime(self, record, datefmt=None):
-        if self.timezone:
-            dt = datetime.fromtimestamp(record.created, self.timezone)
-        else:
-            dt = datetime.fromtimestamp(record.created)
-        return dt.strftime(datefmt or self.default_time_format)
+        # The date format has no milliseconds: the records of the same second share the string
+        key = (int(record.created), datefmt)
+        if key != self.last_time[0]:
+            if self.timezone:
+                dt = datetime.fromtimestamp(key[0], self.timezone)
+            else:
+                dt = datetime.fromtimestamp(key[0])
+            self.last_time = (key, dt.strftime(datefmt or self.default_time_format))
+        return self.last_time[1]
 
 
 class GlobalFormatter(logging.Formatter):
     def __init__(self, *, fmt, settings: LoggerSettings, datefmt=None):
         self.settings = settings
         self.timezone = None
+        self.last_time = (None, None)
         if settings.time_zone:
             try:
                 self.timezone = pytz.timezone(settings.time_zone)
@@ -159,122 +205,118 @@ class GlobalFormatter(logging.Formatter):
         logging.Formatter.__init__(self, fmt=fmt, datefmt=datefmt)
 
     def formatTime(self, record, datefmt=None):
-        if self.timezone:
-            dt = datetime.fromtimestamp(record.created, self.timezone)
+        # The date format has no milliseconds: the records of the same second share the string
+        key = (int(record.created), datefmt)
+        if key != self.last_time[0]:
+            if self.timezone:
+                dt = datetime.fromtimestamp(key[0], self.timezone)
+            else:
+                dt = datetime.fromtimestamp(key[0])
+            self.last_time = (key, dt.strftime(datefmt or self.default_time_format))
+        return self.last_time[1]
+
+    def formatMessage(self, record):
+        # The message is rendered for this handler only: record.msg is shared with the file handler and left untouched
+        record.message = self.render(record)
+        return super().formatMessage(record)
+
+    def render(self, record):
+        message = record.message
+        if self.settings.emoji is True:
+            if getattr(record, "emoji", None) is not None:
+                message = f"{emojize_alias(record.emoji)}  {message.strip()}"
         else:
-            dt = datetime.fromtimestamp(record.created)
-        return dt.strftime(datefmt or self.default_time_format)
+            # With the update of Stream class, the Stream Title may contain emoji
+            message = remove_emoji(message.replace("\u2192", "-->"))
+
+        message = self.settings.username + message
+
+        if self.settings.colored is True and getattr(record, "event", None) is not None:
+            message = f"{self.settings.color_palette.get(record.event)}{message}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the fields of the event, no emoji, colors or username"""
+
+    FIELDS = ["event", "streamer", "channel_id", "amount", "reason", "latency"]
+    # The C encoder of the json module, configured once
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
 
     def format(self, record):
-        record.emoji_is_present = (
-            record.emoji_is_present if hasattr(
-                record, "emoji_is_present") else False
-        )
-        if (
-            hasattr(record, "emoji")
-            and self.settings.emoji is True
-            and record.emoji_is_present is False
-        ):
-            record.msg = emoji.emojize(
-                f"{record.emoji}  {record.msg.strip()}", language="alias"
+        line = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                line[field] = value
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return self.encoder.encode(line)
+
+
+def log_event(event, payload):
+    # Logging is a subscriber of the event bus, like the notifiers and the analytics.
+    # The events without a message (points, series, annotations) are not logged
+    if payload.get("message") is None:
+        return
+
+    # The record is attributed to the module and function that published the event: origin="module.function"
+    name, _, function = payload.get("origin", "").rpartition(".")
+    source = logging.getLogger(name or __name__)
+    level = payload.get("level", logging.INFO)
+    if source.isEnabledFor(level) is False:
+        return
+    extra = {"event": event}
+    for key in ["emoji", "streamer", "channel_id", "amount", "reason", "latency"]:
+        if payload.get(key) is not None:
+            extra[key] = payload[key]
+    for line in str(payload["message"]).split("\n"):
+        source.handle(
+            source.makeRecord(
+                source.name,
+                level,
+                "(unknown file)",
+                0,
+                line,
+                None,
+                None,
+                func=function or "log_event",
+                extra=extra,
             )
-            record.emoji_is_present = True
+        )
 
-        if self.settings.emoji is False:
-            if "\u2192" in record.msg:
-                record.msg = record.msg.replace("\u2192", "-->")
 
-            # With the update of Stream class, the Stream Title may contain emoji
-            # Full remove using a method from utils.
-            record.msg = remove_emoji(record.msg)
-
-        record.msg = self.settings.username + record.msg
-
-        if hasattr(record, "event"):
-            self.telegram(record)
-            self.discord(record)
-            self.webhook(record)
-            self.matrix(record)
-            self.pushover(record)
-            self.gotify(record)
-
-            if self.settings.colored is True:
-                record.msg = (
-                    f"{self.settings.color_palette.get(record.event)}{record.msg}"
-                )
-
-        return super().format(record)
-
-    def telegram(self, record):
-        skip_telegram = False if hasattr(
-            record, "skip_telegram") is False else True
-
-        if (
-            self.settings.telegram is not None
-            and skip_telegram is False
-            and self.settings.telegram.chat_id != 123456789
-        ):
-            self.settings.telegram.send(record.msg, record.event)
-
-    def discord(self, record):
-        skip_discord = False if hasattr(
-            record, "skip_discord") is False else True
-
-        if (
-            self.settings.discord is not None
-            and skip_discord is False
-            and self.settings.discord.webhook_api
+def is_configured(name, notifier):
+    # Skip the notifiers left with the placeholder values of example.py
+    if notifier is None:
+        return False
+    if name == "telegram":
+        return notifier.chat_id != 123456789
+    if name == "discord":
+        return (
+            notifier.webhook_api
             != "https://discord.com/api/webhooks/0123456789/0a1B2c3D4e5F6g7H8i9J"
-        ):
-            self.settings.discord.send(record.msg, record.event)
-
-    def webhook(self, record):
-        skip_webhook = False if hasattr(
-            record, "skip_webhook") is False else True
-
-        if (
-            self.settings.webhook is not None
-            and skip_webhook is False
-            and self.settings.webhook.endpoint
-            != "https://example.com/webhook"
-        ):
-            self.settings.webhook.send(record.msg, record.event)
-
-    def matrix(self, record):
-        skip_matrix = False if hasattr(
-            record, "skip_matrix") is False else True
-
-        if (
-            self.settings.matrix is not None
-            and skip_matrix is False
-            and self.settings.matrix.room_id != "..."
-            and self.settings.matrix.access_token
-        ):
-            self.settings.matrix.send(record.msg, record.event)
-
-    def pushover(self, record):
-        skip_pushover = False if hasattr(
-            record, "skip_pushover") is False else True
-
-        if (
-            self.settings.pushover is not None
-            and skip_pushover is False
-            and self.settings.pushover.userkey != "YOUR-ACCOUNT-TOKEN"
-            and self.settings.pushover.token != "YOUR-APPLICATION-TOKEN"
-        ):
-            self.settings.pushover.send(record.msg, record.event)
-
-    def gotify(self, record):
-        skip_gotify = False if hasattr(
-            record, "skip_gotify") is False else True
-
-        if (
-            self.settings.gotify is not None
-            and skip_gotify is False
-            and self.settings.gotify.endpoint
-            != "https://example.com/message?token=TOKEN"
-        ):
-            self.settings.gotify.send(record.msg, record.event)
+        )
+    if name == "webhook":
+        return notifier.endpoint != "https://example.com/webhook"
+    if name == "matrix":
+        return notifier.room_id != "..." and bool(notifier.access_token)
+    if name == "pushover":
+        return (
+            notifier.userkey != "YOUR-ACCOUNT-TOKEN"
+            and notifier.token != "YOUR-APPLICATION-TOKEN"
+        )
+    if name == "gotify":
+        return notifier.endpoint != "https://example.com/message?token=TOKEN"
+    return True
 
 
 def configure_loggers(username, settings):
@@ -285,7 +327,14 @@ def configure_loggers(username, settings):
     logger_queue = queue.Queue(-1)
     queue_handler = QueueHandler(logger_queue)
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
+    # The lowest level of the handlers: the records below it are not even created
+    root_logger.setLevel(
+        min(settings.console_level, settings.file_level)
+        if settings.save is True or settings.json_file is True
+        else settings.console_level
+    )
+    for name, rate in (settings.debug_sampling or {}).items():
+        logging.getLogger(name).addFilter(DebugSampler(rate))
     # Add the queue handler to the root logger
     # Send log messages to another thread through the queue
     root_logger.addHandler(queue_handler)
@@ -295,6 +344,22 @@ def configure_loggers(username, settings):
 
     settings.username = console_username
 
+    # Every configured notifier gets its own queue and workers
+    if settings.notifications is None:
+        settings.notifications = NotificationDispatcher()
+    settings.notifications.prefix = console_username
+    settings.notifications.emoji = settings.emoji
+    for name in NOTIFIERS:
+        notifier = getattr(settings, name)
+        if is_configured(name, notifier) is True:
+            settings.notifications.register(name, notifier)
+
+    # The events published by WebSocketsPool, Twitch, Streamer and Chat are logged and notified by these subscribers
+    event_bus.subscribe(log_event)
+    # Like the console: the events below console_level are not notified
+    settings.notifications.level = settings.console_level
+    event_bus.subscribe(settings.notifications.on_event)
+
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(settings.console_level)
     console_handler.setFormatter(
@@ -311,31 +376,17 @@ def configure_loggers(username, settings):
         )
     )
 
-    if settings.save is True:
-        logs_path = os.path.join(Path().absolute(), "logs")
-        Path(logs_path).mkdir(parents=True, exist_ok=True)
-        if settings.auto_clear is True:
-            logs_file = os.path.join(
-                logs_path,
-                f"{username}.log",
-            )
-            file_handler = TimedRotatingFileHandler(
-                logs_file,
-                when="D",
-                interval=1,
-                backupCount=7,
-                encoding="utf-8",
-                delay=False,
-            )
-        else:
-            # Getting time zone from the console_handler's formatter since they are the same
-            tz = "" if console_handler.formatter.timezone is False else console_handler.formatter.timezone
-            logs_file = os.path.join(
-                logs_path,
-                f"{username}.{datetime.now(tz).strftime('%Y%m%d-%H%M%S')}.log",
-            )
-            file_handler = logging.FileHandler(logs_file, "w", "utf-8")
+    # Getting time zone from the console_handler's formatter since they are the same
+    tz = (
+        ""
+        if console_handler.formatter.timezone is False
+        else console_handler.formatter.timezone
+    )
 
+    logs_file = None
+    handlers = [console_handler]
+    if settings.save is True:
+        logs_file, file_handler = create_file_handler(username, "log", settings, tz)
         file_handler.setFormatter(
             FileFormatter(
                 fmt="%(asctime)s - %(levelname)s - %(name)s - [%(funcName)s]: %(message)s",
@@ -344,16 +395,50 @@ def configure_loggers(username, settings):
             )
         )
         file_handler.setLevel(settings.file_level)
-
-        # Add logger handlers to the logger queue and start the process
-        queue_listener = QueueListener(
-            logger_queue, file_handler, console_handler, respect_handler_level=True
+        handlers.insert(0, file_handler)
+
+    if settings.json_file is True:
+        # Same records of the log file, for the tools that parse the logs
+        _, json_handler = create_file_handler(username, "jsonl", settings, tz)
+        json_handler.setFormatter(JsonFormatter())
+        json_handler.setLevel(settings.file_level)
+        handlers.insert(0, json_handler)
+
+    # Add logger handlers to the logger queue and start the process
+    queue_listener = QueueListener(logger_queue, *handlers, respect_handler_level=True)
+    queue_listener.start()
+    return logs_file, queue_listener
+
+
+def create_file_handler(username, extension, settings, tz):
+    logs_path = os.path.join(Path().absolute(), "logs")
+    Path(logs_path).mkdir(parents=True, exist_ok=True)
+    if settings.auto_clear is True:
+        logs_file = os.path.join(
+            logs_path,
+            f"{username}.{extension}",
+        )
+        # Every day or every max_bytes, the old files are deleted after 7 days or when over max_total_bytes
+        file_handler = CompressedRotatingFileHandler(
+            logs_file,
+            interval=86400,
+            max_bytes=settings.max_bytes,
+            max_age=7 * 86400,
+            max_total_bytes=settings.max_total_bytes,
+            compress=settings.compress,
         )
-        queue_listener.start()
-        return logs_file, queue_listener
     else:
-        queue_listener = QueueListener(
-            logger_queue, console_handler, respect_handler_level=True
+        logs_file = os.path.join(
+            logs_path,
+            f"{username}.{datetime.now(tz).strftime('%Y%m%d-%H%M%S')}.{extension}",
+        )
+        # A file for each run, kept forever: only split (and compressed) every max_bytes
+        file_handler = CompressedRotatingFileHandler(
+            logs_file,
+            interval=None,
+            max_bytes=settings.max_bytes,
+            max_age=None,
+            max_total_bytes=None,
+            compress=settings.compress,
         )
-        queue_listener.start()
-        return None, queue_listener
+    return logs_file, file_handler
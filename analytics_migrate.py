@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# Convert the analytics files of the old format (analytics/<username>/<streamer>.json) to the
+# append-only format (<streamer>.jsonl). The miner does the same on startup, this script allows
+# to migrate (and compact) the files offline. The original files are kept as <streamer>.json.bak
+
+import argparse
+import logging
+import os
+
+from TwitchChannelPointsMiner.classes.AnalyticsStorage import (
+    JsonLinesStorage,
+    migrate_json_file,
+)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migrate the analytics files to JSON lines")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Analytics folders (e.g. analytics/username) or single .json files",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Compact the .jsonl files after the migration",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            storage = JsonLinesStorage(path, compact_interval=None)
+            if args.compact is True:
+                for username in storage.streamers():
+                    if storage.compact(username) is True:
+                        print(f"Compacted {storage.fname(username)}")
+        elif path.endswith(".json"):
+            migrate_json_file(path)
+        else:
+            print(f"Skipped {path}: not a folder or a .json file")
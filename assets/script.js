@@ -98,8 +98,10 @@ $(document).ready(function () {
     // Variable to keep track of whether auto-update log is active
     var autoUpdateLog = true;
 
-    // Variable to keep track of the last received log index
-    var lastReceivedLogIndex = 0;
+    // Position in the log file of the last received lines, sent back to the server
+    var logCursor = "";
+    // Server-Sent Events stream of the log, if supported by the browser
+    var logSource = null;
 
     $('#auto-update-log').click(() => {
         autoUpdateLog = !autoUpdateLog;
@@ -107,27 +109,47 @@ $(document).ready(function () {
 
         if (autoUpdateLog) {
             getLog();
+        } else {
+            stopLog();
         }
     });
 
-    // Function to get the full log content
+    function appendLog(data) {
+        // Process and display the new log entries received
+        $("#log-content").append(document.createTextNode(data));
+        // Scroll to the bottom of the log content
+        $("#log-content").scrollTop($("#log-content")[0].scrollHeight);
+    }
+
+    function stopLog() {
+        if (logSource !== null) {
+            logSource.close();
+            logSource = null;
+        }
+    }
+
+    // Function to get the new log lines
     function getLog() {
-        if (isLogCheckboxChecked) {
-            $.get(`/log?lastIndex=${lastReceivedLogIndex}`, function (data) {
-                // Process and display the new log entries received
-                $("#log-content").append(data);
-                // Scroll to the bottom of the log content
-                $("#log-content").scrollTop($("#log-content")[0].scrollHeight);
-
-                // Update the last received log index
-                lastReceivedLogIndex += data.length;
-
-                if (autoUpdateLog) {
-                    // Call getLog() again after a certain interval (e.g., 1 second)
-                    setTimeout(getLog, 1000);
-                }
-            });
+        if (!isLogCheckboxChecked) return;
+        if (window.EventSource) {
+            if (logSource === null) {
+                logSource = new EventSource(`/log/stream?cursor=${encodeURIComponent(logCursor)}`);
+                logSource.onmessage = function (event) {
+                    appendLog(event.data + "\n");
+                    logCursor = event.lastEventId;
+                };
+            }
+            return;
         }
+        $.get(`/log?cursor=${encodeURIComponent(logCursor)}`, function (data, status, xhr) {
+            appendLog(data);
+            logCursor = xhr.getResponseHeader("X-Log-Cursor");
+
+            if (autoUpdateLog) {
+                // Call getLog() again after a certain interval (e.g., 1 second)
+                setTimeout(getLog, 1000);
+            }
+        });
     }
 
     // Retrieve the saved header visibility preference from localStorage
@@ -188,6 +210,7 @@ $(document).ready(function () {
     else sortField = 'name';
     $('#sorting-by').text(sortBy);
     getStreamers();
+    listenLiveUpdates();
 
     updateAnnotations();
     toggleDarkMode();
@@ -216,6 +239,7 @@ $(document).ready(function () {
         } else {
             $('#log-box').hide();
             $('#auto-update-log').hide();
+            stopLog();
             // Clear log content when checkbox is unchecked
             // $("#log-content").text('');
         }
@@ -249,12 +273,20 @@ function changeStreamer(streamer, index) {
     getStreamerData(streamer);
 }
 
+// Position in the analytics of the current streamer, the refresh only asks what was written after it
+var cursor = null;
+var refreshTimeout = null;
+
 function getStreamerData(streamer) {
     if (currentStreamer == streamer) {
-        $.getJSON(`./json/${streamer}`, {
+        var params = {
             startDate: formatDate(startDate),
-            endDate: formatDate(endDate)
-        }, function (response) {
+            endDate: formatDate(endDate),
+            points: maxPoints()
+        };
+        var resolution = rollupResolution();
+        if (resolution) params.resolution = resolution;
+        $.getJSON(`./json/${streamer}`, params, function (response) {
             chart.updateSeries([{
                 name: streamer.replace(".json", ""),
                 data: response["series"]
@@ -262,15 +294,88 @@ function getStreamerData(streamer) {
             clearAnnotations();
             annotations = response["annotations"];
             updateAnnotations();
-            setTimeout(function () {
-                getStreamerData(streamer);
-            }, 300000); // 5 minutes
+            // The rollups and the 'No Stream' placeholder are reloaded, the raw points are updated with deltas
+            var noStream = response["series"].some(point => point.z === "No Stream");
+            cursor = (resolution || noStream) ? null : response["cursor"];
+            scheduleRefresh(streamer);
         });
     }
 }
 
+function scheduleRefresh(streamer) {
+    clearTimeout(refreshTimeout);
+    refreshTimeout = setTimeout(function () {
+        if (cursor === null) getStreamerData(streamer);
+        else getStreamerDelta(streamer);
+    }, 300000); // 5 minutes
+}
+
+function getStreamerDelta(streamer) {
+    if (currentStreamer != streamer) return;
+    $.getJSON(`./json/${streamer}`, { cursor: cursor }, function (response) {
+        if (response["reset"] === true) {
+            getStreamerData(streamer);
+            return;
+        }
+        cursor = response["cursor"];
+        var last = chart.w.config.series[0].data.slice(-1)[0];
+        var end = endDate.getTime() + 24 * 60 * 60 * 1000;
+        // The records after the cursor can repeat the last ones already drawn
+        var series = response["series"].filter(point => point.x < end && (!last || point.x > last.x || (point.x === last.x && point.y !== last.y)));
+        var newAnnotations = response["annotations"].filter(annotation => annotation.x < end && !annotations.some(a => a.x === annotation.x && a.label.text === annotation.label.text));
+        if (series.length > 0) chart.appendData([{ data: series }]);
+        if (newAnnotations.length > 0) {
+            clearAnnotations();
+            annotations = annotations.concat(newAnnotations);
+            updateAnnotations();
+        }
+        scheduleRefresh(streamer);
+    });
+}
+
+// Live updates pushed by the miner (Server-Sent Events), the chart and the list are updated without polling
+function listenLiveUpdates() {
+    if (!window.EventSource) return;
+    var source = new EventSource("/live");
+    source.addEventListener("series", function (event) {
+        var payload = JSON.parse(event.data);
+        // Only the raw points view is updated, the rollups are reloaded by the refresh
+        if (`${payload.streamer}.json` !== currentStreamer || cursor === null) return;
+        if (payload.data.x > endDate.getTime() + 24 * 60 * 60 * 1000) return;
+        chart.appendData([{ data: [payload.data] }]);
+    });
+    source.addEventListener("annotations", function (event) {
+        var payload = JSON.parse(event.data);
+        if (`${payload.streamer}.json` !== currentStreamer || cursor === null) return;
+        clearAnnotations();
+        annotations = annotations.concat([payload.data]);
+        updateAnnotations();
+    });
+    source.addEventListener("points", function (event) {
+        var payload = JSON.parse(event.data);
+        var streamer = streamersList.find(s => s.name === `${payload.streamer}.json`);
+        if (!streamer) return;
+        streamer.points = payload.balance;
+        streamer.last_activity = Date.now();
+        if (sortField == 'points') $(`#streamer-${payload.streamer}\\.json font`).text(payload.balance);
+    });
+}
+
+// The server downsamples the series to about 2 points for each horizontal pixel of the chart
+function maxPoints() {
+    return Math.max(500, Math.round($("#chart").width() * 2));
+}
+
+// Long ranges are read from the rollups of the server (one point each hour / day) instead of the raw points
+function rollupResolution() {
+    var days = (endDate - startDate) / (24 * 60 * 60 * 1000);
+    if (days > 365) return "1d";
+    if (days > 31) return "1h";
+    return null;
+}
+
 function getAllStreamersData() {
-    $.getJSON(`./json_all`, function (response) {
+    $.getJSON(`./json_all`, { points: maxPoints() }, function (response) {
         for (var i in response) {
             chart.appendSeries({
                 name: response[i]["name"].replace(".json", ""),
@@ -0,0 +1,456 @@
+#!/usr/bin/env python
+
+# Benchmarks of the hot paths, for development only (they don't talk with Twitch).
+#   python benchmark.py pubsub                                # Replay fixtures/pubsub_sample.jsonl.gz through on_message
+#   python benchmark.py pubsub --save pubsub_baseline.json    # Save the result as baseline
+#   python benchmark.py pubsub --compare pubsub_baseline.json # Exit with 1 if slower than the baseline
+#   python benchmark.py message                               # Lazy Message parsing and pre-filter vs full parsing
+#   python benchmark.py lttb                                  # Payload and time of the downsampled analytics series
+#   python benchmark.py filter                                # Analytics date filter at 10k, 100k and 1M points
+#   python benchmark.py logging                               # Cost of the debug calls of the hot paths
+#   python benchmark.py formatter                             # Records per second through the QueueListener
+#   python benchmark.py rotation                              # Log writes with size rotation and gzip compression
+
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+
+PUBSUB_FIXTURE = "fixtures/pubsub_sample.jsonl.gz"
+
+
+def best_of(function, rounds):
+    # Seconds of the fastest run
+    timings = []
+    for _ in range(0, rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def pubsub_frame(topic, message):
+    return json.dumps(
+        {
+            "type": "MESSAGE",
+            "data": {"topic": topic, "message": json.dumps(message)},
+        }
+    )
+
+
+def message_frames(count, channels=6):
+    # The mix of a large watch list: 60% viewcount, 40% message types not handled by on_message
+    now = time.time()
+    frames = []
+    for index in range(0, count):
+        channel_id = str(1000 + index % channels)
+        if random.random() < 0.6:
+            message = {"type": "viewcount", "server_time": now + index, "viewers": 1234}
+            frames.append(pubsub_frame(f"video-playback-by-id.{channel_id}", message))
+        elif random.random() < 0.5:
+            message = {"type": "commercial", "server_time": now + index, "length": 90}
+            frames.append(pubsub_frame(f"video-playback-by-id.{channel_id}", message))
+        else:
+            message = {
+                "type": "global-last-viewed-content-updated",
+                "data": {
+                    "timestamp": "2024-05-01T10:00:00.000000000Z",
+                    "channel_id": channel_id,
+                    "last_viewed_content": [],
+                },
+            }
+            frames.append(pubsub_frame(f"community-points-user-v1.{channel_id}", message))
+    return frames
+
+
+def pubsub(args):
+    from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubReplay
+
+    # The best round is the least disturbed by the other processes
+    results = [PubSubReplay(args.file).run() for _ in range(0, args.rounds)]
+    best = max(results, key=lambda result: result["messages_per_second"])
+    print(PubSubReplay.report(best))
+    print(
+        f"Rounds: {args.rounds}, messages/s best {best['messages_per_second']:.0f}, "
+        f"median {statistics.median(r['messages_per_second'] for r in results):.0f}"
+    )
+
+    summary = {
+        "fixture": args.file,
+        "frames": best["frames"],
+        "messages_per_second": best["messages_per_second"],
+        "handlers": {
+            name: stats["time"] / stats["count"] * 1e6
+            for name, stats in best["handlers"].items()
+        },
+    }
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=4)
+        print(f"Baseline saved in {args.save}")
+
+    errors = sum(result["errors"] for result in results)
+    if errors > 0:
+        print(f"FAIL: {errors} exceptions raised by the message handlers")
+        return 1
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        ratio = summary["messages_per_second"] / baseline["messages_per_second"]
+        print(f"Compared to {args.compare}: {ratio:.2f}x messages/s")
+        for name, avg in sorted(summary["handlers"].items()):
+            if name in baseline["handlers"]:
+                print(f"  {name:<60} {baseline['handlers'][name]:>8.1f}us -> {avg:>8.1f}us")
+        if ratio < 1 - args.tolerance:
+            print(f"FAIL: slower than the baseline (tolerance {args.tolerance:.0%})")
+            return 1
+    return 0
+
+
+def analytics_datas(count, step=60):
+    # A streamer history of `count` points, one every `step` seconds until now (x in milliseconds like the storage)
+    now = int(time.time())
+    balance = 10000
+    series = []
+    annotations = []
+    for index in range(0, count):
+        x = (now - (count - index) * step) * 1000
+        balance += random.choice([10, 10, 10, 50, -100])
+        series.append({"x": x, "y": balance, "z": "WATCH"})
+        if index % 100 == 0:
+            annotations.append({"x": x, "borderColor": "#36b535", "label": {"text": "WATCH_STREAK"}})
+    return {"series": series, "annotations": annotations}
+
+
+def message(args):
+    from TwitchChannelPointsMiner.classes.entities.Message import Message
+    from TwitchChannelPointsMiner.classes.WebSocketsPool import HANDLED_MESSAGE_TYPES
+
+    random.seed(0)
+    frames = message_frames(args.frames)
+
+    def full():
+        # All the fields computed for every frame, as before the lazy Message
+        for raw in frames:
+            message = Message(json.loads(raw)["data"])
+            message.type, message.data, message.channel_id, message.identifier
+            message.timestamp
+
+    def lazy():
+        # The path of WebSocketsPool.on_message until the duplicate check
+        last = None
+        for raw in frames:
+            response = json.loads(raw)
+            if Message.is_relevant(response["data"], HANDLED_MESSAGE_TYPES) is False:
+                continue
+            message = Message(response["data"])
+            if (
+                last is not None
+                and last.identifier == message.identifier
+                and last.timestamp == message.timestamp
+            ):
+                continue
+            last = message
+
+    for name, function in [("full parsing", full), ("pre-filter + lazy", lazy)]:
+        elapsed = best_of(function, args.rounds)
+        print(f"{name:<20} {elapsed / len(frames) * 1e6:>8.2f}us per frame")
+    return 0
+
+
+def lttb(args):
+    from TwitchChannelPointsMiner.classes.AnalyticsServer import downsample
+
+    random.seed(0)
+    datas = analytics_datas(args.count)
+    print(f"{args.count} points, {len(datas['annotations'])} annotations")
+    for points in [None] + args.points:
+        result = {}
+
+        def response():
+            # What /json/<streamer>?points=N does after reading the storage
+            series = downsample(datas["series"], points)
+            result["payload"] = json.dumps(
+                {"series": series, "annotations": datas["annotations"]}
+            )
+
+        elapsed = best_of(response, args.rounds)
+        name = "all points" if points is None else f"points={points}"
+        print(
+            f"{name:<14} {len(result['payload']) / 1024:>8.0f} KiB {elapsed * 1000:>8.1f} ms"
+        )
+    return 0
+
+
+def pandas_filter_datas(start_date, end_date, datas):
+    # The pandas implementation replaced by the bisect one, only for the comparison
+    import pandas as pd
+
+    from TwitchChannelPointsMiner.classes.AnalyticsServer import date_range
+
+    start_date, end_date = date_range(start_date, end_date)
+    for key, sort_by in [("series", ["x", "y"]), ("annotations", "x")]:
+        df = pd.DataFrame(datas[key])
+        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
+        df = df[(df.x >= start_date) & (df.x <= end_date)]
+        datas[key] = (
+            df.drop(columns="datetime")
+            .sort_values(by=sort_by, ascending=True)
+            .to_dict("records")
+        )
+    return datas
+
+
+def analytics_filter(args):
+    from TwitchChannelPointsMiner.classes.AnalyticsServer import filter_datas
+
+    implementations = [("bisect", filter_datas)]
+    try:
+        import pandas  # noqa: F401
+
+        implementations.append(("pandas", pandas_filter_datas))
+    except ImportError:
+        print("pandas is not installed, only the bisect implementation is measured")
+
+    # The dashboard default: the last week of the whole history
+    start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    random.seed(0)
+    for count in args.sizes:
+        history = analytics_datas(count)
+        for name, implementation in implementations:
+
+            def run():
+                # filter_datas replaces the lists of the dict, not their content
+                return implementation(start_date, None, dict(history))
+
+            elapsed = best_of(run, args.rounds)
+            tracemalloc.start()
+            selected = len(run()["series"])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{count:>8} points {name:<7} {elapsed * 1000:>9.1f} ms "
+                f"{peak / 1024 / 1024:>7.1f} MiB peak allocated, {selected} points selected"
+            )
+    return 0
+
+
+def debug_logging(args):
+    from TwitchChannelPointsMiner.logger import DebugSampler
+
+    random.seed(0)
+    frames = message_frames(args.messages)
+    sink = open(os.devnull, "w")
+
+    def f_string(logger):
+        # Before: the root logger at DEBUG, the f-string is built and the record queued for every frame
+        for index, frame in enumerate(frames):
+            logger.debug(f"#{index % 10} - Received: {frame.strip()}")
+
+    def guarded(logger):
+        # WebSocketsPool.on_message: nothing is built if no handler accepts DEBUG
+        for index, frame in enumerate(frames):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("#%s - Received: %s", index % 10, frame.strip())
+
+    cases = [
+        ("root DEBUG, f-string", logging.DEBUG, None, f_string),
+        ("root INFO, guarded", logging.INFO, None, guarded),
+        (f"DEBUG, 1/{args.sampling} sampling", logging.DEBUG, args.sampling, guarded),
+    ]
+    def run(name, level, sampling, function):
+        # Like configure_loggers: queue handler on the logger, the listener writes only INFO and above
+        logger_queue = queue.Queue(-1)
+        logger = logging.getLogger(f"benchmark.{name}")
+        logger.propagate = False
+        logger.setLevel(level)
+        logger.handlers = [QueueHandler(logger_queue)]
+        logger.filters = [] if sampling is None else [DebugSampler(sampling)]
+        handler = logging.StreamHandler(sink)
+        handler.setLevel(logging.INFO)
+        listener = QueueListener(logger_queue, handler, respect_handler_level=True)
+        listener.start()
+        function(logger)
+        listener.stop()  # Wait until the queue is empty
+
+    for case in cases:
+        elapsed = best_of(lambda: run(*case), 3)
+        # Separate run: tracemalloc slows down the allocations
+        tracemalloc.start()
+        run(*case)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        name = case[0]
+        print(
+            f"{name:<26} {elapsed / len(frames) * 1e6:>8.2f}us per message "
+            f"{peak / 1024:>10.0f} KiB peak allocated"
+        )
+    sink.close()
+    return 0
+
+
+def formatter(args):
+    from TwitchChannelPointsMiner.classes.Settings import Events
+    from TwitchChannelPointsMiner.logger import (
+        FileFormatter,
+        GlobalFormatter,
+        LoggerSettings,
+    )
+
+    sink = open(os.devnull, "w")
+    for emoji in [True, False]:
+        for colored in [False, True]:
+            settings = LoggerSettings(emoji=emoji, colored=colored)
+            settings.username = ""
+
+            def run():
+                # configure_loggers: a file and a console handler behind the QueueListener
+                logger_queue = queue.Queue(-1)
+                logger = logging.getLogger(f"benchmark.formatter.{emoji}.{colored}")
+                logger.propagate = False
+                logger.setLevel(logging.DEBUG)
+                logger.handlers = [QueueHandler(logger_queue)]
+                file_handler = logging.StreamHandler(sink)
+                file_handler.setFormatter(
+                    FileFormatter(
+                        fmt="%(asctime)s - %(levelname)s - %(name)s - [%(funcName)s]: %(message)s",
+                        datefmt="%d/%m/%y %H:%M:%S",
+                        settings=settings,
+                    )
+                )
+                console_handler = logging.StreamHandler(sink)
+                console_handler.setFormatter(
+                    GlobalFormatter(
+                        fmt="%(asctime)s - %(levelname)s - [%(funcName)s]: %(message)s",
+                        datefmt="%d/%m/%y %H:%M:%S",
+                        settings=settings,
+                    )
+                )
+                listener = QueueListener(
+                    logger_queue, file_handler, console_handler, respect_handler_level=True
+                )
+                listener.start()
+                for index in range(0, args.records):
+                    logger.info(
+                        "+%s → Streamer(username=streamer%s, channel_id=%s, channel_points=12.3k) - Reason: WATCH.",
+                        10,
+                        index % 50,
+                        1000 + index % 50,
+                        extra={"emoji": ":rocket:", "event": Events.GAIN_FOR_WATCH},
+                    )
+                listener.stop()  # Wait until the queue is empty
+
+            elapsed = best_of(run, args.rounds)
+            print(
+                f"emoji {'on' if emoji else 'off':<3} colored {'on' if colored else 'off':<3} "
+                f"{args.records / elapsed:>10.0f} records/s"
+            )
+    sink.close()
+    return 0
+
+
+def rotation(args):
+    from TwitchChannelPointsMiner.classes.LogRotation import (
+        CompressedRotatingFileHandler,
+        open_log,
+        rotated_files,
+    )
+
+    line = "01/05/24 10:00:00 - DEBUG - TwitchChannelPointsMiner.classes.Twitch - [post_gql_request]: " + "x" * 200
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "benchmark.log")
+        handler = CompressedRotatingFileHandler(
+            filename,
+            interval=None,
+            max_bytes=args.max_bytes,
+            max_age=None,
+            max_total_bytes=None,
+            compress=True,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        record = logging.LogRecord("benchmark", logging.DEBUG, __file__, 0, line, None, None)
+
+        started = time.perf_counter()
+        for _ in range(0, args.lines):
+            handler.emit(record)
+        written = time.perf_counter() - started
+        handler.close()
+
+        # The compression runs in background, wait until every rotated file is compressed
+        while any(f.endswith(".gz") is False for f in rotated_files(filename)):
+            time.sleep(0.05)
+        compressed = time.perf_counter() - started
+
+        files = rotated_files(filename) + [filename]
+        raw = args.lines * (len(line) + 1)
+        size = sum(os.path.getsize(f) for f in files)
+        lines = 0
+        for f in files:
+            with open_log(f) as log:
+                lines += sum(1 for _ in log)
+    print(
+        f"{args.lines} lines in {written:.2f}s ({args.lines / written:.0f} lines/s), "
+        f"all compressed after {compressed:.2f}s"
+    )
+    print(
+        f"{len(files) - 1} rotated files, {raw / 1024 / 1024:.1f} MiB written, "
+        f"{size / 1024 / 1024:.2f} MiB on disk, {lines} lines read back"
+    )
+    return 0 if lines == args.lines else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of the hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pubsub_parser = subparsers.add_parser("pubsub", help="Replay a PubSub recording through WebSocketsPool.on_message")
+    pubsub_parser.add_argument("--file", default=PUBSUB_FIXTURE, help="Recording file (pubsub_record_file)")
+    pubsub_parser.add_argument("--rounds", type=int, default=5)
+    pubsub_parser.add_argument("--save", default=None, help="Save the result as baseline in this JSON file")
+    pubsub_parser.add_argument("--compare", default=None, help="Compare the result with this baseline")
+    pubsub_parser.add_argument("--tolerance", type=float, default=0.2, help="Accepted slowdown, 0.2 = 20%%")
+    pubsub_parser.set_defaults(func=pubsub)
+
+    message_parser = subparsers.add_parser("message", help="Lazy Message parsing and pre-filter vs full parsing")
+    message_parser.add_argument("--frames", type=int, default=100000)
+    message_parser.add_argument("--rounds", type=int, default=5)
+    message_parser.set_defaults(func=message)
+
+    lttb_parser = subparsers.add_parser("lttb", help="Payload and time of the downsampled analytics series")
+    lttb_parser.add_argument("--count", type=int, default=100000, help="Points of the series")
+    lttb_parser.add_argument("--points", type=int, nargs="+", default=[2000, 500], help="Values of the points parameter")
+    lttb_parser.add_argument("--rounds", type=int, default=3)
+    lttb_parser.set_defaults(func=lttb)
+
+    filter_parser = subparsers.add_parser("filter", help="Analytics date filter (last week of the history)")
+    filter_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Points of the history")
+    filter_parser.add_argument("--rounds", type=int, default=3)
+    filter_parser.set_defaults(func=analytics_filter)
+
+    logging_parser = subparsers.add_parser("logging", help="Cost of the debug calls of the hot paths")
+    logging_parser.add_argument("--messages", type=int, default=50000)
+    logging_parser.add_argument("--sampling", type=int, default=100, help="Rate of the DebugSampler case")
+    logging_parser.set_defaults(func=debug_logging)
+
+    formatter_parser = subparsers.add_parser("formatter", help="Records per second through the QueueListener")
+    formatter_parser.add_argument("--records", type=int, default=20000)
+    formatter_parser.add_argument("--rounds", type=int, default=3)
+    formatter_parser.set_defaults(func=formatter)
+
+    rotation_parser = subparsers.add_parser("rotation", help="Log writes with size rotation and gzip compression")
+    rotation_parser.add_argument("--lines", type=int, default=500000)
+    rotation_parser.add_argument("--max-bytes", type=int, default=10 * 1024 * 1024, help="Size of each part")
+    rotation_parser.set_defaults(func=rotation)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(message)s")
+    sys.exit(args.func(args))
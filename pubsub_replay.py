@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+
+# Replay a PubSub recording (TwitchChannelPointsMiner(pubsub_record_file=...)) through WebSocketsPool.on_message
+# and print the throughput and the latency of each handler. The Twitch side effects are stubbed.
+
+import argparse
+
+from TwitchChannelPointsMiner.classes.PubSubRecorder import PubSubReplay
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a PubSub recording")
+    parser.add_argument("file", help="Recording file, e.g. pubsub/user.jsonl.gz")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="1 = real time, 10 = 10x, 0 = max speed (default)",
+    )
+    parser.add_argument(
+        "--allocations",
+        action="store_true",
+        help="Trace the memory allocated by each handler (slower)",
+    )
+    args = parser.parse_args()
+
+    replay = PubSubReplay(args.file, speed=args.speed, track_allocations=args.allocations)
+    print(PubSubReplay.report(replay.run()))
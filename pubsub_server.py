@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Local stand-in Twitch PubSub server for load tests.
+#   python pubsub_server.py server --port 8765 --scale 10
+#   TWITCH_PUBSUB_URL=ws://127.0.0.1:8765 python run.py          # Point the miner to the local server
+#   python pubsub_server.py load --url ws://127.0.0.1:8765 --channels 2000 --duration 60
+
+import argparse
+import logging
+import time
+
+from TwitchChannelPointsMiner.classes.PubSubServer import PubSubServer, run_load_test
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local Twitch PubSub server for load tests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    server_parser = subparsers.add_parser("server", help="Run the PubSub server")
+    server_parser.add_argument("--host", default="127.0.0.1")
+    server_parser.add_argument("--port", type=int, default=8765)
+    server_parser.add_argument("--scale", type=float, default=1.0, help="Multiplier of the default messages rates")
+    server_parser.add_argument("--max-topics", type=int, default=50, help="Topics limit for each connection")
+    server_parser.add_argument("--bad-auth-token", action="append", default=[], help="Reply ERR_BADAUTH to this token")
+    server_parser.add_argument("--reconnect-every", type=int, default=None, help="Send RECONNECT to all the clients every N seconds")
+
+    load_parser = subparsers.add_parser("load", help="Connect a WebSocketsPool to a PubSub server and measure it")
+    load_parser.add_argument("--url", default="ws://127.0.0.1:8765")
+    load_parser.add_argument("--channels", type=int, default=1000)
+    load_parser.add_argument("--duration", type=int, default=60, help="Seconds of measurement after the setup")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    if args.command == "server":
+        server = PubSubServer(
+            host=args.host,
+            port=args.port,
+            scale=args.scale,
+            max_topics=args.max_topics,
+            bad_auth_tokens=args.bad_auth_token,
+            reconnect_every=args.reconnect_every,
+        )
+        server.start()
+        try:
+            while True:
+                time.sleep(10)
+                logging.info(f"Clients: {len(server.connections)}, stats: {server.stats}")
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        result = run_load_test(args.url, channels=args.channels, duration=args.duration)
+        print(
+            f"Connections: {result['connections']}, topics: {result['topics']}, "
+            f"subscription time: {result['setup_time']:.2f}s"
+            + ("" if result["subscribed"] is True else " (timeout, some LISTEN without RESPONSE)")
+        )
+        print(
+            f"Frames: {result['frames']}, CPU time: {result['cpu_time']:.2f}s, "
+            f"CPU per message: {result['cpu_per_message'] * 1e6:.1f}us"
+        )
+        if result["reconnections"] > 0:
+            print(
+                f"Reconnections: {result['reconnections']}, time to reconnect and subscribe again: "
+                f"avg {result['reconnect_time_avg']:.2f}s, max {result['reconnect_time_max']:.2f}s"
+            )
@@ -36,7 +36,6 @@ setuptools.setup(
         "colorama",
         "flask",
         "irc",
-        "pandas",
         "pytz"
     ],
     long_description=read("README.md"),